@@ -1,9 +1,44 @@
+import math
 import os
+import random
+import shutil
 import unittest
+from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import patch
 
 # Import the class to test
 from database.TemperatureSensorLogger import *
+from app.backend.controllers.ClimateChamberController import ClimateChamberController
+from app.backend.models.graph import Graph, GraphConfig, simplify_profile, validate_profile
+from app.backend.services.config import save_config
+from app.backend.services.chambers import ChamberManager
+from app.backend.services.config_store import ConfigStore, config_store
+from app.backend.services.profile_library import ProfileLibrary
+from app.backend.services.stream_hub import StreamHub
+from app.backend.services.temperature import temperature_service
+from app.backend.models.mock.ThermalSimulator import SIMULATOR_AVAILABLE, ThermalSimulator
+from database.ChunkedStorage import CHUNKED_AVAILABLE, ChunkedSeriesWriter, decode_chunk, encode_chunk
+from database.ColumnarArchive import COLUMNAR_AVAILABLE, write_columnar_cycle
+from database.CycleExporter import CycleExporter
+from database.Metrics import LatencyHistogram, MetricsRegistry
+from database.PIDTuner import (TUNER_AVAILABLE, FirstOrderPlant, fit_plant, pid_update, simulate, tune,
+                              tune_in_subprocess)
+from database.RetentionManager import RetentionManager, rehydrate_archive, rehydrated_path
+from database.RollupStore import insert_new_readings, rebuild_rollups, upsert_rollups
+from database.RingBuffer import SensorRingBuffer
+from database.SampleBus import AcquisitionLoop, SampleBus
+from database.SampleScheduler import SampleScheduler
+from database.SampleWriter import SampleWriter
+from database.SchemaMigration import iso_to_epoch_us
+from database.SensorAcquisition import AcquisitionEngine, Sample, epoch_us
+from database.SensorRegistry import SensorDriver, SensorRegistry
+
+
+def remove_columnar(logger):
+    """Wait for the columnar archive written after a cycle and remove it."""
+    logger.join_columnar()
+    shutil.rmtree(logger.get_columnar_path(0).parent, ignore_errors=True)
 
 
 class TestTemperatureSensorLogger(unittest.TestCase):
@@ -35,9 +70,8 @@ class TestTemperatureSensorLogger(unittest.TestCase):
             json.dump(self.test_mock_data, f)
 
         # Create a test instance with the test paths
-        self.logger = TemperatureSensorLogger()
+        self.logger = TemperatureSensorLogger(db_path=self.test_db_path)
         # Override paths in the logger
-        self.logger.db_path = self.test_db_path
         self.logger.config_path = self.test_config_path
         self.logger.mock_data_path = self.test_mock_data_path
 
@@ -54,6 +88,7 @@ class TestTemperatureSensorLogger(unittest.TestCase):
         # Stop any ongoing logging
         if self.logger.logging_active:
             self.logger.stop_logging_cycle()
+        remove_columnar(self.logger)
 
         # Close any open database connections
         try:
@@ -158,19 +193,41 @@ class TestTemperatureSensorLogger(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertIsNotNone(result[0])
 
+    @unittest.skipUnless(COLUMNAR_AVAILABLE, "numpy is required for the columnar archive")
+    def test_columnar_archive_opt_in(self):
+        """Test that a stopped cycle only gets a columnar archive when it is enabled."""
+        for enabled in (False, True):
+            self.logger.columnar_archive = enabled
+            self.logger.start_logging_cycle(f"columnar_{enabled}", interval=10)
+            cycle_id = self.logger.current_cycle_id
+            self.logger.log_sensor_data()
+            self.logger.stop_logging_cycle()
+            self.logger.join_columnar()
+            self.assertEqual(self.logger.get_columnar_path(cycle_id).exists(), enabled)
+
     def test_log_sensor_data(self):
         """Test logging sensor data."""
         # Start a cycle
         self.logger.start_logging_cycle("test_cycle", interval=10)  # Large interval to prevent auto-logging
 
-        # Manually call log_sensor_data
+        # The logging thread takes one reading right away, count what is already stored
+        time.sleep(0.1)
+        self.logger.writer.flush()
+        conn = sqlite3.connect(self.test_db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE cycle_id = ?", (self.logger.current_cycle_id,))
+        initial_count = cursor.fetchone()[0]
+        conn.close()
+
+        # Manually call log_sensor_data and flush the write-behind queue
         self.logger.log_sensor_data()
+        self.logger.writer.flush()
 
         # Check that readings were added to database
         conn = sqlite3.connect(self.test_db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE cycle_id = ?", (self.logger.current_cycle_id,))
-        count = cursor.fetchone()[0]
+        count = cursor.fetchone()[0] - initial_count
         conn.close()
 
         # Should have one reading per sensor
@@ -243,5 +300,1451 @@ class TestTemperatureSensorLogger(unittest.TestCase):
         self.assertEqual(readings_count, 0)
 
 
+class TestSampleWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = 'test_writer_data.db'
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("CREATE TABLE samples (sensor_id TEXT, temperature REAL)")
+        conn.commit()
+        conn.close()
+        self.insert_sql = "INSERT INTO samples (sensor_id, temperature) VALUES (?, ?)"
+
+    def tearDown(self):
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.exists(self.test_db_path + suffix):
+                os.remove(self.test_db_path + suffix)
+
+    def count_rows(self):
+        conn = sqlite3.connect(self.test_db_path)
+        count = conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_flush_on_stop(self):
+        """Test that queued samples are written when the writer stops."""
+        writer = SampleWriter(self.test_db_path, self.insert_sql, flush_interval=10)
+        writer.start()
+        writer.submit_many([("sensor1", 20.0), ("sensor2", 21.0)])
+        writer.stop()
+
+        self.assertEqual(self.count_rows(), 2)
+        self.assertEqual(writer.stats()['flushed'], 2)
+
+    def test_flush_on_batch_size(self):
+        """Test that a full batch is flushed without waiting for the interval."""
+        writer = SampleWriter(self.test_db_path, self.insert_sql, batch_size=5, flush_interval=10)
+        writer.start()
+        writer.submit_many([("sensor1", float(i)) for i in range(5)])
+        time.sleep(0.2)
+        flushed = writer.flushed
+        writer.stop()
+
+        self.assertEqual(flushed, 5)
+
+    def test_flusher_survives_hook_errors(self):
+        """Test that a failing on_flush drops its batch without ending the flusher thread."""
+        calls = []
+
+        def on_flush(conn, rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise RuntimeError("hook failed")
+
+        writer = SampleWriter(self.test_db_path, self.insert_sql, batch_size=2, flush_interval=10, on_flush=on_flush)
+        writer.start()
+        writer.submit_many([("sensor1", 20.0), ("sensor2", 21.0)])
+        time.sleep(0.2)
+        writer.submit_many([("sensor1", 22.0), ("sensor2", 23.0)])
+        time.sleep(0.2)
+        alive = writer._thread.is_alive()
+        writer.stop()
+
+        self.assertTrue(alive)
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(self.count_rows(), 2)
+        self.assertEqual((writer.stats()['flushed'], writer.stats()['dropped']), (2, 2))
+
+    def test_overflow_drop_oldest(self):
+        """Test that the oldest samples are dropped when the queue is full."""
+        writer = SampleWriter(self.test_db_path, self.insert_sql, max_queue=3, overflow_policy='drop_oldest')
+        writer.submit_many([("sensor1", float(i)) for i in range(5)])
+
+        self.assertEqual(writer.queued, 5)
+        self.assertEqual(writer.dropped, 2)
+        self.assertEqual([row[1] for row in writer._queue], [2.0, 3.0, 4.0])
+
+    def test_overflow_drop_newest(self):
+        """Test that new samples are rejected when the queue is full."""
+        writer = SampleWriter(self.test_db_path, self.insert_sql, max_queue=3, overflow_policy='drop_newest')
+        accepted = writer.submit_many([("sensor1", float(i)) for i in range(5)])
+
+        self.assertEqual(accepted, 3)
+        self.assertEqual(writer.dropped, 2)
+        self.assertEqual([row[1] for row in writer._queue], [0.0, 1.0, 2.0])
+
+    def test_invalid_overflow_policy(self):
+        """Test that an unknown overflow policy is rejected."""
+        with self.assertRaises(ValueError):
+            SampleWriter(self.test_db_path, self.insert_sql, overflow_policy='ignore')
+
+
+class TestSchemaMigration(unittest.TestCase):
+
+    def setUp(self):
+        """Create a database with the v1 schema."""
+        self.test_db_path = 'test_migration_data.db'
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("CREATE TABLE cycles (cycle_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, "
+                     "start_time TEXT, end_time TEXT)")
+        conn.execute("CREATE TABLE sensor_readings (reading_id INTEGER PRIMARY KEY AUTOINCREMENT, cycle_id INTEGER, "
+                     "sensor_id TEXT, timestamp TEXT, temperature REAL)")
+        conn.execute("INSERT INTO cycles (name, start_time) VALUES ('old_cycle', '2024-01-01T12:00:00')")
+        conn.executemany(
+            "INSERT INTO sensor_readings (cycle_id, sensor_id, timestamp, temperature) VALUES (?, ?, ?, ?)",
+            [(1, "sensor1", "2024-01-01T12:00:00.250000", 21.5),
+             (1, "sensor2", "2024-01-01T12:00:00.250000", 22.5),
+             (1, "sensor1", "2024-01-01T12:00:01.250000", 21.75)]
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_migrate_to_v2(self):
+        """Test that v1 readings are moved to the compact schema."""
+        migrated = migrate_to_v2(self.test_db_path)
+        self.assertEqual(migrated, 3)
+
+        conn = sqlite3.connect(self.test_db_path)
+        self.assertEqual(get_schema_version(conn), SCHEMA_VERSION)
+        rows = conn.execute(
+            "SELECT s.name, r.ts, r.temperature FROM sensor_readings r JOIN sensors s USING (sensor_key) "
+            "ORDER BY s.name, r.ts"
+        ).fetchall()
+        conn.close()
+
+        self.assertEqual(rows[0][0], "sensor1")
+        self.assertEqual(rows[1][1] - rows[0][1], 1_000_000)
+        self.assertEqual(rows[0][1], iso_to_epoch_us("2024-01-01T12:00:00.250000"))
+        self.assertEqual([row[2] for row in rows], [21.5, 21.75, 22.5])
+
+    def test_migrate_skips_unkeyed_and_duplicate_rows(self):
+        """Test that rows without a key are dropped and duplicates keep the last reading."""
+        conn = sqlite3.connect(self.test_db_path)
+        conn.executemany(
+            "INSERT INTO sensor_readings (cycle_id, sensor_id, timestamp, temperature) VALUES (?, ?, ?, ?)",
+            [(None, "sensor1", "2024-01-01T12:00:02", 20.0),
+             (1, "sensor1", None, 20.0),
+             (1, "sensor1", "2024-01-01T12:00:01.250000", 23.0)]
+        )
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(migrate_to_v2(self.test_db_path, vacuum=False), 3)
+
+        conn = sqlite3.connect(self.test_db_path)
+        temperatures = [row[0] for row in conn.execute("SELECT temperature FROM sensor_readings ORDER BY ts")]
+        conn.close()
+        self.assertIn(23.0, temperatures)
+        self.assertNotIn(21.75, temperatures)
+
+    def test_setup_database_migrates(self):
+        """Test that opening a v1 database migrates it and keeps its cycles."""
+        manager = DatabaseManager(self.test_db_path)
+        self.assertEqual(len(manager.list_cycles()), 1)
+        self.assertEqual(manager.get_sensor_key("sensor1"), 1)
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        """Create a cycle with 20 minutes of 1 Hz readings for one sensor."""
+        self.test_db_path = 'test_rollup_data.db'
+        self.manager = DatabaseManager(self.test_db_path)
+        self.sensor_key = self.manager.get_sensor_key("sensor1")
+        self.start = 1_699_999_800_000_000  # Aligned to a 10 minute bucket
+        self.rows = [(1, self.sensor_key, self.start + i * 1_000_000, float(i % 60)) for i in range(1200)]
+
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name) VALUES ('rollup_cycle')")
+        conn.executemany("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)",
+                         self.rows)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_incremental_matches_rebuild(self):
+        """Test that rollups merged batch by batch equal a full rebuild."""
+        conn = sqlite3.connect(self.test_db_path)
+        for i in range(0, len(self.rows), 7):
+            upsert_rollups(conn, self.rows[i:i + 7])
+        incremental = conn.execute("SELECT * FROM sensor_rollups ORDER BY resolution, bucket").fetchall()
+        rebuild_rollups(conn, 1)
+        rebuilt = conn.execute("SELECT * FROM sensor_rollups ORDER BY resolution, bucket").fetchall()
+        conn.close()
+
+        self.assertEqual(incremental, rebuilt)
+
+    def test_duplicates_counted_once(self):
+        """Test that readings written twice are only folded into the rollups once."""
+        insert_sql = "INSERT OR IGNORE INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)"
+        rows = [(2, self.sensor_key, self.start + i * 1_000_000, float(i)) for i in range(10)]
+        conn = sqlite3.connect(self.test_db_path)
+        for batch, new in ((rows[:6], 6), (rows[3:] + rows[8:], 4)):
+            with conn:
+                inserted = insert_new_readings(conn, insert_sql, batch)
+                upsert_rollups(conn, inserted)
+            self.assertEqual(len(inserted), new)
+        incremental = conn.execute("SELECT * FROM sensor_rollups WHERE cycle_id = 2 ORDER BY resolution").fetchall()
+        with conn:
+            rebuild_rollups(conn, 2)
+        rebuilt = conn.execute("SELECT * FROM sensor_rollups WHERE cycle_id = 2 ORDER BY resolution").fetchall()
+        conn.close()
+
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental[0][-1], 10)
+
+    def test_query_cycle_picks_resolution(self):
+        """Test that the finest resolution fitting the point budget is used."""
+        raw = self.manager.query_cycle(1, max_points=5000)
+        self.assertEqual(raw['resolution'], 0)
+        self.assertEqual(len(raw['series']['sensor1']), 1200)
+
+        coarse = self.manager.query_cycle(1, max_points=100)
+        self.assertEqual(coarse['resolution'], 60)
+        self.assertEqual(len(coarse['series']['sensor1']), 20)
+        ts, minimum, maximum, mean, count = coarse['series']['sensor1'][0]
+        self.assertEqual(count, 60)
+        self.assertEqual(maximum - minimum, 59)
+        self.assertAlmostEqual(mean, 29.5)
+
+    def test_range_keeps_bucket_containing_start(self):
+        """Test that a range starting inside a bucket still returns that bucket."""
+        coarse = self.manager.query_cycle(1, max_points=100, start=self.start + 90_000_000)
+        self.assertEqual(coarse['resolution'], 60)
+        self.assertEqual(coarse['series']['sensor1'][0][0], self.start + 60_000_000)
+        self.assertEqual(len(coarse['series']['sensor1']), 19)
+
+
+class TestCycleExporter(unittest.TestCase):
+
+    def setUp(self):
+        """Create a cycle with two sensors, one of them missing a reading."""
+        self.test_db_path = 'test_export_data.db'
+        self.manager = DatabaseManager(self.test_db_path)
+        key1 = self.manager.get_sensor_key("sensor1")
+        key2 = self.manager.get_sensor_key("sensor2")
+        start = 1_700_000_000_000_000
+
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name) VALUES ('export_cycle')")
+        conn.executemany("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)",
+                         [(1, key1, start, 20.0), (1, key2, start, 30.0), (1, key1, start + 1_000_000, 21.0)])
+        conn.commit()
+        conn.close()
+        self.exporter = CycleExporter(self.manager, chunk_size=1)
+
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_wide_layout(self):
+        """Test that the wide layout has one column per sensor and blanks for missing readings."""
+        rows = list(self.exporter.iter_rows(1, layout='wide'))
+        self.assertEqual(rows[0], ['timestamp', 'sensor1', 'sensor2'])
+        self.assertEqual(rows[1][1:], [20.0, 30.0])
+        self.assertEqual(rows[2][1:], [21.0, None])
+
+    def test_gzip_ndjson(self):
+        """Test that the gzipped NDJSON stream decodes to one object per reading."""
+        import gzip
+        body = b''.join(self.exporter.gzip_stream(self.exporter.iter_encoded(1, fmt='ndjson')))
+        lines = gzip.decompress(body).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[1])['sensor'], 'sensor2')
+
+
+class TestPartitionedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = 'test_catalog_data.db'
+        self.logger = TemperatureSensorLogger(storage_mode='partitioned', db_path=self.test_db_path)
+
+    def tearDown(self):
+        if self.logger.logging_active:
+            self.logger.stop_logging_cycle()
+        remove_columnar(self.logger)
+        partition_dir = self.logger.get_partition_dir()
+        if partition_dir.exists():
+            for path in partition_dir.iterdir():
+                path.unlink()
+            partition_dir.rmdir()
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_cycle_readings_in_own_file(self):
+        """Test that a cycle's readings are written to its partition and can be queried."""
+        self.logger.start_logging_cycle("partitioned_cycle", interval=10)
+        cycle_id = self.logger.current_cycle_id
+        self.logger.log_sensor_data()
+        self.logger.stop_logging_cycle()
+
+        storage_path = self.logger.get_storage_path(cycle_id)
+        self.assertTrue(os.path.exists(storage_path))
+
+        conn = sqlite3.connect(self.test_db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sensor_readings")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        conn.close()
+
+        result = self.logger.query_cycle(cycle_id)
+        self.assertEqual(len(result['series']), len(self.logger.sensors))
+        self.assertTrue(all(len(series) >= 1 for series in result['series'].values()))
+
+    def test_delete_unlinks_file(self):
+        """Test that deleting a partitioned cycle removes its file."""
+        self.logger.start_logging_cycle("partitioned_delete", interval=10)
+        cycle_id = self.logger.current_cycle_id
+        self.logger.stop_logging_cycle()
+        storage_path = self.logger.get_storage_path(cycle_id)
+
+        self.logger.delete_cycle("partitioned_delete")
+
+        self.assertFalse(os.path.exists(storage_path))
+        self.assertIsNone(self.logger.get_cycle_id("partitioned_delete"))
+
+    def test_archive_includes_wal(self):
+        """Test that readings still in a partition's WAL end up in its archive."""
+        self.logger.start_logging_cycle("partitioned_wal", interval=10)
+        cycle_id = self.logger.current_cycle_id
+        self.logger.log_sensor_data()
+        self.logger.stop_logging_cycle()
+        storage_path = self.logger.get_storage_path(cycle_id)
+
+        # An open connection keeps the last writer from checkpointing on close
+        conn = sqlite3.connect(storage_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        holder = sqlite3.connect(storage_path)
+        holder.execute("SELECT COUNT(*) FROM sensor_readings").fetchone()
+        with conn:
+            conn.execute("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, 999, 1, 20.0)",
+                         (cycle_id,))
+        rows = conn.execute("SELECT COUNT(*) FROM sensor_readings").fetchone()[0]
+        conn.close()
+        self.assertGreater(os.path.getsize(storage_path + '-wal'), 0)
+
+        retention = RetentionManager(self.logger, archive_dir=self.logger.get_partition_dir(), throttle=0)
+        archived = retention.archive_cycle(cycle_id)
+        holder.close()
+        self.assertTrue(archived)
+
+        conn = sqlite3.connect(rehydrate_archive(self.logger.get_cycle_storage(cycle_id)[1]))
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sensor_readings").fetchone()[0], rows)
+        conn.close()
+
+
+class TestRetentionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = 'test_retention_data.db'
+        self.logger = TemperatureSensorLogger(db_path=self.test_db_path)
+        self.retention = RetentionManager(self.logger, archive_dir='test_retention_archive', max_hot_bytes=0,
+                                          throttle=0)
+
+        self.logger.start_logging_cycle("retention_cycle", interval=10)
+        self.cycle_id = self.logger.current_cycle_id
+        self.logger.log_sensor_data()
+        self.logger.stop_logging_cycle()
+
+    def tearDown(self):
+        remove_columnar(self.logger)
+        for path in Path('test_retention_archive').glob('*'):
+            path.unlink()
+        if os.path.exists('test_retention_archive'):
+            os.rmdir('test_retention_archive')
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_archive_and_rehydrate(self):
+        """Test that an archived cycle leaves the hot table and is rehydrated for raw queries."""
+        before = self.logger.query_cycle(self.cycle_id)
+        self.assertEqual(self.retention.run_once(), [self.cycle_id])
+
+        conn = sqlite3.connect(self.test_db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE cycle_id = ?", (self.cycle_id,))
+        self.assertEqual(cursor.fetchone()[0], 0)
+        conn.close()
+
+        after = self.logger.query_cycle(self.cycle_id)
+        self.assertEqual(before, after)
+        self.assertTrue(os.path.exists(rehydrated_path(self.logger.get_cycle_storage(self.cycle_id)[1])))
+
+    def test_archive_pages_by_key_and_shrinks_file(self):
+        """Test that a cycle copied over many key pages is complete and its pages are given back."""
+        keys = [self.logger.get_sensor_key(f"bulk{i}") for i in range(3)]
+        rows = [(self.cycle_id, key, 1_700_000_000_000_000 + i * 1_000_000, 20.0) for key in keys for i in range(2000)]
+        conn = sqlite3.connect(self.test_db_path)
+        with conn:
+            conn.executemany("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)",
+                             rows)
+            rows += conn.execute("SELECT * FROM sensor_readings WHERE cycle_id = ? AND sensor_key NOT IN (?, ?, ?)",
+                                 (self.cycle_id, *keys)).fetchall()
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.close()
+
+        self.retention.batch_size = 700
+        self.assertEqual(self.retention.run_once(), [self.cycle_id])
+
+        conn = sqlite3.connect(self.test_db_path)
+        self.assertEqual(conn.execute("PRAGMA freelist_count").fetchone()[0], 0)
+        self.assertLess(conn.execute("PRAGMA page_count").fetchone()[0], pages / 2)
+        conn.close()
+        conn = sqlite3.connect(rehydrate_archive(self.logger.get_cycle_storage(self.cycle_id)[1]))
+        archived = conn.execute("SELECT * FROM sensor_readings").fetchall()
+        conn.close()
+        self.assertEqual(sorted(archived), sorted(rows))
+
+    def test_active_cycle_not_archived(self):
+        """Test that a cycle without end time is never selected."""
+        self.logger.start_logging_cycle("active_cycle", interval=10)
+        selected = self.retention.select_cycles()
+        self.logger.stop_logging_cycle()
+
+        self.assertNotIn(self.logger.get_cycle_id("active_cycle"), selected)
+
+
+@unittest.skipUnless(COLUMNAR_AVAILABLE, "numpy is required for the columnar archive")
+class TestColumnarArchive(unittest.TestCase):
+
+    def setUp(self):
+        """Create a cycle with two sensors, one of them missing a reading."""
+        self.test_db_path = 'test_columnar_data.db'
+        self.manager = DatabaseManager(self.test_db_path)
+        key1 = self.manager.get_sensor_key("sensor1")
+        key2 = self.manager.get_sensor_key("sensor2")
+        self.start = 1_700_000_000_000_000
+
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name) VALUES ('columnar_cycle')")
+        rows = [(1, key1, self.start + i * 1_000_000, float(i)) for i in range(100)]
+        rows += [(1, key2, self.start + i * 1_000_000, float(-i)) for i in range(100) if i != 50]
+        conn.executemany("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)",
+                         rows)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.manager.get_columnar_path(1).parent, ignore_errors=True)
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_write_and_window(self):
+        """Test that a time window of one sensor is sliced from the memory-mapped arrays."""
+        self.assertEqual(write_columnar_cycle(self.manager, 1, str(self.manager.get_columnar_path(1)),
+                                              chunk_rows=16), 199)
+        archive = self.manager.open_columnar(1)
+
+        self.assertEqual(archive.sensor_names, ['sensor1', 'sensor2'])
+        timestamps, values = archive.window('sensor1', self.start + 10_000_000, self.start + 19_000_000)
+        self.assertEqual(len(values), 10)
+        self.assertEqual(values[0], 10.0)
+        self.assertEqual(timestamps[-1], self.start + 19_000_000)
+
+        # Every sensor keeps only its own readings, the missing one leaves no gap
+        self.assertEqual(len(archive.sensor('sensor2')), 99)
+        timestamps, values = archive.window('sensor2', self.start + 49_000_000, self.start + 51_000_000)
+        self.assertEqual(list(values), [-49.0, -51.0])
+        self.assertFalse(any(math.isnan(value) for value in archive.sensor('sensor2')))
+
+    def test_missing_value_is_nan(self):
+        """Test that a reading logged without a value is written as NaN."""
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (1, ?, ?, NULL)",
+                     (self.manager.get_sensor_key("sensor1"), self.start + 100_000_000))
+        conn.commit()
+        conn.close()
+
+        write_columnar_cycle(self.manager, 1, str(self.manager.get_columnar_path(1)), dtype='float32')
+        values = self.manager.open_columnar(1).sensor('sensor1')
+        self.assertEqual(len(values), 101)
+        self.assertTrue(math.isnan(values[-1]))
+        self.assertEqual(values[99], 99.0)
+
+
+
+@unittest.skipUnless(CHUNKED_AVAILABLE, "numpy is required for the chunked storage engine")
+class TestChunkedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = 'test_chunked_data.db'
+        self.manager = DatabaseManager(self.test_db_path, storage_engine='chunked')
+        self.key = self.manager.get_sensor_key("sensor1")
+        self.start = 1_700_000_000_000_000
+
+    def tearDown(self):
+        if os.path.exists(self.test_db_path):
+            os.remove(self.test_db_path)
+
+    def test_encode_decode_exact(self):
+        """Test that jittered timestamps and arbitrary floats survive a round trip bit for bit."""
+        ts = [self.start + i * 1_000_000 + (i * 7919) % 500 for i in range(1000)]
+        values = [20.0 + math.sin(i / 10) * 5 for i in range(1000)]
+        values[3] = -0.0
+        t_min, t_max, n, v_min, v_max, ts_blob, value_blob = encode_chunk(ts, values)
+
+        decoded_ts, decoded_values = decode_chunk(ts_blob, value_blob, n)
+        self.assertEqual((t_min, t_max, n), (ts[0], ts[-1], 1000))
+        self.assertEqual(decoded_ts.tolist(), ts)
+        self.assertEqual(decoded_values.tolist(), values)
+        self.assertEqual(math.copysign(1, decoded_values[3]), -1)
+        self.assertLess(len(ts_blob) + len(value_blob), 16 * 1000 // 2)
+
+    def test_query_and_export(self):
+        """Test that flushed chunks are split per window and read back by query and export."""
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name, storage_engine) VALUES ('chunked_cycle', 'chunked')")
+        writer = ChunkedSeriesWriter(chunk_duration=60)
+        rows = [(1, self.key, self.start + i * 1_000_000, float(i)) for i in range(150)]
+        with conn:
+            writer(conn, rows[:100])
+            writer(conn, rows[100:])
+        chunk_count = conn.execute("SELECT COUNT(*) FROM sensor_chunks").fetchone()[0]
+        conn.close()
+
+        self.assertEqual(chunk_count, 3)
+        self.manager.rebuild_rollups(1)
+        result = self.manager.query_cycle(1, max_points=1000, start=self.start + 30_000_000,
+                                          end=self.start + 39_000_000)
+        self.assertEqual(result['resolution'], 0)
+        self.assertEqual([point[1] for point in result['series']['sensor1']], [float(i) for i in range(30, 40)])
+        self.assertEqual(self.manager.query_cycle(1, max_points=10)['resolution'], 60)
+
+        rows = list(CycleExporter(self.manager).iter_rows(1))
+        self.assertEqual(len(rows), 151)
+        self.assertEqual(rows[-1][2], 149.0)
+
+        if COLUMNAR_AVAILABLE:
+            columnar_path = self.manager.get_columnar_path(1)
+            self.assertEqual(write_columnar_cycle(self.manager, 1, str(columnar_path)), 150)
+            self.assertEqual(self.manager.open_columnar(1).sensor('sensor1').tolist(), [float(i) for i in range(150)])
+            shutil.rmtree(columnar_path.parent, ignore_errors=True)
+
+    def test_writer_merges_stored_chunk(self):
+        """Test that a new writer appends to a stored open chunk and closed cycles are forgotten."""
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name, storage_engine) VALUES ('chunked_cycle', 'chunked')")
+        rows = [(1, self.key, self.start + i * 1_000_000, float(i)) for i in range(20)]
+        with conn:
+            ChunkedSeriesWriter(chunk_duration=600)(conn, rows[:10])
+        writer = ChunkedSeriesWriter(chunk_duration=600, persist_interval=3600)
+        with conn:
+            writer(conn, rows[10:])
+            writer.close_cycle(conn, 1)
+        n = conn.execute("SELECT SUM(n) FROM sensor_chunks").fetchone()[0]
+        conn.close()
+
+        self.assertEqual(n, 20)
+        self.assertEqual(writer._open, {})
+
+    def test_writer_rewrites_rolled_back_chunks(self):
+        """Test that closed and open chunks of a rolled back transaction are written again."""
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute("INSERT INTO cycles (name, storage_engine) VALUES ('chunked_cycle', 'chunked')")
+        conn.commit()
+        writer = ChunkedSeriesWriter(chunk_duration=60, persist_interval=3600)
+        rows = [(1, self.key, self.start + i * 1_000_000, float(i)) for i in range(90)]
+        with conn:
+            writer(conn, rows[:30])
+        with self.assertRaises(RuntimeError):
+            with conn:
+                writer(conn, rows[30:])  # Closes the first window
+                raise RuntimeError("commit failed")
+        writer.rollback()
+        with conn:
+            writer.flush(conn)
+        chunks = conn.execute("SELECT chunk_start, n FROM sensor_chunks ORDER BY chunk_start").fetchall()
+        conn.close()
+
+        self.assertEqual(sum(n for _, n in chunks), 90)
+        self.assertEqual(len(chunks), 2)
+
+    def test_writer_skips_duplicates(self):
+        """Test that samples written twice are stored and rolled up once."""
+        conn = sqlite3.connect(self.test_db_path)
+        with conn:
+            conn.execute("INSERT INTO cycles (name, storage_engine) VALUES ('chunked_cycle', 'chunked')")
+        conn.close()
+        rows = [(1, self.key, self.start + i * 1_000_000, float(i)) for i in range(10)]
+        writer = TemperatureSensorLogger(storage_engine='chunked', db_path=self.test_db_path).create_writer()
+        writer.start()
+        writer.submit_many(rows[:6])
+        writer.flush()
+        writer.submit_many(rows[3:] + rows[8:])
+        writer.stop()
+
+        conn = sqlite3.connect(self.test_db_path)
+        n = conn.execute("SELECT SUM(n) FROM sensor_chunks").fetchone()[0]
+        count = conn.execute("SELECT SUM(count) FROM sensor_rollups WHERE resolution = 600").fetchone()[0]
+        conn.close()
+        self.assertEqual((n, count), (10, 10))
+
+
+
+class TestAcquisitionEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+        def read_slow():
+            self.release.wait()
+            return {'temperature': 21.5}
+
+        def read_fast():
+            return {'temperature': 21.5}
+
+        self.engine = AcquisitionEngine(max_workers=2, deadline=0.2)
+        self.sensors = [SensorDriver('slow', read_slow), SensorDriver('fast1', read_fast),
+                        SensorDriver('fast2', read_fast, timeout=1.0)]
+
+    def tearDown(self):
+        self.release.set()
+        self.engine.close()
+
+    def test_epoch_clock_ignores_wall_clock_changes(self):
+        """Test that the anchored clock of the samples is not moved by a system clock adjustment."""
+        sample = self.engine.acquire(self.sensors[1:2])['fast1']
+        with patch('time.time_ns', return_value=0):
+            now = epoch_us()
+        self.assertLessEqual(sample.epoch_us, now)
+        self.assertLess(now - sample.epoch_us, 1_000_000)
+
+    def test_slow_sensor_is_missed(self):
+        """Test that a hanging sensor is marked missed without holding back the others."""
+        started = time.monotonic()
+        samples = self.engine.acquire(self.sensors)
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(list(samples), ['slow', 'fast1', 'fast2'])
+        self.assertTrue(samples['slow'].missed)
+        self.assertIsNone(samples['slow'].temperature)
+        self.assertEqual(samples['fast1'].temperature, 21.5)
+        self.assertFalse(samples['fast2'].missed)
+
+        # The hanging read is not resubmitted while it is still running
+        samples = self.engine.acquire(self.sensors)
+        self.assertTrue(samples['slow'].missed)
+        self.assertEqual(self.engine.missed['slow'], 2)
+
+        self.release.set()
+        time.sleep(0.05)
+        samples = self.engine.acquire(self.sensors)
+        self.assertEqual(samples['slow'].temperature, 21.5)
+        self.assertLessEqual(samples['fast1'].monotonic_ns, time.monotonic_ns())
+
+    def test_tick_shares_timestamp(self):
+        """Test that the samples of one tick share the tick's timestamp but keep their own read times."""
+        samples = self.engine.acquire(self.sensors)
+        self.assertEqual(len({sample.epoch_us for sample in samples.values()}), 1)
+        self.assertGreater(samples['slow'].monotonic_ns, samples['fast1'].monotonic_ns)
+
+
+
+class TestSampleBus(unittest.TestCase):
+
+    def test_one_read_per_tick(self):
+        """Test that every consumer sees the same frame while the sensors are read only once."""
+        reads = []
+
+        class Reader:
+            def acquire_samples(self, sensors=None):
+                reads.append(1)
+                engine = AcquisitionEngine()
+                try:
+                    return engine.acquire([SensorDriver('sensor1', lambda: {'temperature': 20.0})])
+                finally:
+                    engine.close()
+
+        bus = SampleBus()
+        received = []
+        bus.subscribe(received.append)
+        subscriptions = [bus.open_subscription(maxlen=2) for _ in range(3)]
+        loop = AcquisitionLoop(Reader(), bus)
+        for _ in range(3):
+            loop.acquire_once()
+
+        self.assertEqual(len(reads), 3)
+        self.assertEqual([frame.seq for frame in received], [1, 2, 3])
+        for subscription in subscriptions:
+            self.assertEqual(subscription.get(timeout=0).seq, 2)  # Oldest frame dropped
+            self.assertEqual(subscription.dropped, 1)
+            subscription.close()
+        self.assertEqual(bus.latest.temperatures(), {'sensor1': 20.0})
+        self.assertIs(received[-1], bus.latest)
+        self.assertEqual(bus.latest.epoch_us, bus.latest.samples[0].epoch_us)
+
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_wraparound_window(self):
+        """Test that only the newest samples are kept and windows are read in time order."""
+        buffer = SensorRingBuffer(5)
+        self.assertIsNone(buffer.latest())
+        for i in range(8):
+            buffer.append(i * 1_000_000, float(i))
+
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.latest(), (7_000_000, 7.0))
+        self.assertEqual(buffer.window(), ([3_000_000, 4_000_000, 5_000_000, 6_000_000, 7_000_000],
+                                           [3.0, 4.0, 5.0, 6.0, 7.0]))
+        self.assertEqual(buffer.window(5_500_000)[1], [6.0, 7.0])
+        self.assertEqual(buffer.window(8_000_000), ([], []))
+
+    def test_filled_by_read_path(self):
+        """Test that acquiring samples fills the recent readings of every sensor."""
+        reader = SensorReader(config_path='nonexistent.json')
+        reader.bind_read = lambda sensor: lambda: {'temperature': 20.5}
+        reader.registry.bind = reader.bind_read
+        reader.sensors = [{'id': 'sensor1'}]
+        reader.acquire_samples()
+        reader.acquire_samples()
+
+        self.assertEqual(reader.recent.window('sensor1')[1], [20.5, 20.5])
+        self.assertFalse(reader.recent.latest_frame['sensor1'].missed)
+        reader.acquisition.close()
+
+
+class TestSampleScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        read = lambda: {'temperature': 20.0}
+        self.scheduler = SampleScheduler(
+            [SensorDriver('fast', read, period=0.1), SensorDriver('slow', read, period=2.0, priority=5),
+             SensorDriver('default', read)],
+            default_period=1.0, clock=lambda: self.now)
+
+    def run_until(self, end, read_time=0.0):
+        """Simulate the scheduler loop on a fake clock, returns the groups that were read."""
+        groups = []
+        while self.scheduler.next_deadline() <= end:
+            self.now = max(self.now, self.scheduler.next_deadline())
+            started = self.now
+            due = self.scheduler.pop_due(started)
+            groups.append([entry[3].id for entry in sorted(due, key=lambda entry: entry[1])])
+            self.now += read_time
+            self.scheduler.complete(due, started, self.now)
+        return groups
+
+    def test_periods_and_coalescing(self):
+        """Test that every sensor is read at its own period and due sensors are read together."""
+        groups = self.run_until(2.0)
+        self.assertEqual(groups[0], ['slow', 'fast', 'default'])  # Priority first
+        report = self.scheduler.report()
+        self.assertEqual(report['fast']['reads'], 21)
+        self.assertEqual(report['default']['reads'], 3)
+        self.assertEqual(report['slow']['reads'], 2)
+        self.assertEqual(report['fast']['overruns'], 0)
+
+    def test_overrun_skips_deadlines(self):
+        """Test that a read longer than the period is reported and missed deadlines are skipped."""
+        self.run_until(1.0, read_time=0.35)
+        report = self.scheduler.report()
+        self.assertGreater(report['fast']['overruns'], 0)
+        self.assertLessEqual(report['fast']['reads'], 4)
+        self.assertGreater(report['default']['max_skew'], 0)
+
+
+
+@unittest.skipUnless(SIMULATOR_AVAILABLE, "numpy is required for the thermal simulator")
+class TestThermalSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.simulator = ThermalSimulator(ambient=20.0, noise=0.0, clock=lambda: self.now, seed=1)
+        self.simulator.add_nodes([f"sensor{i}" for i in range(500)])
+
+    def test_heating_and_cooling(self):
+        """Test that the duty cycle drives all nodes towards the matching steady state."""
+        total_loss = 2.0 + 500 * 0.01  # Air loss plus the small loss of every sensor node
+        self.simulator.set_duty(heating=100)
+        self.now = 20000.0
+        self.assertAlmostEqual(self.simulator.read('sensor0'), 20.0 + 60.0 / total_loss, delta=0.1)
+        self.assertTrue((self.simulator.read_all() > 28).all())
+
+        self.simulator.set_duty(heating=0, cooling=100)
+        self.now = 40000.0
+        self.assertAlmostEqual(self.simulator.read('sensor499'), 20.0 - 40.0 / total_loss, delta=0.1)
+
+    def test_sensor_lags_air(self):
+        """Test that sensor nodes follow the air with a delay and new sensors get their own node."""
+        self.simulator.set_duty(heating=100)
+        self.now = 5.0
+        temperatures = self.simulator.read_all()
+        self.assertGreater(temperatures[0], temperatures[1])
+        self.assertEqual(self.simulator.read('new sensor'), temperatures[0])
+        self.assertEqual(len(self.simulator.names), 502)
+
+
+
+class TestSensorRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.config_path = 'test_registry_config.json'
+        self.write_config([{"id": "sensor1", "type": "dht22", "pin": 4, "period": 2.0}])
+        self.registry = SensorRegistry(self.config_path, self.bind, check_interval=0)
+
+    def tearDown(self):
+        if os.path.exists(self.config_path):
+            os.remove(self.config_path)
+
+    @staticmethod
+    def bind(sensor):
+        if sensor.get('type') == 'unknown':
+            return None
+        return lambda: {'temperature': float(sensor['pin'])}
+
+    def write_config(self, config, mtime=None):
+        with open(self.config_path, 'w') as f:
+            json.dump(config, f)
+        if mtime is not None:
+            os.utime(self.config_path, (mtime, mtime))
+
+    def test_compile_and_reload(self):
+        """Test that the config is compiled once and recompiled only after the file changed."""
+        drivers = self.registry.get()
+        self.assertEqual(len(drivers), 1)
+        self.assertEqual((drivers[0].id, drivers[0].period, drivers[0].read()), ('sensor1', 2.0, {'temperature': 4.0}))
+        self.assertIs(self.registry.get(), drivers)
+
+        self.write_config([{"id": "sensor1", "pin": 4}, {"pin": 5}, {"id": "bad", "type": "unknown"},
+                           {"id": "sensor2", "pin": 17}], mtime=os.path.getmtime(self.config_path) + 10)
+        drivers = self.registry.get()
+        self.assertEqual([driver.id for driver in drivers], ['sensor1', 'sensor2'])
+        self.assertEqual(self.registry.version, 2)
+
+    def test_broken_config_keeps_drivers(self):
+        """Test that a config that fails to parse keeps the previous sensors."""
+        drivers = self.registry.get()
+        with open(self.config_path, 'w') as f:
+            f.write('[{"id": ')
+        os.utime(self.config_path, (os.path.getmtime(self.config_path) + 10,) * 2)
+        self.assertIs(self.registry.get(), drivers)
+
+    def test_missing_config_warns_once(self):
+        """Test that a missing config is reported once, and loaded once it appears."""
+        os.remove(self.config_path)
+        with patch('builtins.print') as printed:
+            for _ in range(3):
+                self.assertEqual(self.registry.get(), ())
+        self.assertEqual(printed.call_count, 1)
+
+        self.write_config([{"id": "sensor1", "pin": 4}])
+        self.assertEqual([driver.id for driver in self.registry.get()], ['sensor1'])
+
+
+
+class TestGraphTarget(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph('profile', [(0, 20), (10, 40), (30, 40), (40, 0)])
+
+    def test_target_lookup(self):
+        """Test interpolation between setpoints and holding the first/last setpoint outside them."""
+        self.assertEqual(self.graph.target_at(-1), 20)
+        self.assertEqual(self.graph.target_at(5), 30)
+        self.assertEqual(self.graph.target_at(20), 40)
+        self.assertEqual(self.graph.target_at(35), 20)
+        self.assertEqual(self.graph.target_at(100), 0)
+
+    def test_cursor_matches_bisect(self):
+        """Test that the cursor gives the same targets for monotone and backwards time."""
+        times = [t / 4 for t in range(-4, 180)] + [12.5, 3.0, 39.0]
+        self.assertEqual([self.graph.next_target(t) for t in times], [self.graph.target_at(t) for t in times])
+        self.assertEqual(self.graph.get_current_target(5), 30)
+
+    @unittest.skipUnless(COLUMNAR_AVAILABLE, "numpy is required to evaluate a graph over an array")
+    def test_evaluate_vector(self):
+        """Test that a whole vector of times is evaluated like single lookups."""
+        times = [t / 3 for t in range(-3, 150)]
+        self.assertEqual(list(self.graph.evaluate(times)), [self.graph.target_at(t) for t in times])
+
+    def test_recompiled_after_edit(self):
+        """Test that editing the setpoints updates the lookup."""
+        self.graph.add_setpoint(50, 10)
+        self.assertEqual(self.graph.target_at(45), 5)
+        self.graph.clear_setpoints()
+        self.assertIsNone(self.graph.target_at(45))
+
+
+
+class TestProfileValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GraphConfig(max_points=10, min_x=0, min_y=-10, max_y=120, max_rico=4)
+
+    def test_all_violations_reported(self):
+        """Test that every violating index is reported with its reason instead of only the first."""
+        setpoints = [(0, 20), (10, 30), (10, 30), (20, 200), (30, 30), (25, 30), (-1, 20), (40, float('nan'))]
+        violations = validate_profile(setpoints, self.config)
+        self.assertEqual([(v.index, v.reason) for v in violations], [
+            (2, 'time_not_increasing'),
+            (3, 'out_of_limits'),
+            (3, 'slope_too_steep'),
+            (4, 'slope_too_steep'),
+            (5, 'time_not_increasing'),
+            (6, 'out_of_limits'),
+            (6, 'time_not_increasing'),
+            (7, 'invalid_value'),
+        ])
+
+        graph = Graph('profile', setpoints)
+        self.assertFalse(graph.valid_dataset[0])
+        self.assertEqual(len(graph.violations), len(validate_profile(setpoints, graph.config)))
+
+    def test_valid_and_too_many_points(self):
+        """Test that a valid profile passes and the point limit is reported once."""
+        setpoints = [(i * 10, 20 + i) for i in range(11)]
+        self.assertEqual(validate_profile(setpoints[:10], self.config), [])
+        self.assertEqual([v.reason for v in validate_profile(setpoints, self.config)], ['too_many_points'])
+
+
+class TestGraphEditing(unittest.TestCase):
+
+    def test_edits_match_full_validation(self):
+        """Test that incremental edits leave the same state as building the profile from scratch."""
+        rng = random.Random(3)
+        graph = Graph('profile', [(i * 10, 20 + i % 5) for i in range(200)])
+        t = 0.0
+        for _ in range(300):
+            op = rng.random()
+            if op < 0.4:
+                graph.insert_setpoint(rng.uniform(0, 2000), rng.uniform(-20, 130))
+            elif op < 0.7:
+                graph.move_setpoint(rng.randrange(len(graph.setpoints)), rng.uniform(0, 2000), rng.uniform(0, 60))
+            else:
+                graph.delete_setpoint(rng.randrange(len(graph.setpoints)))
+            t += rng.uniform(0, 10)
+            reference = Graph('reference', graph.setpoints)
+            self.assertEqual(graph.next_target(t), reference.target_at(t))
+            self.assertEqual(graph.valid_dataset[0], reference.valid_dataset[0])
+
+        self.assertEqual(graph.setpoints, sorted(graph.setpoints))
+        self.assertEqual((graph.breakpoints, graph.slopes, graph.intercepts),
+                         (reference.breakpoints, reference.slopes, reference.intercepts))
+        self.assertEqual([(v.index, v.reason) for v in graph.violations],
+                         [(v.index, v.reason) for v in reference.violations])
+
+    def test_batch_edit_and_shared_copy(self):
+        """Test a batch of edits, local violations and that copies leave the original untouched."""
+        graph = Graph('profile', [(0, 20), (10, 30), (20, 30)])
+        graph.shared = True
+        edited = graph.copy()
+        indices = edited.apply_edits([{'op': 'insert', 'x': 15, 'y': 100},
+                                      {'op': 'move', 'index': 0, 'x': 5, 'y': 25},
+                                      {'op': 'delete', 'index': 3}])
+        self.assertEqual(indices, [2, 0, 3])
+        self.assertEqual(edited.setpoints, [(5.0, 25.0), (10.0, 30.0), (15.0, 100.0)])
+        self.assertFalse(edited.valid_dataset[0])
+        self.assertEqual([(v.index, v.reason) for v in edited.violations_at([2])], [(2, 'slope_too_steep')])
+        self.assertEqual(edited.target_at(12.5), 65.0)
+
+        edited.delete_setpoint(2)
+        self.assertEqual(edited.valid_dataset, (True, None))
+        self.assertEqual(graph.setpoints, [(0.0, 20.0), (10.0, 30.0), (20.0, 30.0)])
+        self.assertFalse(edited.shared)
+        with self.assertRaises(ValueError):
+            edited.apply_edits([{'op': 'rotate'}])
+        with self.assertRaises(ValueError):
+            edited.move_setpoint(0, 'soon', 25)
+        self.assertEqual(edited.setpoints, [(5.0, 25.0), (10.0, 30.0)])
+
+    def test_undo_restores_profile(self):
+        """Test that undoing a batch restores the setpoints, lookup and validation in place."""
+        graph = Graph('profile', [(0, 20), (10, 30), (20, 30)])
+        before = (list(graph.setpoints), list(graph.slopes), list(graph.intercepts), graph.valid_dataset)
+        undo_log = []
+        graph.apply_edits([{'op': 'insert', 'x': 15, 'y': 100}, {'op': 'move', 'index': 0, 'x': 5, 'y': 25},
+                           {'op': 'delete', 'index': 3}], undo_log)
+        self.assertFalse(graph.valid_dataset[0])
+        graph.undo(undo_log)
+
+        self.assertEqual(undo_log, [])
+        self.assertEqual((graph.setpoints, graph.slopes, graph.intercepts, graph.valid_dataset), before)
+
+    def test_edit_profile_keeps_invalid_draft(self):
+        """Test that an invalid edit is kept as a draft for every chamber but not activated."""
+        graph = Graph('profile', [(0, 20), (10, 30), (20, 30)])
+        controller = SimpleNamespace(running=True, desired_graph=graph)
+        controller.set_desired_graph = lambda new_graph: setattr(controller, 'desired_graph', new_graph)
+        chambers = [SimpleNamespace(desired_flow_graph=graph, controller=controller),
+                    SimpleNamespace(desired_flow_graph=graph, controller=SimpleNamespace(running=False))]
+        state = SimpleNamespace(desired_flow_graph=graph, chambers=chambers)
+
+        with patch('app.backend.services.temperature.app_state', state):
+            success, _, draft, indices = temperature_service.edit_profile([{'op': 'insert', 'x': 15, 'y': 100}])
+            self.assertFalse(success)
+            self.assertEqual(indices, [2])
+            self.assertIs(controller.desired_graph, graph)
+            self.assertEqual(len(graph.setpoints), 3)
+            self.assertEqual([chamber.desired_flow_graph for chamber in chambers], [draft, draft])
+
+            state.desired_flow_graph = draft
+            success, _, fixed, _ = temperature_service.edit_profile([{'op': 'delete', 'index': 2}])
+            self.assertTrue(success)
+            self.assertIs(fixed, draft)  # Edited in place, not copied
+            self.assertIs(controller.desired_graph, draft)
+
+            success, _, unchanged, _ = temperature_service.edit_profile([{'op': 'delete', 'index': 0},
+                                                                         {'op': 'delete', 'index': 9}])
+            self.assertFalse(success)
+            self.assertEqual(unchanged.setpoints, [(0.0, 20.0), (10.0, 30.0), (20.0, 30.0)])
+
+
+@unittest.skipUnless(SIMULATOR_AVAILABLE, "numpy is required for profile simplification")
+class TestProfileSimplification(unittest.TestCase):
+
+    def test_corners_kept_within_budget(self):
+        """Test that straight runs are dropped losslessly and dense profiles respect the budget."""
+        corners = [(0, 20), (100, 20), (110, 60), (500, 60), (520, -5), (900, -5)]
+        dense = [(x0 + (x1 - x0) * k / 100, y0 + (y1 - y0) * k / 100)
+                 for (x0, y0), (x1, y1) in zip(corners, corners[1:]) for k in range(100)] + [corners[-1]]
+        self.assertEqual(simplify_profile(dense, 20), [(float(x), float(y)) for x, y in corners])
+        self.assertEqual(simplify_profile(dense, 4), [(0.0, 20.0), (500.0, 60.0), (520.0, -5.0), (900.0, -5.0)])
+
+        wave = [(i, 20 + 10 * math.sin(i / 50)) for i in range(5000)]
+        for budget in (50, 1000):  # LTTB and RDP
+            simplified = simplify_profile(wave, budget)
+            self.assertEqual(len(simplified), budget)
+            self.assertEqual((simplified[0], simplified[-1]), (wave[0], wave[-1]))
+        for budget in (1, 2):  # Only the end points
+            self.assertEqual(simplify_profile(wave, budget), [wave[0], wave[-1]])
+
+    def test_cached_per_version(self):
+        """Test that the simplified profile is cached until the setpoints change."""
+        graph = Graph('profile', [(i, 20 + (i % 2)) for i in range(100)])
+        simplified = graph.simplified(10)
+        self.assertEqual(len(simplified), 10)
+        self.assertIs(graph.simplified(10), simplified)
+        graph.add_setpoint(200, 30)
+        self.assertIsNot(graph.simplified(10), simplified)
+        self.assertEqual(graph.simplified(10)[-1], (200.0, 30.0))
+
+
+class TestControlLoop(unittest.TestCase):
+
+    class Chamber:
+        def __init__(self):
+            self.heating = self.cooling = 0
+
+        def set_heating(self, duty):
+            self.heating = duty
+
+        def set_cooling(self, duty):
+            self.cooling = duty
+
+        def stop_all(self):
+            self.heating = self.cooling = 0
+
+    def setUp(self):
+        self.recent = SimpleNamespace(latest_frame=None)
+        self.chamber = self.Chamber()
+        self.logged = []
+        app = SimpleNamespace(database=SimpleNamespace(
+            recent=self.recent,
+            log_control_output=lambda chamber_id, epoch_us, output: self.logged.append(output)))
+        config = SimpleNamespace(kp=1.0, ki=0.5, kd=0.0)
+        self.controller = ClimateChamberController(app, self.chamber, config, interval=0.02)
+        self.controller.set_desired_graph(Graph('profile', [(0, 30)]))
+
+    def sample(self, temperature, age=0.0):
+        now = time.monotonic()
+        monotonic_ns = int((now - age) * 1e9)
+        self.recent.latest_frame = {ClimateChamberController.CONTROL_SENSOR: Sample(
+            ClimateChamberController.CONTROL_SENSOR, temperature, monotonic_ns, 0, temperature is None)}
+        return now
+
+    def test_control_step_uses_monotonic_dt(self):
+        """Test that control runs on the latest reading with monotonic dt and skips stale readings."""
+        self.controller.interval = 1.0
+        now = self.sample(20.0)
+        self.assertIsNone(self.controller.control_step(now))  # Control not started
+        self.controller.start_control()
+        self.assertEqual(self.controller.control_step(now), 10.0 + 0.5 * 10.0)  # First step uses dt = 1
+        self.assertEqual(self.controller.control_step(now + 0.5), 10.0 + 0.5 * 15.0)
+        self.assertEqual(self.chamber.heating, 17.5)
+        self.assertEqual(self.controller.control_info['control_error'], 10.0)
+
+        self.assertEqual(self.logged, [15.0, 17.5])
+        self.controller.control_step(now + 1.0)
+        self.assertEqual(self.logged[-1], 10.0 + 0.5 * 20.0)
+
+        now = self.sample(20.0, age=10.0)
+        self.assertIsNone(self.controller.control_step(now))
+        self.controller.stop_control()
+        self.assertEqual((self.chamber.heating, self.controller.control_info), (0, {}))
+
+    def test_fixed_rate_without_streams(self):
+        """Test that the loop ticks at its own fixed rate with nobody streaming."""
+        self.sample(20.0)
+        self.controller.start_control()
+        with patch.object(self.controller, 'control_step', side_effect=lambda now: time.sleep(0.005)):
+            started = time.monotonic()
+            self.controller.start_control_loop()
+            time.sleep(0.2)
+            self.controller.stop_control_loop()
+            elapsed = time.monotonic() - started
+        expected = elapsed / self.controller.interval
+        self.assertLessEqual(abs(self.controller.ticks + self.controller.overruns - expected), 2)
+
+
+class TestStreamHub(unittest.TestCase):
+
+    def setUp(self):
+        self.active = True
+        self.hub = StreamHub(SampleBus(), lambda: {'sensor': 21.5}, lambda: self.active,
+                             interval=0.01, queue_size=3, stall_timeout=0.05)
+
+    def test_fanout_and_decimation(self):
+        """Test that an update is encoded once for all clients and slow clients skip old updates."""
+        fast, slow = self.hub.connect(), self.hub.connect()
+        with patch('app.backend.services.stream_hub.json.dumps', wraps=json.dumps) as dumps:
+            for i in range(5):
+                self.assertEqual(self.hub.broadcast({'i': i}), 2)
+                self.assertEqual(fast.get(0), f'data: {{"i": {i}}}\n\n'.encode())
+            self.assertEqual(dumps.call_count, 5)
+        self.assertEqual([slow.get(0) for _ in range(3)], [b'data: {"i": %d}\n\n' % i for i in (2, 3, 4)])
+        self.assertEqual(self.hub.stats()['dropped_events'], 2)
+
+        self.hub.broadcast({'i': 5})
+        slow.last_read -= 1
+        self.hub.drop_stalled()
+        self.assertTrue(slow.closed)
+        self.assertFalse(fast.closed)
+        self.assertEqual(self.hub.stats()['disconnected_slow'], 1)
+
+    def test_streams_end_when_stopped(self):
+        """Test that streams end with a stopped status once control stops."""
+        stream = self.hub.stream()
+        self.hub.start()
+        received = []
+        reader = threading.Thread(target=lambda: received.extend(stream), daemon=True)
+        reader.start()
+        time.sleep(0.05)
+        self.assertEqual(self.hub.stats()['clients'], 1)
+        self.active = False
+        reader.join(timeout=2)
+        self.hub.stop()
+        self.assertEqual(received[-1], StreamHub.STOPPED_EVENT)
+        self.assertEqual(self.hub.stats()['clients'], 0)
+        self.assertEqual(list(self.hub.stream()), [StreamHub.STOPPED_EVENT])
+
+    def test_channels(self):
+        """Test that updates only reach the clients of their channel."""
+        self.hub.add_channel('b', lambda: {'sensor': 30.0}, lambda: True)
+        default, other = self.hub.connect(), self.hub.connect('b')
+        self.assertEqual(self.hub.broadcast({'i': 1}, 'b'), 1)
+        self.assertEqual((default.get(0), other.get(0)), (None, b'data: {"i": 1}\n\n'))
+        self.assertEqual(self.hub.stats()['clients_per_channel'], {'None': 1, 'b': 1})
+        with self.assertRaises(KeyError):
+            self.hub.connect('unknown')
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_quantiles(self):
+        """Test that quantiles stay within the relative error of the HDR buckets."""
+        histogram = LatencyHistogram()
+        values = [1000 * i for i in range(1, 10001)]  # 1 us .. 10 ms
+        for value in values:
+            histogram.record(value)
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertLessEqual(abs(histogram.quantile(q) - exact) / exact, 1 / 16)
+        self.assertEqual(histogram.quantile(1.0), 10_000_000)
+        self.assertEqual((histogram.count, histogram.max), (10000, 10_000_000))
+
+    def test_prometheus_and_snapshot(self):
+        """Test the Prometheus text format and the JSON snapshot of all metric kinds."""
+        registry = MetricsRegistry(prefix='test')
+        registry.histogram('read_seconds', 'Read time', 'sensor', 'a"b').record(2_000_000)
+        with registry.timer('step_seconds', 'Step time'):
+            pass
+        registry.increment('missed_total', 2, 'Missed reads', 'sensor', 's1')
+        registry.gauge('queue_depth', lambda: 7, 'Queue depth')
+        registry.gauge('broken', lambda: 1 / 0)
+
+        text = registry.prometheus()
+        self.assertIn('# TYPE test_read_seconds summary', text)
+        self.assertIn('test_read_seconds{sensor="a\\"b",quantile="0.5"} 0.002000000', text)
+        self.assertIn('test_step_seconds_count 1', text)
+        self.assertIn('# TYPE test_missed_total counter\ntest_missed_total{sensor="s1"} 2', text)
+        self.assertIn('test_queue_depth 7', text)
+        self.assertNotIn('broken', text)
+
+        snapshot = json.loads(json.dumps(registry.snapshot()))
+        self.assertEqual(snapshot['histograms']['read_seconds']['a"b']['max'], 0.002)
+        self.assertEqual(snapshot['counters']['missed_total'], {'s1': 2})
+        self.assertEqual(snapshot['gauges']['queue_depth'], 7)
+
+
+@unittest.skipUnless(TUNER_AVAILABLE, "numpy is not installed")
+class TestPIDTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.plant = FirstOrderPlant(1000.0, 21.0, 0.0003, 0.0002, 0.0)
+        self.targets = [21.0] * 100 + [40.0] * 1500 + [10.0] * 1500
+
+    def test_simulation_matches_controller(self):
+        """Test that the simulation runs the controller's PID law."""
+        chamber = TestControlLoop.Chamber()
+        controller = ClimateChamberController(None, chamber, SimpleNamespace(kp=2.0, ki=0.1, kd=1.0))
+        temperature, expected = 21.0, []
+        for step, target in enumerate(self.targets[:200]):
+            controller.apply_control(temperature, target, now=float(step))
+            rate = min(chamber.heating, 100) * self.plant.heat_rate - min(chamber.cooling, 100) * self.plant.cool_rate
+            equilibrium = self.plant.ambient + self.plant.tau * rate
+            temperature = equilibrium + (temperature - equilibrium) * math.exp(-1 / self.plant.tau)
+            expected.append(temperature)
+        simulated = simulate(self.plant, self.targets[:200], 1.0, 2.0, 0.1, 1.0)
+        for a, b in zip(simulated, expected):
+            self.assertAlmostEqual(a, b, places=9)
+
+    def test_fit_plant_with_logged_output(self):
+        """Test that the plant is identified from readings and the logged control output."""
+        temperatures, outputs = [], []
+        temperature, integral, last_error = 21.0, 0.0, 0.0
+        for target in self.targets:
+            output, integral = pid_update(target - temperature, last_error, integral, 1.0, 4.0, 0.01, 0.0)
+            last_error = target - temperature
+            output = max(-100.0, min(100.0, output))
+            outputs.append(output)
+            rate = output * (self.plant.heat_rate if output > 0 else self.plant.cool_rate)
+            equilibrium = self.plant.ambient + self.plant.tau * rate
+            temperature = equilibrium + (temperature - equilibrium) * math.exp(-1 / self.plant.tau)
+            temperatures.append(temperature)
+        times = [step + 1.0 for step in range(len(temperatures))]
+        plant = fit_plant(times, temperatures, outputs, [float(step) for step in range(len(outputs))])
+        self.assertAlmostEqual(plant.tau, self.plant.tau, delta=50)
+        self.assertAlmostEqual(plant.ambient, self.plant.ambient, delta=0.5)
+        self.assertAlmostEqual(plant.heat_rate, self.plant.heat_rate, delta=0.00002)
+        self.assertAlmostEqual(plant.cool_rate, self.plant.cool_rate, delta=0.00002)
+
+    def test_tune_ranks_gains(self):
+        """Test that every gain set is evaluated and the results are sorted by score."""
+        results = tune(self.plant, self.targets, 1.0, ((1.0, 8.0), (0.0, 0.05), (0.0,)), max_workers=1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual([r.score for r in results], sorted(r.score for r in results))
+        self.assertEqual(results[0].kp, 8.0)  # The strongest gain tracks the steps best
+        self.assertLess(results[0].tracking_error, results[-1].tracking_error)
+
+    def test_tune_spawned_workers(self):
+        """Test that the spawned worker pool ranks the same as tuning in process."""
+        grid = ((1.0, 8.0), (0.0, 0.05), (0.0,))
+        self.assertEqual(tune(self.plant, self.targets, 1.0, grid, max_workers=2),
+                         tune(self.plant, self.targets, 1.0, grid, max_workers=1))
+
+    def test_tune_in_subprocess(self):
+        """Test that tuning in a separate interpreter returns the same ranking."""
+        grid = ((1.0, 8.0), (0.0, 0.05), (0.0,))
+        self.assertEqual(tune_in_subprocess(self.plant, self.targets, 1.0, grid, max_workers=2),
+                         tune(self.plant, self.targets, 1.0, grid, max_workers=1))
+
+
+class TestChamberManager(unittest.TestCase):
+
+    def setUp(self):
+        self.test_db_path = 'test_chambers_data.db'
+        self.config_path = 'test_chambers.json'
+        self.logger = TemperatureSensorLogger(db_path=self.test_db_path)
+        self.bus = SampleBus()
+        self.logger.app_state = SimpleNamespace(sample_bus=self.bus, provider_interval=1)
+        sensor_ids = [sensor.id for sensor in self.logger.sensors]
+        with open(self.config_path, 'w') as f:
+            json.dump({"chambers": [
+                {"id": "a", "sensors": sensor_ids[:1], "control_sensor": sensor_ids[0]},
+                {"id": "b", "name": "Chamber B", "sensors": sensor_ids[1:], "control_sensor": sensor_ids[1]},
+            ]}, f)
+        self.app_state = SimpleNamespace(database=self.logger, control_interval=0.05,
+                                         control_config_path='app/backend/config/control_config.json')
+        self.chambers = ChamberManager(self.app_state, self.config_path)
+
+    def tearDown(self):
+        for chamber in self.chambers:
+            chamber.controller.stop_control_loop()
+            if chamber.controller.running:
+                chamber.stop_cycle()
+        remove_columnar(self.logger)
+        for path in [self.test_db_path, self.config_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def count_rows(self, cycle_id):
+        conn = sqlite3.connect(self.test_db_path)
+        rows = dict(conn.execute("""
+            SELECT s.name, COUNT(*) FROM sensor_readings r JOIN sensors s ON s.sensor_key = r.sensor_key
+            WHERE r.cycle_id = ? GROUP BY s.name
+        """, (cycle_id,)))
+        conn.close()
+        return rows
+
+    def test_chambers_are_independent(self):
+        """Test that every chamber has its own controller and hardware and logs only its own sensors."""
+        a, b = self.chambers.get('a'), self.chambers.get('b')
+        self.assertIs(self.chambers.default, a)
+        self.assertEqual((a.name, b.name), ('a', 'Chamber B'))
+        self.assertIsNot(a.controller, b.controller)
+        self.assertIsNot(a.climate_chamber, b.climate_chamber)
+        self.assertEqual(b.controller.control_sensor, b.sensors[0])
+
+        a.desired_flow_graph = Graph('profile', [(0, 30)])
+        b.desired_flow_graph = Graph('profile', [(0, 10)])
+        a.start_cycle('cycle a')
+        b.start_cycle('cycle b')
+        cycle_a, cycle_b = self.logger.active_cycle_id('a'), self.logger.active_cycle_id('b')
+        self.assertEqual(b.status()['cycleName'], 'cycle b')
+        self.assertEqual(len(self.logger.writers()), 1)  # Single storage mode, one shared writer
+
+        loop = AcquisitionLoop(self.logger, self.bus)
+        loop.acquire_once()
+        a.stop_cycle()
+        self.assertFalse(a.controller.running)
+        self.assertTrue(b.controller.running)
+        loop.acquire_once()
+        self.logger.log_control_output('b', 1, 42.0)
+        b.stop_cycle()
+        self.assertEqual(self.logger.writers(), [])
+
+        # Control outputs are logged apart from the sensor readings
+        self.assertEqual(self.count_rows(cycle_a), {sensor_id: 1 for sensor_id in a.sensors})
+        self.assertEqual(self.count_rows(cycle_b), {sensor_id: 2 for sensor_id in b.sensors})
+        self.assertIn((1, 42.0), self.logger.query_control_output(cycle_b))
+
+    def test_default_chamber_without_config(self):
+        """Test that without a chambers config there is one chamber using every sensor."""
+        chambers = ChamberManager(self.app_state, 'missing_chambers.json')
+        chambers.default.controller.stop_control_loop()
+        self.assertEqual([chamber.id for chamber in chambers], [ChamberManager.DEFAULT_ID])
+        self.assertIsNone(chambers.default.sensors)
+        self.assertEqual(chambers.default.controller.control_sensor, ClimateChamberController.CONTROL_SENSOR)
+
+
+class TestConfigStore(unittest.TestCase):
+
+    def setUp(self):
+        self.config_path = 'test_graph_config.json'
+        self.config = {key: {"value": value} for key, value in
+                       (("max_points", 100), ("min_x", 0), ("min_y", -10), ("max_y", 120), ("max_rico", 4))}
+        with open(self.config_path, 'w') as f:
+            json.dump(self.config, f)
+
+    def tearDown(self):
+        if os.path.exists(self.config_path):
+            os.remove(self.config_path)
+
+    def test_parsed_once(self):
+        """Test that the typed config is cached until the file changes on disk."""
+        store = ConfigStore(check_interval=0)
+        config = store.get(self.config_path, GraphConfig.from_dict)
+        self.assertEqual(config.max_y, 120.0)
+        self.assertIs(store.get(self.config_path, GraphConfig.from_dict), config)
+
+        changes = []
+        store.subscribe(self.config_path, lambda path, data: changes.append(data['max_y']['value']))
+        self.config['max_y']['value'] = 90
+        with open(self.config_path, 'w') as f:
+            json.dump(self.config, f)
+        os.utime(self.config_path, (os.path.getmtime(self.config_path) + 10,) * 2)
+
+        self.assertEqual(store.get(self.config_path, GraphConfig.from_dict).max_y, 90.0)
+        self.assertEqual(changes, [90])
+
+    def test_save_config_invalidates(self):
+        """Test that writing through save_config is visible immediately and notifies subscribers."""
+        changes = []
+        self.assertEqual(config_store.get(self.config_path)['max_rico']['value'], 4)
+        config_store.subscribe(self.config_path, lambda path, data: changes.append(path))
+        save_config(self.config_path, {"max_rico": {"value": 2}})
+
+        self.assertEqual(Graph('profile', [(0, 20)], config_path=self.config_path).config.max_rico, 2.0)
+        self.assertEqual(len(changes), 1)
+
+
+
+class TestProfileLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = 'test_profiles.db'
+        self.library = ProfileLibrary(self.db_path, cache_size=2)
+
+    def tearDown(self):
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def test_deduplicated_and_persistent(self):
+        """Test that identical uploads share one stored profile that survives a restart."""
+        stored, profile_hash, graph = self.library.store('qualification', [(0, 20), (10, '30'), (20, 30)])
+        self.assertTrue(stored)
+        again = self.library.store('copy', [('0', 20.0), (10.0, 30), (20, 30.0)])
+        self.assertEqual(again[1], profile_hash)
+        self.assertIs(again[2], graph)
+        self.assertIs(self.library.load('copy'), graph)
+
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0], 1)
+        conn.close()
+
+        reopened = ProfileLibrary(self.db_path)
+        with patch('app.backend.models.graph.validate_profile') as validate:
+            loaded = reopened.load('qualification')
+            validate.assert_not_called()
+        self.assertEqual(loaded.setpoints, [(0.0, 20.0), (10.0, 30.0), (20.0, 30.0)])
+        self.assertEqual(loaded.target_at(5), 25.0)
+
+        self.assertTrue(reopened.delete('qualification'))
+        self.assertEqual([profile['name'] for profile in reopened.list_profiles()], ['copy'])
+        self.assertTrue(reopened.delete('copy'))
+        self.assertIsNone(reopened.load('copy'))
+
+    def test_invalid_not_stored_and_lru(self):
+        """Test that invalid profiles are rejected and the cache keeps the most recently used graphs."""
+        stored, profile_hash, graph = self.library.store('bad', [(0, 20), (1, 100)])
+        self.assertFalse(stored)
+        self.assertEqual(graph.violations[0].reason, 'slope_too_steep')
+        self.assertIsNone(self.library.load('bad'))
+
+        for i in range(3):
+            self.library.store(f'p{i}', [(0, 20 + i)])
+        self.assertEqual(len(self.library._cache), 2)
+        self.assertIsNotNone(self.library.load('p0'))  # Rebuilt from the database
+        self.assertEqual(len(self.library._cache), 2)
+
+    def test_revalidated_after_config_change(self):
+        """Test that stored profiles are validated again once the graph config changed."""
+        config_path = 'test_profile_graph_config.json'
+        shutil.copy('app/backend/config/graph_config.json', config_path)
+        try:
+            library = ProfileLibrary(self.db_path, config_path=config_path)
+            self.assertTrue(library.store('ramp', [(0, 20), (10, 50)])[0])  # 3 degrees per second
+
+            config = config_store.get(config_path)
+            save_config(config_path, {**config, 'max_rico': {**config['max_rico'], 'value': 2}})
+            config_store.invalidate(config_path)
+            reopened = ProfileLibrary(self.db_path, config_path=config_path)
+            for current in (library, reopened):
+                graph = current.load('ramp')
+                self.assertFalse(graph.valid_dataset[0])
+                self.assertEqual(graph.violations[0].reason, 'slope_too_steep')
+        finally:
+            os.remove(config_path)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
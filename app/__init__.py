@@ -12,9 +12,15 @@ def create_app():
     from app.routes.main import main_bp
     from app.routes.setup_graph import graph_bp
     from app.routes.climate_chamber_control import sensor_bp
+    from app.routes.export import export_bp
+    from app.routes.chambers import chambers_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(graph_bp)
     app.register_blueprint(sensor_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(chambers_bp)
 
+    # Background threads start with the app, not when the app package is imported
+    app_state.start()
     return app
\ No newline at end of file
@@ -1,32 +1,60 @@
-import json
+import threading
 import time
-from datetime import datetime
-import asyncio
+
+from database.Metrics import metrics
+from database.PIDTuner import pid_update
 
 
 class ClimateChamberController:
     """Handles the control logic of the climate chamber separately from hardware management."""
+    # Sensor whose reading is regulated towards the desired graph
+    CONTROL_SENSOR = 'Climate chamber temperature'
+    # Readings older than this many control intervals are not used for control
+    STALE_INTERVALS = 5
 
-    def __init__(self, app_state, climate_chamber, config):
+    def __init__(self, app_state, climate_chamber, config, interval=1.0, control_sensor=CONTROL_SENSOR,
+                 chamber_id=None):
         """Initialize the controller with the climate chamber instance and config."""
         self.app_state = app_state
         self.chamber = climate_chamber
         self.config = config
+        self.interval = interval
+        self.control_sensor = control_sensor
+        self.chamber_id = chamber_id
         self.running = False
         self.desired_graph = None
+        self.started_at = None  # Monotonic start of the running profile
 
-        # PID controller state
+        # PID controller state, last_time is on the monotonic clock
         self.last_error = 0
         self.integral = 0
         self.last_time = None
 
+        # Control info of the latest tick, added to the streamed data
+        self.control_info = {}
+        self.ticks = 0
+        self.overruns = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Every chamber has its own series, labelled with the chamber id
+        label = {'label': 'chamber', 'label_value': chamber_id}
+        self._pid_histogram = metrics.histogram('pid_compute_seconds', 'Duration of the PID computation', **label)
+        self._actuator_histogram = metrics.histogram('actuator_write_seconds', 'Duration of the heating/cooling writes',
+                                                     **label)
+        self._step_histogram = metrics.histogram('control_step_seconds', 'Duration of one control step', **label)
+        self._lateness_histogram = metrics.histogram('control_tick_lateness_seconds',
+                                                     'Delay between the scheduled and actual start of a control tick',
+                                                     **label)
+
     def set_desired_graph(self, graph):
         """Set the desired temperature profile."""
         print("Desired flow graph set for climate chamber control")
         self.desired_graph = graph
 
-    def apply_control(self, current_temp, target_temp):
-        """Apply PID control based on current and target temperatures."""
+    def apply_control(self, current_temp, target_temp, now=None):
+        """Apply PID control based on current and target temperatures, now is a time.monotonic() value."""
+        started = time.perf_counter_ns()
         error = target_temp - current_temp
 
         # Get PID coefficients from config
@@ -34,25 +62,17 @@ class ClimateChamberController:
         ki = self.config.ki
         kd = self.config.kd
 
-        # Calculate time delta for integral and derivative terms
-        current_time = datetime.now()
+        # Calculate time delta for integral and derivative terms, immune to wall clock adjustments
+        current_time = time.monotonic() if now is None else now
         if self.last_time is None:
             dt = 1.0  # Default to 1 second on first run
         else:
-            dt = (current_time - self.last_time).total_seconds()
+            dt = current_time - self.last_time
 
-        # Update integral term (with anti-windup)
-        self.integral += error * dt
-        self.integral = max(-100, min(100, self.integral))  # Prevent integral windup
-
-        # Calculate derivative term
-        if dt > 0:
-            derivative = (error - self.last_error) / dt
-        else:
-            derivative = 0
-
-        # Calculate PID output
-        output = kp * error + ki * self.integral + kd * derivative
+        # Calculate PID output, the integral term is limited to prevent windup
+        output, self.integral = pid_update(error, self.last_error, self.integral, dt, kp, ki, kd)
+        computed = time.perf_counter_ns()
+        self._pid_histogram.record(computed - started)
 
         # Apply control based on whether we need heating or cooling
         if output > 0:
@@ -63,6 +83,7 @@ class ClimateChamberController:
             # Need cooling
             self.chamber.set_heating(0)
             self.chamber.set_cooling(abs(output))
+        self._actuator_histogram.record(time.perf_counter_ns() - computed)
 
         # Update state for next iteration
         self.last_error = error
@@ -70,46 +91,87 @@ class ClimateChamberController:
 
         return output
 
-    def start_sensor_stream(self):
-        """Start the sensor data stream."""
+    def start_control(self):
+        """Start regulating the chamber towards the desired graph."""
+        self.last_error = 0
+        self.integral = 0
+        self.last_time = None
+        self.started_at = time.monotonic()
         self.running = True
-        self.last_time = datetime.now()  # Initialize timestamp
-        print("\nClimateChamberController: Sensor stream started.")
+        print(f"\nClimateChamberController: Control started{self._chamber_suffix()}.")
 
-    def stop_sensor_stream(self):
-        """Stop the sensor data stream."""
+    def stop_control(self):
+        """Stop regulating the chamber, this also ends the sensor streams."""
         self.running = False
-        print("\nClimateChamberController: Sensor stream stopped.")
+        self.control_info = {}
+        print(f"\nClimateChamberController: Control stopped{self._chamber_suffix()}.")
         self.chamber.stop_all()  # Ensure all actuators are off
 
-    def sensor_data_provider(self):
-        """Generator function for Server-Sent Events (SSE)."""
-        #TODO
-        # Generator is currently called by stream to supply it with sensor values.
-        # The stream object should rather start an separate task that starts the regulation process based on the provided desired graph (in app_state)
+    def start_control_loop(self):
+        """Start the control thread, does nothing if it is already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.__control_loop, daemon=True)
+        self._thread.start()
+        print(f"ClimateChamberController: Control loop started (interval={self.interval}s){self._chamber_suffix()}")
+
+    def stop_control_loop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def control_step(self, now):
+        """One control tick: regulate the control sensor's latest reading towards the current target."""
+        if not self.running or not self.desired_graph:
+            return None
+        samples = self.app_state.database.recent.latest_frame or {}
+        sample = samples.get(self.control_sensor)
+        if sample is None or sample.temperature is None:
+            return None
+        if now - sample.monotonic_ns / 1e9 > self.STALE_INTERVALS * self.interval:
+            return None  # The sensor stopped delivering, keep the actuators as they are
+        target_temp = self.desired_graph.get_current_target(now - self.started_at)
+        output = self.apply_control(sample.temperature, target_temp, now)
+        self.control_info = {'target_temperature': target_temp, 'control_error': target_temp - sample.temperature}
+        self.log_output(output)
+        return output
 
-        while self.running:
+    def log_output(self, output):
+        """Log the applied output with the chamber's cycle, so the chamber can be identified from it."""
+        # The chamber clamps the duty cycles to 0-100%
+        applied = max(-100.0, min(100.0, output))
+        self.app_state.database.log_control_output(self.chamber_id, time.time_ns() // 1000, applied)
+
+    def __control_loop(self):
+        """Background process running control_step at a fixed rate.
+
+        Ticks are scheduled on a fixed grid of the monotonic clock, so the time a step
+        takes does not accumulate as drift. Ticks missed by a slow step are skipped rather
+        than run back to back, and counted in overruns.
+        """
+        next_tick = time.monotonic()
+        while True:
+            started = time.monotonic()
+            self._lateness_histogram.record(int((started - next_tick) * 1e9))
             try:
-                data = self.app_state.database.read_sensors()
-
-                #with open(self.app_state.sensor_data_path, 'r') as file:
-                #    data = json.load(file)
-
-                # If we have a desired temperature profile, apply control
-                if self.desired_graph and 'temperature' in data:
-                    current_temp = data['ClimateChamber temperature']
-                    target_temp = self.desired_graph.get_current_target()
-                    self.apply_control(current_temp, target_temp)
-
-                    # Add control info to the data
-                    data['target_temperature'] = target_temp
-                    data['control_error'] = target_temp - current_temp
-                    print("PID steering active")
-                print(f"Sending data to webpage {data}")
-                yield f"data: {json.dumps(data)}\n\n"
-            except (FileNotFoundError, json.JSONDecodeError) as e:
-                yield f"data: {{\"error\": \"Failed to read sensor data: {str(e)}\"}}\n\n"
-
-            time.sleep(self.app_state.provider_interval)
-
-        yield "data: {\"status\": \"stopped\"}\n\n"  # Send final message before stopping
\ No newline at end of file
+                self.control_step(started)
+            except Exception as e:
+                print(f"ClimateChamberController: Control step failed{self._chamber_suffix()}: {str(e)}")
+            self.ticks += 1
+
+            next_tick += self.interval
+            now = time.monotonic()
+            self._step_histogram.record(int((now - started) * 1e9))
+            if now > next_tick:
+                missed = int((now - next_tick) // self.interval) + 1
+                self.overruns += missed
+                metrics.increment('control_tick_overruns_total', missed, 'Control ticks skipped because a step overran',
+                                  'chamber', self.chamber_id)
+                next_tick += missed * self.interval
+            if self._stop_event.wait(next_tick - now):
+                break
+
+    def _chamber_suffix(self):
+        return f" (chamber {self.chamber_id})" if self.chamber_id is not None else ""
@@ -6,22 +6,18 @@ from app.backend.models.interfaces.IClimateChamber import *
 
 # Real implementation
 class ClimateChamber(IClimateChamber):
-    _instance = None  # Singleton instance
+    """One chamber's hardware, the pins come from the chamber config so one process can drive several."""
 
     # Define GPIO pins for heating and cooling
     HEAT_PIN = 18
     COOL_PIN = 23
     PWM_FREQUENCY = 1000
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(ClimateChamber, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self, sensorModule=None, peltierModule=None, fanModule=None):
-        self.sensorModule = SensorModule()
-        self.peltierModule = PeltierModule("Single", 12, 13)
-        self.fanModule = FanModule(10)
+    def __init__(self, heating_pin=12, cooling_pin=13, fan_pin=10, sensorModule=None, peltierModule=None,
+                 fanModule=None):
+        self.sensorModule = sensorModule or SensorModule()
+        self.peltierModule = peltierModule or PeltierModule("Single", heating_pin, cooling_pin)
+        self.fanModule = fanModule or FanModule(fan_pin)
 
     def cleanup(self):
         return
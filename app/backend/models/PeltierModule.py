@@ -5,13 +5,6 @@ from time import sleep
 from app.backend.models.interfaces.IPeltierModule import *
 
 class PeltierModule(IPeltierModule):
-    _instance = None  # Singleton instance
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(PeltierModule, cls).__new__(cls)
-        return cls._instance
-
     def __init__(self, name, heating_pin, cooling_pin):
         self.name = name
         self.heating_pin = heating_pin
@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from dataclasses import dataclass
 
+from app.backend.services.config_store import config_store
+
 
 @dataclass
 class PIDConfig:
@@ -19,23 +21,24 @@ class ConfigManager:
         self.config_path = Path(config_path)
         self.pid_config = PIDConfig()
         self.load_config()
+        # pid_config is updated in place, so the controller picks up edits to the file
+        config_store.subscribe(self.config_path, lambda path, data: self.load_config())
 
     def load_config(self):
-        """Load configuration from file."""
+        """Load configuration from the shared config store."""
         try:
-            with open(self.config_path, 'r') as f:
-                config_data = json.load(f)
+            config_data = config_store.get(self.config_path)
 
-                # Load PID configuration
-                self.pid_config.kp = float(config_data.get("kp", {}).get("value", 1.0))
-                self.pid_config.ki = float(config_data.get("ki", {}).get("value", 0.0))
-                self.pid_config.kd = float(config_data.get("kd", {}).get("value", 0.0))
-                self.pid_config.read_delay = float(config_data.get("sensor_read_delay", {}).get("value", 2.0))
+            # Load PID configuration
+            self.pid_config.kp = float(config_data.get("kp", {}).get("value", 1.0))
+            self.pid_config.ki = float(config_data.get("ki", {}).get("value", 0.0))
+            self.pid_config.kd = float(config_data.get("kd", {}).get("value", 0.0))
+            self.pid_config.read_delay = float(config_data.get("sensor_read_delay", {}).get("value", 2.0))
 
-                print(f"\nConfigManager: Loaded PID config - kp={self.pid_config.kp}, "
-                      f"ki={self.pid_config.ki}, kd={self.pid_config.kd}, "
-                      f"read_delay={self.pid_config.read_delay}")
-        except (FileNotFoundError, KeyError, json.JSONDecodeError, ValueError) as e:
+            print(f"\nConfigManager: Loaded PID config - kp={self.pid_config.kp}, "
+                  f"ki={self.pid_config.ki}, kd={self.pid_config.kd}, "
+                  f"read_delay={self.pid_config.read_delay}")
+        except (RuntimeError, KeyError, AttributeError, ValueError) as e:
             print(f"\nConfigManager: Error loading config: {str(e)}")
             print("Using default values")
 
@@ -72,5 +75,6 @@ class ConfigManager:
             with open(self.config_path, 'w') as f:
                 json.dump(config_data, f, indent=2)
                 print(f"\nConfigManager: Configuration saved to {self.config_path}")
+            config_store.invalidate(self.config_path)
         except (FileNotFoundError, PermissionError) as e:
             print(f"\nConfigManager: Error saving config: {str(e)}")
\ No newline at end of file
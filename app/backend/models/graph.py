@@ -1,8 +1,21 @@
+import copy
+import heapq
 import json
+import math
+import threading
+from bisect import bisect_right
+from itertools import chain
+from datetime import datetime
 from app import app_state
-from dataclasses import dataclass
+from app.backend.services.config_store import config_store
+from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List, Tuple, Union, Any
+from typing import List, Optional, Tuple, Union, Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 @dataclass
 class GraphConfig:
@@ -13,75 +26,518 @@ class GraphConfig:
     max_y: float
     max_rico: float
 
+    @classmethod
+    def from_dict(cls, config_data) -> 'GraphConfig':
+        """Build the typed config from the parsed graph_config.json"""
+        try:
+            return cls(
+                max_points=int(config_data["max_points"]["value"]),
+                min_x=float(config_data["min_x"]["value"]),
+                min_y=float(config_data["min_y"]["value"]),
+                max_y=float(config_data["max_y"]["value"]),
+                max_rico=float(config_data["max_rico"]["value"])
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise RuntimeError(f"Configuration error: {str(e)}")
+
+@dataclass
+class ProfileViolation:
+    """One problem found while validating a profile, index is the offending setpoint"""
+    index: int
+    reason: str
+    message: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# Fault bits of one setpoint, the segment checks are reported on the point ending the segment
+INVALID_VALUE = 1
+OUT_OF_LIMITS = 2
+TIME_NOT_INCREASING = 4
+SLOPE_TOO_STEEP = 8
+
+
+def point_faults(setpoints: List[Tuple[float, float]], i: int, config: GraphConfig) -> int:
+    """Fault bits of setpoint i and of the segment from setpoint i - 1 to it"""
+    x, y = setpoints[i]
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return INVALID_VALUE
+    faults = OUT_OF_LIMITS if x < config.min_x or y < config.min_y or y > config.max_y else 0
+    if i > 0:
+        x1, y1 = setpoints[i - 1]
+        if not (math.isfinite(x1) and math.isfinite(y1)):
+            return faults
+        if x <= x1:
+            faults |= TIME_NOT_INCREASING
+        elif abs((y - y1) / (x - x1)) > config.max_rico:
+            faults |= SLOPE_TOO_STEEP
+    return faults
+
+
+def profile_faults(setpoints: List[Tuple[float, float]], config: GraphConfig):
+    """Fault bits of every setpoint, computed with numpy array operations when available"""
+    if np is None:
+        return [point_faults(setpoints, i, config) for i in range(len(setpoints))]
+
+    if isinstance(setpoints, np.ndarray):
+        points = setpoints.astype(np.float64, copy=False).reshape(-1, 2)
+    else:
+        # fromiter over the flattened pairs is several times faster than asarray on a list of tuples
+        points = np.fromiter(chain.from_iterable(setpoints), dtype=np.float64, count=2 * len(setpoints)).reshape(-1, 2)
+    x, y = points[:, 0], points[:, 1]
+
+    faults = np.zeros(len(x), dtype=np.uint8)
+    finite = np.isfinite(x) & np.isfinite(y)
+    faults[~finite] |= INVALID_VALUE
+    faults[finite & ((x < config.min_x) | (y < config.min_y) | (y > config.max_y))] |= OUT_OF_LIMITS
+
+    dx = np.diff(x)
+    dy = np.diff(y)
+    segment = finite[1:] & finite[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.abs(dy / dx)
+    faults[1:][segment & ~(dx > 0)] |= TIME_NOT_INCREASING
+    faults[1:][segment & (dx > 0) & (slope > config.max_rico)] |= SLOPE_TOO_STEEP
+    return faults
+
+
+def profile_violations(setpoints: List[Tuple[float, float]], faults, config: GraphConfig,
+                       indices=None) -> List[ProfileViolation]:
+    """Turn fault bits into violations, for the given indices (default every faulty setpoint)"""
+    if indices is None:
+        indices = np.flatnonzero(faults) if np is not None and isinstance(faults, np.ndarray) else \
+            [i for i, fault in enumerate(faults) if fault]
+    violations = []
+    for i in indices:
+        i = int(i)
+        fault = faults[i]
+        if not fault:
+            continue
+        x, y = setpoints[i]
+        if fault & INVALID_VALUE:
+            violations.append(ProfileViolation(i, 'invalid_value', f"Punt {i} ({x}, {y}) is geen geldig getal."))
+        if fault & OUT_OF_LIMITS:
+            violations.append(ProfileViolation(i, 'out_of_limits', f"Punt {i} ({x}, {y}) ligt buiten de limieten."))
+        if fault & TIME_NOT_INCREASING:
+            violations.append(ProfileViolation(i, 'time_not_increasing',
+                                               f"Punten {i - 1} en {i} hebben een niet-realistische tijdssprong."))
+        if fault & SLOPE_TOO_STEEP:
+            x1, y1 = setpoints[i - 1]
+            violations.append(ProfileViolation(i, 'slope_too_steep',
+                                               f"Helling tussen punten {i - 1} en {i} is te groot: "
+                                               f"{abs((y - y1) / (x - x1))} > {config.max_rico}."))
+    return violations
+
+
+def validate_profile(setpoints: List[Tuple[float, float]], config: GraphConfig, faults=None) -> List[ProfileViolation]:
+    """Check a whole profile at once and return every violation, ordered by index.
+
+    Limits, strictly increasing time and the slope against max_rico are checked with
+    numpy array operations, so large profiles validate in milliseconds. Already computed
+    fault bits can be passed as faults.
+    """
+    violations = []
+    if len(setpoints) > config.max_points:
+        violations.append(ProfileViolation(config.max_points, 'too_many_points',
+                                           f"Dataset heeft te veel punten ({len(setpoints)} > {config.max_points})."))
+    if len(setpoints) == 0:
+        return violations
+    if faults is None:
+        faults = profile_faults(setpoints, config)
+    violations += profile_violations(setpoints, faults, config)
+    violations.sort(key=lambda violation: violation.index)
+    return violations
+
+
+# Profiles with more than this many points per point of budget are simplified with LTTB
+LTTB_MIN_RATIO = 8
+# Deviations (degrees) and slope differences (degrees/second) below this count as a straight line
+SIMPLIFY_TOLERANCE = 1e-9
+
+
+def simplify_profile(setpoints: List[Tuple[float, float]], budget: int) -> List[Tuple[float, float]]:
+    """Reduce a profile (sorted by time) to at most budget points for display, keeping its shape.
+
+    Points on straight segments are dropped first. Up to LTTB_MIN_RATIO points per budget
+    point the rest is reduced with a budgeted Ramer-Douglas-Peucker: starting from the end
+    points, the point deviating most from the current polyline is added until the budget is
+    used or the polyline is exact, so the corners of a setpoint profile survive. Denser
+    profiles use Largest-Triangle-Three-Buckets, which is linear in the number of points.
+    Without numpy the profile is returned unchanged.
+    """
+    budget = max(int(budget), 2)
+    if len(setpoints) <= budget or np is None:
+        return list(setpoints)
+    points = np.fromiter(chain.from_iterable(setpoints), dtype=np.float64, count=2 * len(setpoints)).reshape(-1, 2)
+    x, y = points[:, 0], points[:, 1]
+
+    # Points in the middle of a straight segment carry no shape, dropping them is lossless
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.diff(y) / np.diff(x)
+    corner = np.ones(len(x), dtype=bool)
+    corner[1:-1] = ~np.isclose(slope[1:], slope[:-1], rtol=0, atol=SIMPLIFY_TOLERANCE)
+    corners = np.flatnonzero(corner)
+    if len(corners) <= budget:
+        return [(float(x[i]), float(y[i])) for i in corners]
+    x, y = x[corners], y[corners]
+
+    # LTTB needs a bucket between the end points, a budget of 2 is just the end points
+    if budget > 2 and len(x) > LTTB_MIN_RATIO * budget:
+        indices = _simplify_lttb(x, y, budget)
+    else:
+        indices = _simplify_rdp(x, y, budget)
+    return [(float(x[i]), float(y[i])) for i in indices]
+
+
+def _simplify_rdp(x, y, budget: int) -> List[int]:
+    """Indices kept by Ramer-Douglas-Peucker with a point budget instead of a tolerance"""
+    def candidate(start, end):
+        # Largest vertical deviation (in degrees) from the line between start and end
+        if end - start < 2:
+            return None
+        inner = slice(start + 1, end)
+        span = x[end] - x[start]
+        line = y[start] + (y[end] - y[start]) * (x[inner] - x[start]) / span if span else y[start]
+        deviation = np.abs(y[inner] - line)
+        i = int(np.argmax(deviation))
+        return (-float(deviation[i]), start, end, start + 1 + i)
+
+    keep = [0, len(x) - 1]
+    heap = [candidate(0, len(x) - 1)]
+    while heap and len(keep) < budget:
+        deviation, start, end, i = heapq.heappop(heap)
+        if -deviation <= SIMPLIFY_TOLERANCE:
+            break  # The remaining points lie on the polyline
+        keep.append(i)
+        for segment in (candidate(start, i), candidate(i, end)):
+            if segment is not None:
+                heapq.heappush(heap, segment)
+    return sorted(keep)
+
+
+def _simplify_lttb(x, y, budget: int) -> List[int]:
+    """Indices kept by Largest-Triangle-Three-Buckets, only the end points for a budget of 2 or less"""
+    n = len(x)
+    if budget <= 2:
+        return [0, n - 1]
+    every = (n - 2) / (budget - 2)
+    keep = [0]
+    a = 0
+    for i in range(budget - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Twice the area of the triangle (a, candidate, next bucket average)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    return keep
+
+
 class Graph:
-    """Main graph model replicating original helper.py functionality"""
-    def __init__(self, name, setpoints: List[Tuple[Union[int, float, str], Union[int, float, str]]], config_path=app_state.graph_config_path):
+    """Main graph model replicating original helper.py functionality.
+
+    Setpoints can be edited in place with insert_setpoint, move_setpoint, delete_setpoint
+    and apply_edits. An edit keeps the setpoints in time order (an unsorted profile is
+    sorted by its first edit) and only rechecks the setpoints whose segments it touched, so
+    valid_dataset and the compiled lookup stay current at O(log n) per edit, plus a list
+    insert or delete. The full violation list is built on demand.
+    """
+    SIMPLIFIED_CACHE_SIZE = 8  # Display budgets kept per profile version
+    def __init__(self, name, setpoints: List[Tuple[Union[int, float, str], Union[int, float, str]]], config_path=app_state.graph_config_path,
+                 validate: bool = True):
         # Convert setpoints to float tuples
         self.name = name
         self.setpoints = [(float(x), float(y)) for x, y in setpoints]
         self.config = self._load_config(Path(config_path))
-        self.valid_dataset = self._validate_dataset()
+        self.shared = False  # Set for graphs cached by the profile library, copy() before editing those
+        self._lock = threading.RLock()
+        if validate:
+            self._validate_dataset()
+        else:
+            # Setpoints known to be valid, e.g. loaded from the profile library
+            self._fault_count = 0
+            self._faults = None
+            self._violations = []
+        self._compile()
 
     def _load_config(self, config_path: Path) -> GraphConfig:
-        """Load configuration from JSON file"""
+        """Load configuration from the shared config store (parsed once per file change)"""
         try:
-            with open(config_path, 'r') as f:
-                config_data = json.load(f)
-                f.close()
-                return GraphConfig(
-                    max_points=int(config_data["max_points"]["value"]),
-                    min_x=float(config_data["min_x"]["value"]),
-                    min_y=float(config_data["min_y"]["value"]),
-                    max_y=float(config_data["max_y"]["value"]),
-                    max_rico=float(config_data["max_rico"]["value"])
-                )
-
-        except (FileNotFoundError, KeyError, json.JSONDecodeError, ValueError) as e:
+            return config_store.get(config_path, GraphConfig.from_dict)
+        except RuntimeError as e:
             raise RuntimeError(f"Configuration error: {str(e)}")
 
-    def _validate_dataset(self) -> Tuple[bool, str]:
-        """Validate the temperature profile dataset"""
-        try:
-            # Check if the dataset exceeds the max number of points
-            if len(self.setpoints) > self.config.max_points:
-                return False, "Dataset heeft te veel punten."
-
-            # Check if all points are within the limits
-            for i, (x, y) in enumerate(self.setpoints):
-                if x < self.config.min_x or y < self.config.min_y or y > self.config.max_y:
-                    return False, f"Punt {i} ({x}, {y}) ligt buiten de limieten."
-
-            # Check if time progression and slope are realistic
-            for i in range(1, len(self.setpoints)):
-                x1, y1 = self.setpoints[i - 1]
-                x2, y2 = self.setpoints[i]
-                if x2 <= x1:
-                    return False, f"Punten {i - 1} en {i} hebben een niet-realistische tijdssprong."
-                slope = abs((y2 - y1) / (x2 - x1))
-                if slope > self.config.max_rico:
-                    return False, f"Helling tussen punten {i - 1} en {i} is te groot: {slope} > {self.config.max_rico}."
-
-            # If all checks pass
+    def _validate_dataset(self) -> None:
+        """Validate the whole dataset, counting the faulty setpoints"""
+        faults = profile_faults(self.setpoints, self.config)
+        self._fault_count = int(np.count_nonzero(faults)) if np is not None else sum(1 for fault in faults if fault)
+        self._faults = faults  # Reused by violations until the first edit
+        self._violations = None
+
+    @property
+    def violations(self) -> List[ProfileViolation]:
+        """Every violation of the current setpoints, built on demand and cached until the next edit"""
+        with self._lock:
+            if self._violations is None:
+                self._violations = validate_profile(self.setpoints, self.config, self._faults)
+            return self._violations
+
+    @property
+    def valid_dataset(self) -> Tuple[bool, Optional[str]]:
+        """(True, None) for a valid profile, else (False, message of the first violation)"""
+        if self._fault_count == 0 and len(self.setpoints) <= self.config.max_points:
             return True, None
-            
-        except (TypeError, ValueError) as e:
-            return False, f"Invalid data format: {str(e)}"
+        violations = self.violations
+        message = violations[0].message
+        if len(violations) > 1:
+            message += f" (en {len(violations) - 1} andere fouten)"
+        return False, message
+
+    def violations_at(self, indices) -> List[ProfileViolation]:
+        """Violations of the given setpoints only, e.g. the ones touched by an edit"""
+        with self._lock:
+            indices = sorted({i for i in indices if 0 <= i < len(self.setpoints)})
+            faults = {i: point_faults(self.setpoints, i, self.config) for i in indices}
+            return profile_violations(self.setpoints, faults, self.config, indices)
+
+    def _segment(self, i: int) -> Tuple[float, float]:
+        """Slope and intercept of segment i of the sorted setpoints"""
+        x, y = self.setpoints[i]
+        if i + 1 < len(self.setpoints) and self.setpoints[i + 1][0] > x:
+            slope = (self.setpoints[i + 1][1] - y) / (self.setpoints[i + 1][0] - x)
+        else:
+            slope = 0.0
+        return slope, y - slope * x
+
+    def _compile(self) -> None:
+        """Precompile the setpoints into sorted breakpoints with per-segment line coefficients.
+
+        Segment i covers breakpoints[i] <= t < breakpoints[i + 1] and evaluates to
+        intercepts[i] + slopes[i] * t. The last segment has slope 0, so the last setpoint
+        is held; times before the first setpoint get the first setpoint.
+        """
+        points = sorted(self.setpoints)
+        self._sorted = points == self.setpoints
+        self.breakpoints = [x for x, _ in points]
+        self.slopes = []
+        self.intercepts = []
+        for i, (x, y) in enumerate(points):
+            if i + 1 < len(points) and points[i + 1][0] > x:
+                slope = (points[i + 1][1] - y) / (points[i + 1][0] - x)
+            else:
+                slope = 0.0
+            self.slopes.append(slope)
+            self.intercepts.append(y - slope * x)
+        self._first_target = points[0][1] if points else None
+        self._cursor = 0
+        self._arrays = None
+        self._simplified = {}
+
+    def _changed(self) -> None:
+        """Drop everything derived from the setpoints that is rebuilt lazily"""
+        self._first_target = self.setpoints[0][1] if self.setpoints else None
+        self._arrays = None
+        self._simplified = {}
+        self._faults = None
+        self._violations = None
+
+    def _ensure_sorted(self) -> None:
+        """Sort an unsorted profile before editing it, with a full validation"""
+        if not self._sorted:
+            self.setpoints.sort()
+            self._validate_dataset()
+            self._compile()
+
+    def _faulty(self, i: int) -> int:
+        return 1 if 0 <= i < len(self.setpoints) and point_faults(self.setpoints, i, self.config) else 0
+
+    def target_at(self, t: float) -> Optional[float]:
+        """Target temperature at elapsed time t (seconds), O(log n) with bisect"""
+        with self._lock:
+            i = bisect_right(self.breakpoints, t) - 1
+            if i < 0:
+                return self._first_target
+            return self.intercepts[i] + self.slopes[i] * t
+
+    def next_target(self, t: float) -> Optional[float]:
+        """Target at elapsed time t for monotone t, O(1) amortized by walking a cursor forward"""
+        with self._lock:
+            breakpoints = self.breakpoints
+            i = self._cursor
+            if i >= len(breakpoints) or t < breakpoints[i]:
+                # Time went backwards (or no setpoints), fall back to a binary search
+                i = bisect_right(breakpoints, t) - 1
+                if i < 0:
+                    return self._first_target
+            else:
+                last = len(breakpoints) - 1
+                while i < last and t >= breakpoints[i + 1]:
+                    i += 1
+            self._cursor = i
+            return self.intercepts[i] + self.slopes[i] * t
+
+    def get_current_target(self, elapsed: Optional[float] = None) -> Optional[float]:
+        """Target at the given elapsed time, default the time since app_state.start_time"""
+        if elapsed is None:
+            start_time = app_state.start_time
+            elapsed = (datetime.now() - start_time).total_seconds() if start_time else 0.0
+        return self.next_target(elapsed)
+
+    def evaluate(self, times):
+        """Targets for a whole array of elapsed times at once (requires numpy)"""
+        if np is None:
+            raise RuntimeError("numpy is required to evaluate a graph over an array")
+        with self._lock:
+            if self._arrays is None:
+                self._arrays = (np.array(self.breakpoints, dtype=np.float64),
+                                np.array([x * s + b for x, s, b in zip(self.breakpoints, self.slopes, self.intercepts)],
+                                         dtype=np.float64))
+            breakpoints, values = self._arrays
+        # Linear interpolation between breakpoints, held constant before the first and after the last
+        return np.interp(np.asarray(times, dtype=np.float64), breakpoints, values)
+
+    def simplified(self, budget: int) -> List[Tuple[float, float]]:
+        """The profile reduced to at most budget points for display, cached until the setpoints change"""
+        with self._lock:
+            points = self._simplified.get(budget)
+            if points is None:
+                if len(self._simplified) >= self.SIMPLIFIED_CACHE_SIZE:
+                    self._simplified.clear()
+                points = self._simplified[budget] = simplify_profile(sorted(self.setpoints), budget)
+            return points
+
+    def insert_setpoint(self, x: Union[int, float, str], y: Union[int, float, str]) -> int:
+        """Insert a setpoint at its place in time and return its index"""
+        point = (float(x), float(y))
+        with self._lock:
+            self._ensure_sorted()
+            i = bisect_right(self.setpoints, point)
+            before = self._faulty(i)  # The setpoint after it gets a new segment
+            self.setpoints.insert(i, point)
+            self.breakpoints.insert(i, point[0])
+            self.slopes.insert(i, 0.0)
+            self.intercepts.insert(i, 0.0)
+            for j in (i - 1, i):
+                if j >= 0:
+                    self.slopes[j], self.intercepts[j] = self._segment(j)
+            self._fault_count += self._faulty(i) + self._faulty(i + 1) - before
+            if self._cursor >= i:
+                self._cursor += 1
+            self._changed()
+            return i
+
+    def delete_setpoint(self, index: int) -> Tuple[float, float]:
+        """Remove the setpoint at index and return it"""
+        with self._lock:
+            if not 0 <= index < len(self.setpoints):
+                raise IndexError("Invalid setpoint index")
+            if not self._sorted:
+                point = self.setpoints.pop(index)
+                self._ensure_sorted()
+                return point
+            before = self._faulty(index) + self._faulty(index + 1)
+            point = self.setpoints.pop(index)
+            del self.breakpoints[index], self.slopes[index], self.intercepts[index]
+            if index > 0:
+                self.slopes[index - 1], self.intercepts[index - 1] = self._segment(index - 1)
+            self._fault_count += self._faulty(index) - before
+            if self._cursor >= index:
+                self._cursor = max(self._cursor - 1, 0)
+            self._changed()
+            return point
+
+    def move_setpoint(self, index: int, x: Union[int, float, str], y: Union[int, float, str]) -> int:
+        """Move the setpoint at index to (x, y) and return its new index"""
+        # Parsed first, so a malformed coordinate leaves the setpoint where it was
+        x, y = float(x), float(y)
+        with self._lock:
+            self.delete_setpoint(index)
+            return self.insert_setpoint(x, y)
+
+    def apply_edits(self, edits: List[dict], undo_log: Optional[list] = None) -> List[int]:
+        """Apply a batch of edits in order, returning the index of every edited setpoint.
+
+        An edit is {"op": "insert", "x", "y"}, {"op": "move", "index", "x", "y"} or
+        {"op": "delete", "index"}; an index refers to the setpoints as left by the previous
+        edit. The batch stops at the first malformed edit, leaving the earlier ones applied.
+        Callers that need all-or-nothing pass an undo_log list, which collects the inverse
+        of every applied edit, and hand it to undo() to roll the batch back in place.
+        """
+        log = undo_log if undo_log is not None else []
+        indices = []
+        with self._lock:
+            for edit in edits:
+                op = edit.get('op')
+                if op == 'insert':
+                    i = self.insert_setpoint(edit['x'], edit['y'])
+                    log.append(('delete', i))
+                elif op == 'move':
+                    index = int(edit['index'])
+                    point = self.setpoints[index] if 0 <= index < len(self.setpoints) else None
+                    i = self.move_setpoint(index, edit['x'], edit['y'])
+                    log.extend((('insert', point), ('delete', i)))
+                elif op == 'delete':
+                    i = int(edit['index'])
+                    log.append(('insert', self.delete_setpoint(i)))
+                else:
+                    raise ValueError(f"Unknown edit operation '{op}'")
+                indices.append(i)
+        return indices
+
+    def undo(self, undo_log: list) -> None:
+        """Roll back the edits recorded by apply_edits, newest first, and empty the log.
+
+        Every step is an incremental edit again, so a rollback costs as much as the batch
+        did; a profile that was unsorted before the batch stays sorted.
+        """
+        with self._lock:
+            while undo_log:
+                op, arg = undo_log.pop()
+                if op == 'delete':
+                    self.delete_setpoint(arg)
+                else:
+                    self.insert_setpoint(*arg)
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Reentrant lock of the setpoints, held to apply, check and roll back an edit batch as one step"""
+        return self._lock
+
+    def copy(self) -> 'Graph':
+        """Independent copy with the same validation and compiled state, e.g. to edit a shared graph"""
+        with self._lock:
+            graph = copy.copy(self)
+            graph.setpoints = list(self.setpoints)
+            graph.breakpoints = list(self.breakpoints)
+            graph.slopes = list(self.slopes)
+            graph.intercepts = list(self.intercepts)
+            graph._simplified = dict(self._simplified)
+            graph._lock = threading.RLock()
+            graph.shared = False
+            return graph
 
     def add_setpoint(self, x: Union[int, float, str], y: Union[int, float, str]) -> None:
         """Add a new setpoint"""
-        self.setpoints.append((float(x), float(y)))
+        self.insert_setpoint(x, y)
 
     def remove_setpoint(self, index: int) -> None:
         """Remove setpoint by index"""
-        if 0 <= index < len(self.setpoints):
-            del self.setpoints[index]
-        else:
-            raise IndexError("Invalid setpoint index")
+        self.delete_setpoint(index)
 
     def clear_setpoints(self) -> None:
         """Clear all setpoints"""
-        self.setpoints.clear()
+        with self._lock:
+            self.setpoints.clear()
+            self._validate_dataset()
+            self._compile()
 
     def __str__(self) -> str:
         """String representation matching original"""
-        return f"Graph with setpoints: {self.setpoints}"
\ No newline at end of file
+        return f"Graph with setpoints: {self.setpoints}"
@@ -0,0 +1,123 @@
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SIMULATOR_AVAILABLE = np is not None
+
+
+class ThermalSimulator:
+    """Lumped-capacitance thermal model of the climate chamber.
+
+    Node 0 is the chamber air, which receives the Peltier heat (positive when heating,
+    negative when cooling) and loses heat to the ambient. Every sensor is its own node
+    with a small heat capacity, coupled to the air and weakly to the ambient:
+
+        C_i dT_i/dt = P_i + G_amb_i (T_amb - T_i) + G_air_i (T_air - T_i)
+
+    The heat a sensor node takes from the air is subtracted from the air node, so energy
+    is conserved. All nodes are advanced together with vectorized explicit Euler steps,
+    which are subdivided to stay below the stability limit of the fastest node.
+    """
+
+    AIR_NODE = 'air'
+
+    def __init__(self, ambient=21.0, air_capacitance=2000.0, air_loss=2.0, max_heating=60.0, max_cooling=40.0,
+                 sensor_capacitance=5.0, sensor_coupling=0.5, sensor_loss=0.01, noise=0.05,
+                 clock=time.monotonic, seed=None):
+        if np is None:
+            raise RuntimeError("numpy is required for the thermal simulator")
+        self.ambient = ambient
+        self.max_heating = max_heating
+        self.max_cooling = max_cooling
+        self.sensor_capacitance = sensor_capacitance
+        self.sensor_coupling = sensor_coupling
+        self.sensor_loss = sensor_loss
+        self.noise = noise
+        self.clock = clock
+        self.heating = 0.0  # Duty cycles in percent
+        self.cooling = 0.0
+
+        self.names = [self.AIR_NODE]
+        self.index = {self.AIR_NODE: 0}
+        self.temperature = np.array([ambient], dtype=np.float64)
+        self.capacitance = np.array([air_capacitance], dtype=np.float64)
+        self.ambient_loss = np.array([air_loss], dtype=np.float64)
+        self.air_coupling = np.array([0.0], dtype=np.float64)
+
+        self._rng = np.random.default_rng(seed)
+        self._last_update = self.clock()
+        self._lock = threading.Lock()
+
+    @property
+    def peltier_power(self):
+        """Net heat flow into the chamber air in watts."""
+        return self.heating / 100 * self.max_heating - self.cooling / 100 * self.max_cooling
+
+    def add_nodes(self, names):
+        """Add sensor nodes at the current air temperature, existing names are ignored."""
+        with self._lock:
+            names = [name for name in names if name not in self.index]
+            if not names:
+                return
+            for name in names:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+            count = len(names)
+            self.temperature = np.concatenate([self.temperature, np.full(count, self.temperature[0])])
+            self.capacitance = np.concatenate([self.capacitance, np.full(count, self.sensor_capacitance)])
+            self.ambient_loss = np.concatenate([self.ambient_loss, np.full(count, self.sensor_loss)])
+            self.air_coupling = np.concatenate([self.air_coupling, np.full(count, self.sensor_coupling)])
+
+    def set_duty(self, heating=None, cooling=None):
+        """Set the Peltier duty cycles (0-100%), the model is advanced up to now first."""
+        self.advance()
+        with self._lock:
+            if heating is not None:
+                self.heating = max(0.0, min(100.0, heating))
+            if cooling is not None:
+                self.cooling = max(0.0, min(100.0, cooling))
+
+    def step(self, dt):
+        """Advance the model by dt seconds of simulated time."""
+        with self._lock:
+            # Explicit Euler is stable for dt < C / G, keep a safety factor of two. The air
+            # node is coupled to every sensor node, so its conductance is the sum of them.
+            conductance = self.ambient_loss + self.air_coupling
+            conductance[0] += self.air_coupling.sum()
+            limit = 0.5 * np.min(self.capacitance / conductance)
+            steps = max(1, int(np.ceil(dt / limit)))
+            h = dt / steps
+            heat_in = np.zeros_like(self.temperature)
+            heat_in[0] = self.peltier_power
+            for _ in range(steps):
+                to_node = self.air_coupling * (self.temperature[0] - self.temperature)
+                flow = heat_in + self.ambient_loss * (self.ambient - self.temperature) + to_node
+                flow[0] -= to_node.sum()
+                self.temperature += h * flow / self.capacitance
+
+    def advance(self, now=None):
+        """Advance the model to the clock time now (default the current time)."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            dt = now - self._last_update
+            self._last_update = now
+        if dt > 0:
+            self.step(dt)
+
+    def read(self, name):
+        """Current temperature of a sensor node plus measurement noise, unknown sensors get a new node."""
+        if name not in self.index:
+            self.add_nodes([name])
+        self.advance()
+        with self._lock:
+            return float(self.temperature[self.index[name]] + self._rng.normal(0.0, self.noise))
+
+    def read_all(self):
+        """Temperatures of all nodes without noise, in node order."""
+        self.advance()
+        with self._lock:
+            return self.temperature.copy()
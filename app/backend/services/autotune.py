@@ -0,0 +1,144 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from database.PIDTuner import TUNER_AVAILABLE, DEFAULT_GRID, fit_plant, tune_in_subprocess
+from app.backend.services.profile_library import profile_library
+from app import app_state
+
+if TUNER_AVAILABLE:
+    import numpy as np
+
+# Readings per sensor loaded from the cycle to fit the plant
+FIT_POINTS = 20000
+# Seconds simulated after the last setpoint, so settling after the final step is scored too
+TAIL_SECONDS = 600
+# Number of ranked results returned
+TOP_RESULTS = 10
+
+
+def autotune_pid(cycle_id: int, profile_name: Optional[str] = None, apply: bool = False,
+                 grid=DEFAULT_GRID, max_workers: Optional[int] = None,
+                 chamber_id: Optional[str] = None) -> Tuple[bool, str, Dict[str, Any]]:
+    """Fit a plant to a logged cycle and rank PID gains on a profile, returns (ok, message, result).
+
+    The plant is fitted to the chamber's control sensor readings of the cycle, together
+    with the control output the controller logged with the cycle when available. The
+    gains are then simulated on the named stored profile (default the chamber's desired
+    graph), and with apply the best gains are written to the chamber's control config.
+    """
+    if not TUNER_AVAILABLE:
+        return False, "numpy is required for PID tuning", {}
+    chamber = app_state.chambers.default if chamber_id is None else app_state.chambers.get(chamber_id)
+    if chamber is None:
+        return False, f"Chamber '{chamber_id}' not found", {}
+    controller = chamber.controller
+    sensor = controller.control_sensor
+
+    if profile_name:
+        graph = profile_library.load(profile_name)
+        if graph is None:
+            return False, f"Profile '{profile_name}' not found", {}
+    else:
+        graph = chamber.desired_flow_graph
+        if graph is None:
+            return False, "No desired graph set", {}
+
+    readings = app_state.database.query_cycle(cycle_id, FIT_POINTS, sensor_names=[sensor])['series'].get(sensor)
+    if not readings or len(readings) < 10:
+        return False, f"Cycle {cycle_id} has too few readings of '{sensor}' to fit a plant", {}
+
+    # Series rows are (epoch us, min, max, mean, count)
+    start = readings[0][0]
+    times = [(row[0] - start) / 1e6 for row in readings]
+    temperatures = [row[3] for row in readings]
+    # Output rows are (epoch us, output)
+    outputs = app_state.database.query_control_output(cycle_id)
+    try:
+        plant = fit_plant(times, temperatures,
+                          [row[1] for row in outputs] if outputs else None,
+                          [(row[0] - start) / 1e6 for row in outputs] if outputs else None,
+                          delay=app_state.provider_interval)
+    except ValueError as e:
+        return False, str(e), {}
+
+    dt = controller.interval
+    targets = graph.evaluate(np.arange(0.0, max(graph.breakpoints) + TAIL_SECONDS, dt))
+    # In its own interpreter, so the worker processes do not import the server
+    results = tune_in_subprocess(plant, targets, dt, grid, initial=temperatures[0], max_workers=max_workers)
+    best = results[0]
+    print(f"Autotune: Best gains for cycle {cycle_id} of chamber {chamber.id} - "
+          f"kp={best.kp}, ki={best.ki}, kd={best.kd}, score={best.score:.3f}")
+
+    if apply:
+        pid_config = chamber.config_manager.pid_config
+        pid_config.kp, pid_config.ki, pid_config.kd = best.kp, best.ki, best.kd
+        chamber.config_manager.save_config()
+
+    return True, "Gains applied" if apply else "Gains ranked", {
+        'plant': plant._asdict(),
+        'fitted_with_output': bool(outputs),
+        'evaluated': len(results),
+        'results': [result._asdict() for result in results[:TOP_RESULTS]],
+    }
+
+
+class AutotuneJobs:
+    """Runs autotune_pid as background jobs, one at a time, and keeps their status.
+
+    A job takes as long as the whole grid takes to simulate, too long for a request, so
+    the route submits it and clients poll its status. Jobs run one after another because
+    each already uses every core; the last MAX_JOBS jobs are kept.
+    """
+    MAX_JOBS = 20
+
+    def __init__(self):
+        self._jobs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='autotune')
+
+    def submit(self, cycle_id: int, profile_name: Optional[str] = None, apply: bool = False,
+               chamber_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue an autotune run and return its status."""
+        with self._lock:
+            job_id = next(self._ids)
+            job = self._jobs[job_id] = {
+                "jobId": job_id,
+                "status": "queued",
+                "cycleId": cycle_id,
+                "chamberId": chamber_id,
+                "submitted": time.time(),
+                "finished": None,
+                "message": None,
+                "result": None,
+            }
+            while len(self._jobs) > self.MAX_JOBS:
+                self._jobs.popitem(last=False)
+        self._executor.submit(self.__run, job, cycle_id, profile_name, apply, chamber_id)
+        return dict(job)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Status of a job, None if it is unknown (or no longer kept)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def __run(self, job, cycle_id, profile_name, apply, chamber_id):
+        """Background process running one job."""
+        with self._lock:
+            job["status"] = "running"
+        try:
+            ok, message, result = autotune_pid(cycle_id, profile_name, apply, chamber_id=chamber_id)
+        except Exception as e:
+            ok, message, result = False, f"Autotune failed: {str(e)}", None
+        with self._lock:
+            job.update(status="done" if ok else "failed", message=message, result=result or None,
+                       finished=time.time())
+
+
+# Single instance for the application
+autotune_jobs = AutotuneJobs()
@@ -0,0 +1,184 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from app.backend.services.config_store import config_store
+
+
+class Chamber:
+    """One climate chamber: its hardware, PID config, controller, profile and logging cycle.
+
+    sensors lists the ids of the sensors in the chamber, None means every configured
+    sensor (the single chamber setup). Readings come from the app's shared acquisition
+    loop, they are only filtered per chamber.
+    """
+
+    def __init__(self, chamber_id: str, name: str, sensors: Optional[List[str]], database, climate_chamber,
+                 config_manager, controller):
+        self.id = chamber_id
+        self.name = name
+        self.sensors = sensors
+        self.database = database
+        self.climate_chamber = climate_chamber
+        self.config_manager = config_manager
+        self.controller = controller
+        self.desired_flow_graph = None
+        self.start_time = None
+        self.cycle_name = None
+
+    def start_cycle(self, cycle_name: Optional[str] = None, logging: bool = True) -> Optional[str]:
+        """Start regulating towards the desired graph and, with logging, a logging cycle of the chamber's sensors."""
+        self.start_time = datetime.now()
+        self.cycle_name = None
+        if logging:
+            self.cycle_name = cycle_name or "Temperature cycle " + self.start_time.strftime("%d%m%Y-%H:%M:%S")
+            self.database.start_chamber_cycle(self.id, self.cycle_name, self.sensors)
+        self.controller.set_desired_graph(self.desired_flow_graph)
+        self.controller.start_control()
+        return self.cycle_name
+
+    def stop_cycle(self) -> None:
+        """Stop control (this also ends the chamber's streams) and its logging cycle."""
+        self.controller.stop_control()
+        self.start_time = None
+        self.database.stop_chamber_cycle(self.id)
+
+    def latest_samples(self) -> Dict[str, object]:
+        """Latest acquired Sample of every sensor of the chamber."""
+        latest = self.database.recent.latest_frame or {}
+        if self.sensors is None:
+            return dict(latest)
+        return {sensor_id: latest[sensor_id] for sensor_id in self.sensors if sensor_id in latest}
+
+    def stream_snapshot(self) -> Dict[str, object]:
+        """Data of one stream update: the newest value of every sensor plus the control info."""
+        data = {sensor_id: sample.temperature for sensor_id, sample in self.latest_samples().items()}
+        data.update(self.controller.control_info)
+        return data
+
+    def status(self) -> Dict[str, object]:
+        pid_config = self.config_manager.pid_config
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sensors": self.sensors,
+            "controlSensor": self.controller.control_sensor,
+            "running": self.controller.running,
+            "cycleName": self.cycle_name,
+            "cycleId": self.database.active_cycle_id(self.id),
+            "startTime": self.start_time.isoformat() if self.start_time else None,
+            "pid": {"kp": pid_config.kp, "ki": pid_config.ki, "kd": pid_config.kd},
+            **self.controller.control_info,
+        }
+
+
+class ChamberManager:
+    """Creates the chambers of one process from the chambers config.
+
+    The config file holds {"chambers": [...]}, every entry with an "id" and optionally a
+    "name", the "sensors" of the chamber, its "control_sensor", its own "control_config"
+    file and the "heating_pin", "cooling_pin" and "fan_pin" of its hardware. Without the
+    file there is a single chamber DEFAULT_ID using every sensor and the app's control
+    config, which is the setup of one chamber per server.
+
+    Every chamber gets its own hardware object, PID config, controller (with its own
+    control thread), profile and logging cycle. They share the app's acquisition loop and
+    sample bus, the database and its sample writer, and the stream hub, where every
+    chamber is one channel.
+    """
+    DEFAULT_ID = 'default'
+
+    def __init__(self, app_state, config_path):
+        self.app_state = app_state
+        self.config_path = config_path
+        self._chambers: Dict[str, Chamber] = {}
+        for entry in self.load_config():
+            self.add(entry)
+
+    def load_config(self) -> List[Dict[str, object]]:
+        """Chamber entries of the config file, the default chamber if there is none."""
+        if not os.path.exists(self.config_path):
+            return [{"id": self.DEFAULT_ID, "name": "Climate chamber"}]
+        entries = config_store.get(self.config_path).get("chambers", [])
+        if not entries:
+            raise RuntimeError(f"No chambers configured in {self.config_path}")
+        ids = [str(entry["id"]) for entry in entries]
+        if len(set(ids)) != len(ids):
+            raise RuntimeError(f"Duplicate chamber ids in {self.config_path}")
+        return entries
+
+    def add(self, entry: Dict[str, object]) -> Chamber:
+        """Create a chamber from its config entry, its control loop runs from start() on."""
+        chamber_id = str(entry["id"])
+        sensors = entry.get("sensors")
+        config_manager = self._create_config_manager(entry)
+        climate_chamber = self._create_climate_chamber(entry, sensors)
+        controller = self._create_controller(entry, chamber_id, climate_chamber, config_manager)
+        chamber = Chamber(chamber_id, entry.get("name", chamber_id), sensors, self.app_state.database,
+                          climate_chamber, config_manager, controller)
+        self._chambers[chamber_id] = chamber
+        return chamber
+
+    def _create_config_manager(self, entry):
+        """Factory method for the PID config of a chamber."""
+        from app.backend.models.config.ConfigManager import ConfigManager
+        return ConfigManager(str(entry.get("control_config", self.app_state.control_config_path)))
+
+    def _create_climate_chamber(self, entry, sensors):
+        """Factory method for the hardware of a chamber."""
+        # Choose implementation based on environment
+        if os.environ.get('ENVIRONMENT') == 'production':
+            from app.backend.models.ClimateChamber import ClimateChamber
+            return ClimateChamber(entry.get("heating_pin", 12), entry.get("cooling_pin", 13), entry.get("fan_pin", 10))
+
+        from app.backend.models.mock.MockClimateChamber import MockClimateChamber
+        climate_chamber = MockClimateChamber()
+        simulator = climate_chamber.simulator
+        if simulator:
+            # Mock sensors read the simulated chamber, so control has a visible effect
+            database = self.app_state.database
+            if sensors is None:
+                simulator.add_nodes([sensor.id for sensor in database.sensors])
+                database.simulator = simulator
+            else:
+                simulator.add_nodes(sensors)
+                database.simulators.update({sensor_id: simulator for sensor_id in sensors})
+        return climate_chamber
+
+    def _create_controller(self, entry, chamber_id, climate_chamber, config_manager):
+        """Factory method for the controller of a chamber."""
+        from app.backend.controllers.ClimateChamberController import ClimateChamberController
+        return ClimateChamberController(
+            self.app_state,
+            climate_chamber,
+            config_manager.pid_config,
+            self.app_state.control_interval,
+            entry.get("control_sensor", ClimateChamberController.CONTROL_SENSOR),
+            chamber_id
+        )
+
+    def start(self) -> None:
+        """Start the control loop of every chamber."""
+        for chamber in self:
+            chamber.controller.start_control_loop()
+
+    def stop(self) -> None:
+        """Stop the running cycles and the control loops of every chamber."""
+        for chamber in self:
+            if chamber.controller.running:
+                chamber.stop_cycle()
+            chamber.controller.stop_control_loop()
+
+    @property
+    def default(self) -> Chamber:
+        """The first configured chamber, served by the routes without a chamber id."""
+        return next(iter(self._chambers.values()))
+
+    def get(self, chamber_id: str) -> Optional[Chamber]:
+        return self._chambers.get(chamber_id)
+
+    def __iter__(self) -> Iterator[Chamber]:
+        return iter(list(self._chambers.values()))
+
+    def __len__(self) -> int:
+        return len(self._chambers)
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+
+class _Entry:
+    """Cached state of one config file."""
+    __slots__ = ('path', 'mtime', 'data', 'typed', 'next_check', 'subscribers')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = None
+        self.data = None
+        self.typed = {}
+        self.next_check = 0.0
+        self.subscribers = []
+
+
+class ConfigStore:
+    """In-process cache of JSON config files, parsed once and shared by every reader.
+
+    get() returns the parsed dict, or the typed object built by a parser (e.g.
+    GraphConfig.from_dict); both are cached until the file changes and must be treated
+    as read-only. A file's mtime is checked at most every check_interval seconds, writes
+    through save_config/ConfigManager.save_config invalidate it immediately. A file that
+    fails to parse keeps its previous content. Subscribers are called with (path, data)
+    whenever a file's content changed.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._watch_thread = None
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _key(path: Union[str, Path]) -> str:
+        return os.path.abspath(path)
+
+    def _entry(self, path: Union[str, Path]) -> _Entry:
+        key = self._key(path)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry(key))
+        return entry
+
+    def _refresh(self, entry: _Entry, force: bool = False) -> None:
+        """Reparse the file if its mtime changed, notifying subscribers."""
+        with self._lock:
+            try:
+                mtime = os.stat(entry.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            entry.next_check = time.monotonic() + self.check_interval
+            if not force and entry.data is not None and mtime == entry.mtime:
+                return
+            try:
+                with open(entry.path, 'r') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                if entry.data is None:
+                    raise RuntimeError(f"Error loading configuration: {str(e)}")
+                print(f"ConfigStore: Keeping previous {entry.path}: {str(e)}")
+                entry.mtime = mtime  # Retried once the file changes again
+                return
+            changed = entry.data is not None and data != entry.data
+            entry.mtime, entry.data, entry.typed = mtime, data, {}
+            subscribers = list(entry.subscribers)
+
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(entry.path, data)
+                except Exception as e:
+                    print(f"ConfigStore: Subscriber of {entry.path} failed: {str(e)}")
+
+    def get(self, path: Union[str, Path], parser: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Any:
+        """Return the parsed config file, or parser(config) when a parser is given."""
+        entry = self._entry(path)
+        if entry.data is None or time.monotonic() >= entry.next_check:
+            self._refresh(entry)
+        if parser is None:
+            return entry.data
+        typed = entry.typed.get(parser)
+        if typed is None:
+            typed = entry.typed[parser] = parser(entry.data)
+        return typed
+
+    def invalidate(self, path: Union[str, Path]) -> None:
+        """Reload a file after it was written, subscribers are notified if its content changed."""
+        entry = self._entry(path)
+        if entry.data is not None:
+            self._refresh(entry, force=True)
+
+    def subscribe(self, path: Union[str, Path], callback: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call callback(path, data) whenever the config file changes."""
+        entry = self._entry(path)
+        with self._lock:
+            entry.subscribers.append(callback)
+
+    def start_watching(self, interval: Optional[float] = None) -> None:
+        """Poll the known files in the background, so subscribers also see edits made outside the app."""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._watch_thread = threading.Thread(target=self.__watch_loop, args=(interval or self.check_interval,),
+                                              daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        self._stop_event.set()
+        if self._watch_thread:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def __watch_loop(self, interval: float) -> None:
+        """Background process checking every loaded config file for changes."""
+        while not self._stop_event.wait(interval):
+            for entry in list(self._entries.values()):
+                if entry.data is not None:
+                    self._refresh(entry)
+
+
+# Single instance for the application
+config_store = ConfigStore()
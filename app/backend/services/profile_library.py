@@ -0,0 +1,185 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.backend.models.graph import Graph
+from app.backend.services.config_store import config_store
+from app import app_state
+
+
+def config_fingerprint(config: Dict[str, object]) -> str:
+    """SHA-256 of a graph config's canonical JSON, identifies the limits a profile was validated with."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class ProfileLibrary:
+    """Persistent library of validated temperature profiles, keyed by a hash of their setpoints.
+
+    A profile is stored once per distinct content: the setpoints are normalized to float
+    pairs, serialized as compact JSON and hashed with SHA-256, so uploading the same
+    profile again (under any name) reuses the existing row. Only valid profiles are
+    stored, together with the fingerprint of the graph config they were validated with, so
+    loading one builds the Graph without validating it again as long as the config is the
+    same. After a config change a profile is validated once more on its next load and may
+    come back invalid; callers check valid_dataset before applying it.
+
+    Names map to hashes in memory, and the most recently used Graph objects are kept in an
+    LRU cache of ``cache_size`` entries keyed by profile and config fingerprint, so loading
+    a frequently used profile is two dict lookups. Cached graphs are marked shared and must
+    be copied before they are edited.
+    """
+
+    def __init__(self, db_path='profiles.db', cache_size=16, config_path=app_state.graph_config_path):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.config_path = config_path
+        self._cache: 'OrderedDict[Tuple[str, str], Graph]' = OrderedDict()
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.setup_database()
+
+    def setup_database(self):
+        """Ensure the profile tables exist and load the name index."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            hash TEXT PRIMARY KEY,
+            setpoints TEXT NOT NULL,
+            point_count INTEGER NOT NULL,
+            created_at TEXT,
+            config_hash TEXT
+        )
+        ''')
+        if 'config_hash' not in [row[1] for row in cursor.execute("PRAGMA table_info(profiles)")]:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN config_hash TEXT")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profile_names (
+            name TEXT PRIMARY KEY,
+            hash TEXT NOT NULL REFERENCES profiles(hash),
+            updated_at TEXT
+        )
+        ''')
+        conn.commit()
+        self._names = dict(cursor.execute("SELECT name, hash FROM profile_names"))
+        conn.close()
+
+    @staticmethod
+    def normalize(setpoints) -> Tuple[List[Tuple[float, float]], str, str]:
+        """Return the float setpoints, their canonical JSON text and its SHA-256 hash."""
+        points = [(float(x) + 0.0, float(y) + 0.0) for x, y in setpoints]  # + 0.0 folds -0.0 into 0.0
+        text = json.dumps(points, separators=(',', ':'))
+        return points, text, hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _config_hash(self) -> str:
+        return config_store.get(self.config_path, config_fingerprint)
+
+    def _cache_put(self, key: Tuple[str, str], graph: Graph) -> None:
+        graph.shared = True
+        self._cache[key] = graph
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _graph(self, profile_hash: str) -> Optional[Graph]:
+        """Cached Graph of a stored profile, built from the database on a cache miss.
+
+        A profile validated with another graph config is validated again, and marked as
+        validated with the current one if it still passes.
+        """
+        config_hash = self._config_hash()
+        key = (profile_hash, config_hash)
+        with self._lock:
+            graph = self._cache.get(key)
+            if graph is not None:
+                self._cache.move_to_end(key)
+                return graph
+
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT setpoints, config_hash FROM profiles WHERE hash = ?", (profile_hash,)).fetchone()
+        if row is None:
+            conn.close()
+            return None
+        trusted = row[1] == config_hash
+        graph = Graph('desired_temperature', json.loads(row[0]), self.config_path, validate=not trusted)
+        if not trusted and graph.valid_dataset[0]:
+            with conn:
+                conn.execute("UPDATE profiles SET config_hash = ? WHERE hash = ?", (config_hash, profile_hash))
+        conn.close()
+        with self._lock:
+            self._cache_put(key, graph)
+        return graph
+
+    def store(self, name: str, setpoints) -> Tuple[bool, Optional[str], Graph]:
+        """Validate and store a profile under name, replacing what the name pointed to.
+
+        Returns (stored, profile_hash, graph). An invalid profile is not stored and its
+        graph is returned so the caller can report graph.violations.
+        """
+        points, text, profile_hash = self.normalize(setpoints)
+        config_hash = self._config_hash()
+        graph = self._graph(profile_hash)
+        if graph is None:
+            graph = Graph('desired_temperature', points, self.config_path)
+        if not graph.valid_dataset[0]:
+            return False, None, graph
+
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO profiles (hash, setpoints, point_count, created_at, config_hash) "
+                         "VALUES (?, ?, ?, ?, ?)", (profile_hash, text, len(points), now, config_hash))
+            conn.execute("INSERT OR REPLACE INTO profile_names (name, hash, updated_at) VALUES (?, ?, ?)",
+                         (name, profile_hash, now))
+        conn.close()
+
+        with self._lock:
+            self._names[name] = profile_hash
+            self._cache_put((profile_hash, config_hash), graph)
+        return True, profile_hash, graph
+
+    def load(self, name: str) -> Optional[Graph]:
+        """Return the Graph stored under name, or None for an unknown name."""
+        profile_hash = self._names.get(name)
+        if profile_hash is None:
+            return None
+        return self._graph(profile_hash)
+
+    def delete(self, name: str) -> bool:
+        """Remove a name, its profile is deleted too once no name refers to it anymore."""
+        with self._lock:
+            profile_hash = self._names.pop(name, None)
+            if profile_hash is None:
+                return False
+            orphaned = profile_hash not in self._names.values()
+            if orphaned:
+                for key in [key for key in self._cache if key[0] == profile_hash]:
+                    del self._cache[key]
+
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("DELETE FROM profile_names WHERE name = ?", (name,))
+            if orphaned:
+                conn.execute("DELETE FROM profiles WHERE hash = ?", (profile_hash,))
+        conn.close()
+        return True
+
+    def list_profiles(self) -> List[Dict[str, object]]:
+        """Return name, hash, point count and last update of every stored name."""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT n.name, n.hash, p.point_count, n.updated_at
+            FROM profile_names n JOIN profiles p ON p.hash = n.hash
+            ORDER BY n.name
+        ''').fetchall()
+        conn.close()
+        return [{"name": name, "hash": profile_hash, "points": points, "updated_at": updated_at}
+                for name, profile_hash, points, updated_at in rows]
+
+
+# Single instance for the application
+profile_library = ProfileLibrary(str(app_state.profile_library_path))
@@ -18,15 +18,23 @@ class AppState:
 
     def _init_state(self):
         """Initializes instance variables (only runs once)."""
-        self.desired_flow_graph = None
-        self.start_time = None
         self.read_interval = 0.1
         self.provider_interval = 1
+        self.control_interval = 1.0  # Seconds between PID control steps
+        # 'single' keeps all readings in one database, 'partitioned' gives every cycle its own file
+        self.storage_mode = 'single'
+        self.storage_engine = 'rows'  # 'chunked' stores compressed per-sensor chunks (needs numpy)
+        self.columnar_archive = False  # Also write finished cycles as memory-mapped columnar archives (needs numpy)
+        # Cycles older than this many days, or beyond this many bytes of hot readings, are archived (None disables)
+        self.retention_max_age_days = None
+        self.retention_max_hot_bytes = None
         # Paths
         self.config_dir = Path('app/backend/config')
         self.graph_config_path = self.config_dir / 'graph_config.json'
         self.control_config_path = self.config_dir / 'control_config.json'
         self.sensor_data_path = self.config_dir / 'sensor_data.json'
+        self.chambers_config_path = self.config_dir / 'chambers.json'
+        self.profile_library_path = Path('profiles.db')
 
         # Ensure config directory exists
         os.makedirs(self.config_dir, exist_ok=True)
@@ -34,37 +42,111 @@ class AppState:
         # Create components using the factory
         """ Database instance used to log, retrieve and delete sensors """
         self.database = self._create_temperature_logger()
-        """ Config manager instance """
-        self.config_manager = self._create_config_manager()
-        """ Climate chamber controller used to control Peltier elements based on sensor data and desired graph."""
-        self.climate_chamber = self._create_climate_chamber()
-        self.controller = self._create_controller()
+        """ Single acquisition loop publishing sensor frames to the controller, logger and streams """
+        self.sample_bus, self.acquisition_loop = self._create_acquisition_loop()
+        """ Background job archiving old cycles out of the live database """
+        self.retention_manager = self._create_retention_manager()
+        """ Chambers driven by this process, each with its own hardware, PID config, controller and cycle """
+        self.chambers = self._create_chamber_manager()
+        """ Config manager, climate chamber and controller of the default chamber, used by the routes without a chamber id """
+        self.config_manager = self.chambers.default.config_manager
+        self.climate_chamber = self.chambers.default.climate_chamber
+        self.controller = self.chambers.default.controller
+        """ Broadcast hub encoding every stream update once for all connected dashboards """
+        self.stream_hub = self._create_stream_hub()
+        self._register_metrics()
 
     def _create_temperature_logger(self):
         """Factory method for creating the config manager."""
         from database.TemperatureSensorLogger import TemperatureSensorLogger
-        return TemperatureSensorLogger(self)
+        return TemperatureSensorLogger(self, storage_mode=self.storage_mode, storage_engine=self.storage_engine,
+                                       columnar_archive=self.columnar_archive)
 
-    def _create_config_manager(self):
-        """Factory method for creating the config manager."""
-        from app.backend.models.config.ConfigManager import ConfigManager
-        return ConfigManager(str(self.control_config_path))
-
-    def _create_climate_chamber(self):
-        """Factory method for creating the climate chamber implementation."""
-        # Choose implementation based on environment
-        if os.environ.get('ENVIRONMENT') == 'production':
-            from app.backend.models.ClimateChamber import ClimateChamber
-            return ClimateChamber()
-        else:
-            from app.backend.models.mock.MockClimateChamber import MockClimateChamber
-            return MockClimateChamber()
-
-    def _create_controller(self):
-        """Factory method for creating the controller."""
-        from app.backend.controllers.ClimateChamberController import ClimateChamberController
-        return ClimateChamberController(
-            self,
-            self.climate_chamber,
-            self.config_manager.pid_config
-        )
\ No newline at end of file
+    def _create_acquisition_loop(self):
+        """Factory method for creating the sample bus and the acquisition loop feeding it."""
+        from database.SampleBus import AcquisitionLoop, SampleBus
+        sample_bus = SampleBus()
+        acquisition_loop = AcquisitionLoop(self.database, sample_bus, self.provider_interval)
+        return sample_bus, acquisition_loop
+
+    def _create_retention_manager(self):
+        """Factory method for creating the retention manager, start() only runs it if a policy is set."""
+        from database.RetentionManager import RetentionManager
+        return RetentionManager(
+            self.database,
+            max_age_days=self.retention_max_age_days,
+            max_hot_bytes=self.retention_max_hot_bytes
+        )
+
+    def _create_chamber_manager(self):
+        """Factory method for creating the chambers listed in the chambers config (one chamber without it)."""
+        from app.backend.services.chambers import ChamberManager
+        return ChamberManager(self, str(self.chambers_config_path))
+
+    def _create_stream_hub(self):
+        """Factory method for creating the SSE broadcast hub."""
+        from app.backend.services.stream_hub import StreamHub
+        stream_hub = StreamHub(self.sample_bus, interval=self.provider_interval)
+        for chamber in self.chambers:
+            stream_hub.add_channel(chamber.id, chamber.stream_snapshot, lambda c=chamber: c.controller.running)
+        return stream_hub
+
+    def start(self):
+        """Start the background threads: config watching, acquisition, control loops, retention and streams.
+
+        Called by create_app() rather than on construction, so importing the app (e.g. in a
+        spawned worker process) starts nothing.
+        """
+        from app.backend.services.config_store import config_store
+        config_store.start_watching()
+        self.acquisition_loop.start()
+        self.chambers.start()
+        if self.retention_max_age_days is not None or self.retention_max_hot_bytes is not None:
+            self.retention_manager.start()
+        self.stream_hub.start()
+
+    def stop(self):
+        """Stop the background threads, closing running cycles and waiting for their archives."""
+        from app.backend.services.config_store import config_store
+        self.stream_hub.stop()
+        self.chambers.stop()
+        self.retention_manager.stop()
+        self.acquisition_loop.stop()
+        config_store.stop_watching()
+        self.database.join_columnar()
+
+    def _register_metrics(self):
+        """Expose queue depths and loop counters of the components as gauges of the metrics registry."""
+        from database.Metrics import metrics
+        metrics.gauge('writer_queue_depth', lambda: sum(writer.pending() for writer in self.database.writers()),
+                      'Samples waiting to be written to the database')
+        metrics.gauge('writer_dropped_samples', lambda: sum(writer.dropped for writer in self.database.writers()),
+                      'Samples dropped by the writers of the running cycles')
+        metrics.gauge('stream_clients', lambda: self.stream_hub.stats()['clients'], 'Connected stream clients')
+        metrics.gauge('stream_queue_depth', self.stream_hub.queue_depth, 'Largest stream client queue')
+        metrics.gauge('stream_dropped_events', lambda: self.stream_hub.stats()['dropped_events'],
+                      'Stream updates skipped by slow clients')
+        metrics.gauge('control_ticks', lambda: {chamber.id: chamber.controller.ticks for chamber in self.chambers},
+                      'Control loop ticks since startup', label='chamber')
+        metrics.gauge('sensor_schedule_overruns',
+                      lambda: {sensor_id: stats['overruns'] for sensor_id, stats in
+                               (self.acquisition_loop.scheduler.report() if self.acquisition_loop.scheduler else {}).items()},
+                      'Sensor reads that missed their scheduled period', label='sensor')
+
+    @property
+    def desired_flow_graph(self):
+        """Desired graph of the default chamber."""
+        return self.chambers.default.desired_flow_graph
+
+    @desired_flow_graph.setter
+    def desired_flow_graph(self, graph):
+        self.chambers.default.desired_flow_graph = graph
+
+    @property
+    def start_time(self):
+        """Start of the running cycle of the default chamber."""
+        return self.chambers.default.start_time
+
+    @start_time.setter
+    def start_time(self, start_time):
+        self.chambers.default.start_time = start_time
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import deque
+
+from database.Metrics import metrics
+
+
+class StreamClient:
+    """Bounded queue of encoded events for one SSE connection.
+
+    When the client falls behind, the oldest events are dropped so it only skips
+    updates (decimation); a client that has not taken an event for ``stall_timeout``
+    seconds while events were waiting is disconnected by the hub.
+    """
+
+    def __init__(self, maxlen, channel=None):
+        self.channel = channel
+        self.events = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.closed = False
+        self.last_read = time.monotonic()
+        self._condition = threading.Condition()
+
+    def push(self, payload):
+        with self._condition:
+            if self.closed:
+                return
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(payload)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Return the next event, or None when the timeout passed or the client was closed."""
+        with self._condition:
+            if not self.events and not self.closed:
+                self._condition.wait(timeout)
+            self.last_read = time.monotonic()
+            return self.events.popleft() if self.events else None
+
+    def close(self, final=None):
+        """Close the client, final is still delivered before the stream ends."""
+        with self._condition:
+            if final is not None and not self.closed:
+                self.events.append(final)
+            self.closed = True
+            self._condition.notify_all()
+
+    def stalled(self, now, stall_timeout):
+        return bool(self.events) and now - self.last_read > stall_timeout
+
+
+class StreamHub:
+    """Fans sensor updates out to every connected SSE client.
+
+    A single thread reads frames from the sample bus, throttles them to one update per
+    ``interval``, encodes the update once and appends the same bytes to every client's
+    bounded queue, so the cost per client is one deque append. The streams only read
+    their queue, they never touch sensors or the controller.
+
+    Updates are sent per channel (one per chamber): ``snapshot()`` returns the data of one
+    update of a channel (latest readings plus control info); while its ``active()`` is
+    false no updates are sent and every stream of the channel ends with a stopped status.
+    The snapshot and active callbacks given to the constructor make up the default
+    channel None, add_channel() registers more.
+    """
+    STOPPED_EVENT = b'data: {"status": "stopped"}\n\n'
+    KEEPALIVE_EVENT = b': keepalive\n\n'
+
+    def __init__(self, bus, snapshot=None, active=None, interval=1.0, queue_size=10, stall_timeout=30.0):
+        self.bus = bus
+        self.channels = {}  # channel -> (snapshot, active)
+        if snapshot is not None:
+            self.add_channel(None, snapshot, active)
+        self.interval = interval
+        self.queue_size = queue_size
+        self.stall_timeout = stall_timeout
+        self._clients = []  # Copy-on-write, the fan-out iterates without the lock
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Counters
+        self.connections = 0
+        self.events_sent = 0
+        self.dropped_events = 0
+        self.disconnected_slow = 0
+        self.fanout_last_us = 0.0
+        self.fanout_max_us = 0.0
+        self._fanout_histogram = metrics.histogram('stream_fanout_seconds',
+                                                   'Duration of encoding and queueing one stream update')
+
+    def add_channel(self, channel, snapshot, active):
+        """Register the snapshot and active callbacks of a channel."""
+        self.channels = {**self.channels, channel: (snapshot, active)}
+
+    def start(self):
+        """Start the fan-out thread, does nothing if it is already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.__fanout_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def connect(self, channel=None):
+        """Register a new client of a channel, disconnect() it when its stream ends."""
+        _, active = self.channels[channel]
+        client = StreamClient(self.queue_size, channel)
+        if not active():
+            client.close(self.STOPPED_EVENT)
+            return client
+        with self._lock:
+            self._clients = self._clients + [client]
+            self.connections += 1
+        return client
+
+    def disconnect(self, client):
+        with self._lock:
+            self._clients = [c for c in self._clients if c is not client]
+            self.dropped_events += client.dropped
+        client.close()
+
+    def stream(self, channel=None):
+        """Generator of SSE bytes for one client of a channel, for a streaming Flask Response."""
+        client = self.connect(channel)
+        try:
+            while True:
+                payload = client.get(timeout=self.interval * 5)
+                if payload is not None:
+                    yield payload
+                elif client.closed:
+                    break
+                else:
+                    yield self.KEEPALIVE_EVENT  # A write to a closed connection ends the generator
+        finally:
+            self.disconnect(client)
+
+    def broadcast(self, data, channel=None):
+        """Encode data once and queue it for every client of the channel."""
+        started = time.perf_counter_ns()
+        payload = f"data: {json.dumps(data)}\n\n".encode()
+        clients = [client for client in self._clients if client.channel == channel]
+        for client in clients:
+            client.push(payload)
+        self.events_sent += 1
+        elapsed = time.perf_counter_ns() - started
+        self._fanout_histogram.record(elapsed)
+        self.fanout_last_us = elapsed / 1000
+        self.fanout_max_us = max(self.fanout_max_us, self.fanout_last_us)
+        return len(clients)
+
+    def close_all(self, final=None, channel=None):
+        """Close every client of the channel, final is delivered to each before its stream ends."""
+        for client in self._clients:
+            if client.channel == channel:
+                client.close(final)
+
+    def drop_stalled(self):
+        """Disconnect clients that stopped reading their queue."""
+        now = time.monotonic()
+        for client in self._clients:
+            if client.stalled(now, self.stall_timeout):
+                print(f"StreamHub: Dropping a client that stalled for more than {self.stall_timeout}s")
+                self.disconnected_slow += 1
+                client.close()
+
+    def queue_depth(self):
+        """Largest number of updates waiting for one client."""
+        return max((len(client.events) for client in self._clients), default=0)
+
+    def stats(self):
+        clients = self._clients
+        return {
+            'clients': len(clients),
+            'clients_per_channel': {str(channel): sum(client.channel == channel for client in clients)
+                                    for channel in self.channels},
+            'connections': self.connections,
+            'events_sent': self.events_sent,
+            'dropped_events': self.dropped_events + sum(client.dropped for client in clients),
+            'disconnected_slow': self.disconnected_slow,
+            'fanout_last_us': round(self.fanout_last_us, 1),
+            'fanout_max_us': round(self.fanout_max_us, 1),
+        }
+
+    def __fanout_loop(self):
+        """Background process turning bus frames into one encoded update per channel and interval."""
+        subscription = self.bus.open_subscription()
+        interval_ns = int(self.interval * 1e9)
+        last_sent = 0
+        try:
+            while not self._stop_event.is_set():
+                frame = subscription.get(timeout=self.interval)
+                self.drop_stalled()
+                # Sensors are read at their own rates, send the newest value of every sensor once per interval
+                due = frame is not None and frame.monotonic_ns - last_sent >= interval_ns
+                if due:
+                    last_sent = frame.monotonic_ns
+                # Only channels with connected clients are encoded
+                for channel in {client.channel for client in self._clients}:
+                    snapshot, active = self.channels[channel]
+                    if not active():
+                        self.close_all(self.STOPPED_EVENT, channel)
+                    elif due:
+                        self.broadcast(snapshot(), channel)
+        finally:
+            subscription.close()
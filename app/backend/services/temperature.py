@@ -1,7 +1,8 @@
 from dataclasses import dataclass
 from typing import Optional, Tuple, List, Dict, Any, Union
-from app.backend.models.graph import Graph
-from app.backend.services.config import load_config, get_config_value
+from app.backend.models.graph import Graph, GraphConfig
+from app.backend.services.config_store import config_store
+from app.backend.services.profile_library import profile_library
 from app import app_state
 
 @dataclass
@@ -18,9 +19,9 @@ class TemperatureService:
         """Validate a single temperature value against configuration limits"""
         try:
             temperature = float(temp_value)
-            config = load_config(app_state.graph_config_path)
-            min_temp = float(get_config_value(config, 'min_y', 0))
-            max_temp = float(get_config_value(config, 'max_y', 100))
+            config = config_store.get(app_state.graph_config_path, GraphConfig.from_dict)
+            min_temp = config.min_y
+            max_temp = config.max_y
 
             if not (min_temp <= temperature <= max_temp):
                 return TemperatureValidationResult(
@@ -61,7 +62,7 @@ class TemperatureService:
 
     @staticmethod
     def set_temperature_profile(points: List[Dict[str, Any]]) -> Tuple[bool, str, Optional[Graph]]:
-        """Set a temperature profile from a list of points"""
+        """Set a temperature profile from a list of points, the graph is only applied when valid"""
         try:
             # Convert points to the format expected by Graph
             tuple_list = [
@@ -74,7 +75,8 @@ class TemperatureService:
             is_valid, message = graph.valid_dataset
             
             if not is_valid:
-                return False, f"Invalid dataset: {message}", None
+                # The invalid graph is returned so callers can report graph.violations
+                return False, f"Invalid dataset: {message}", graph
 
             app_state.desired_flow_graph = graph
             return True, "Temperature profile set successfully", graph
@@ -84,5 +86,78 @@ class TemperatureService:
         except Exception as e:
             return False, f"An error occurred: {str(e)}", None
 
+    @staticmethod
+    def store_profile(name: str, points: List[Dict[str, Any]]) -> Tuple[bool, str, Optional[Graph]]:
+        """Validate a profile and save it in the profile library under name"""
+        if not name:
+            return False, "Profile name is required", None
+        try:
+            stored, profile_hash, graph = profile_library.store(
+                name, [(point['x'], point['y']) for point in points]
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return False, f"Invalid data format: {str(e)}", None
+
+        if not stored:
+            return False, f"Invalid dataset: {graph.valid_dataset[1]}", graph
+        return True, f"Profile '{name}' stored ({profile_hash[:12]})", graph
+
+    @staticmethod
+    def load_profile(name: str) -> Tuple[bool, str, Optional[Graph]]:
+        """Apply a profile from the library, it is revalidated only if the graph config changed since it was stored"""
+        graph = profile_library.load(name)
+        if graph is None:
+            return False, f"Unknown profile '{name}'", None
+        is_valid, message = graph.valid_dataset
+        if not is_valid:
+            # The graph config changed since the profile was stored
+            return False, f"Profile '{name}' is invalid with the current graph config: {message}", graph
+        app_state.desired_flow_graph = graph
+        return True, f"Profile '{name}' loaded", graph
+
+    @staticmethod
+    def edit_profile(edits: List[Dict[str, Any]]) -> Tuple[bool, str, Optional[Graph], List[int]]:
+        """Apply a batch of setpoint edits to the current profile, revalidating only what changed.
+
+        The batch is applied in place under the graph lock with an undo log, so it costs
+        O(log n) per edit instead of a copy; only a graph shared by the profile library is
+        copied first. A failing edit rolls the batch back. An invalid result is kept as a
+        draft, reported with its violations, and not activated: a running controller keeps
+        its current profile (the edits then go to a draft copy) until the draft is valid
+        again. Every chamber holding the edited profile gets the result.
+        """
+        original = app_state.desired_flow_graph
+        if original is None:
+            return False, "No temperature profile set", None, []
+        chambers = [chamber for chamber in app_state.chambers if chamber.desired_flow_graph is original]
+        active = any(chamber.controller.running and chamber.controller.desired_graph is original
+                     for chamber in chambers)
+
+        graph = original.copy() if original.shared else original
+        undo_log = []
+        with graph.lock:
+            try:
+                indices = graph.apply_edits(edits, undo_log)
+            except (KeyError, TypeError, ValueError, IndexError) as e:
+                graph.undo(undo_log)
+                return False, f"Invalid edit: {str(e)}", graph, []
+
+            is_valid, message = graph.valid_dataset
+            if not is_valid and active and graph is original:
+                # The running controller must not see the invalid profile, the draft is a copy
+                graph.undo(undo_log)
+                graph = graph.copy()
+                indices = graph.apply_edits(edits)
+
+        for chamber in chambers:
+            chamber.desired_flow_graph = graph
+        if not is_valid:
+            return False, f"Invalid dataset: {message}", graph, indices
+
+        for chamber in chambers:
+            if chamber.controller.running:
+                chamber.controller.set_desired_graph(graph)
+        return True, "Temperature profile updated", graph, indices
+
 # Single instance for the application
 temperature_service = TemperatureService()
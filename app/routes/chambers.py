@@ -0,0 +1,121 @@
+from flask import Blueprint, jsonify, Response, request
+
+from app.backend.models.graph import Graph
+from app.backend.services.profile_library import profile_library
+from app.backend.services.temperature import temperature_service
+from app import app_state
+
+chambers_bp = Blueprint('chambers', __name__)
+
+
+def find_chamber(chamber_id):
+    """Return (chamber, None), or (None, error response) for an unknown chamber id."""
+    chamber = app_state.chambers.get(chamber_id)
+    if chamber is None:
+        return None, (jsonify({"error": f"Unknown chamber '{chamber_id}'"}), 404)
+    return chamber, None
+
+
+@chambers_bp.route('/chambers')
+def list_chambers():
+    """Status of every chamber driven by this server."""
+    return jsonify([chamber.status() for chamber in app_state.chambers])
+
+
+@chambers_bp.route('/chambers/<chamber_id>')
+def chamber_status(chamber_id):
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    return jsonify(chamber.status())
+
+
+@chambers_bp.route('/chambers/<chamber_id>/profile', methods=['POST'])
+def set_chamber_profile(chamber_id):
+    """Set the desired graph of a chamber.
+
+    Body: profileName of a stored profile, a constant temperature, or data with the
+    {x, y} setpoints of a new profile.
+    """
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+
+    if data.get('profileName'):
+        graph = profile_library.load(data['profileName'])
+        if graph is None:
+            return jsonify({"error": f"Unknown profile '{data['profileName']}'"}), 404
+        if not graph.valid_dataset[0]:
+            violations = [violation.to_dict() for violation in graph.violations]
+            return jsonify({"error": f"Profile '{data['profileName']}' is invalid with the current graph config",
+                             "violations": violations}), 400
+    elif 'temperature' in data:
+        validation = temperature_service.validate_temperature(data['temperature'])
+        if not validation.is_valid:
+            return jsonify({"error": validation.message}), 400
+        graph = Graph('desired_temperature', [(0, validation.value)])
+    elif data.get('data'):
+        try:
+            graph = Graph('desired_temperature', [(float(point['x']), float(point['y'])) for point in data['data']])
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
+        is_valid, message = graph.valid_dataset
+        if not is_valid:
+            violations = [violation.to_dict() for violation in graph.violations]
+            return jsonify({"error": f"Invalid dataset: {message}", "violations": violations}), 400
+    else:
+        return jsonify({"error": "profileName, temperature or data is required"}), 400
+
+    chamber.desired_flow_graph = graph
+    if chamber.controller.running:
+        chamber.controller.set_desired_graph(graph)
+    return jsonify({"status": "success", "points": len(graph.setpoints)})
+
+
+@chambers_bp.route('/chambers/<chamber_id>/start_cycle', methods=['POST'])
+def start_chamber_cycle(chamber_id):
+    """Start control and a logging cycle of one chamber, accepts an optional cycleName."""
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    if chamber.desired_flow_graph is None:
+        return jsonify({"error": "No desired graph set"}), 400
+    is_valid, message = chamber.desired_flow_graph.valid_dataset
+    if not is_valid:
+        # An invalid draft left by /edit-graph-data is kept for editing, not for control
+        return jsonify({"error": f"Invalid dataset: {message}"}), 400
+    data = request.get_json(silent=True) or {}
+    cycle_name = chamber.start_cycle(data.get('cycleName'))
+    return jsonify({"status": "success", "cycleName": cycle_name,
+                    "startTimeMs": int(chamber.start_time.timestamp() * 1000)})
+
+
+@chambers_bp.route('/chambers/<chamber_id>/stop_cycle', methods=['POST'])
+def stop_chamber_cycle(chamber_id):
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    chamber.stop_cycle()  # Also ends the chamber's streams
+    return jsonify({'status': 'chamber stopped'})
+
+
+@chambers_bp.route('/chambers/<chamber_id>/stream')
+def stream_chamber(chamber_id):
+    """Sensor updates of one chamber, on its channel of the shared broadcast hub."""
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    return Response(app_state.stream_hub.stream(chamber.id), mimetype='text/event-stream')
+
+
+@chambers_bp.route('/chambers/<chamber_id>/readings/latest')
+def latest_chamber_readings(chamber_id):
+    """Latest acquired value of every sensor of one chamber, served from memory."""
+    chamber, error = find_chamber(chamber_id)
+    if error:
+        return error
+    return jsonify({
+        sensor_id: {"temperature": sample.temperature, "epochUs": sample.epoch_us, "missed": sample.missed}
+        for sensor_id, sample in chamber.latest_samples().items()
+    })
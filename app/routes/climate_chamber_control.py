@@ -1,16 +1,55 @@
-from datetime import datetime
-
 from flask import Blueprint, jsonify, Response, request
 from app import app_state
+from app.backend.services.autotune import autotune_jobs
+from database.SensorAcquisition import epoch_us
 
 sensor_bp = Blueprint('sensor', __name__)
 
 @sensor_bp.route('/stream')
 def stream():
-    """Route that streams sensor data to the frontend using the ClimateChamberController instance."""
-    app_state.controller.start_sensor_stream()  # Start the stream
-    #TODO stream is currently fed by sensor file, either feed real time sensor data into file or rework functionality
-    return Response(app_state.controller.sensor_data_provider(), mimetype='text/event-stream')
+    """Route that streams sensor data to the frontend through the shared broadcast hub.
+
+    Control runs on its own thread from /start_cycle on, a stream only reports it.
+    """
+    return Response(app_state.stream_hub.stream(app_state.chambers.default.id), mimetype='text/event-stream')
+
+
+@sensor_bp.route('/stream/stats')
+def stream_stats():
+    """Connected clients, dropped events and fan-out latency of the broadcast hub."""
+    return jsonify(app_state.stream_hub.stats())
+
+
+@sensor_bp.route('/readings/latest')
+def latest_readings():
+    """Latest acquired value of every sensor, served from memory."""
+    samples = app_state.database.recent.latest_frame
+    if samples is None:
+        return jsonify({"error": "No readings acquired yet"}), 404
+    return jsonify({
+        sensor_id: {"temperature": sample.temperature, "epochUs": sample.epoch_us, "missed": sample.missed}
+        for sensor_id, sample in samples.items()
+    })
+
+
+@sensor_bp.route('/readings/window')
+def readings_window():
+    """Recent readings of one sensor (or all sensors) over the last `seconds`, served from memory."""
+    recent = app_state.database.recent
+    seconds = request.args.get('seconds', 300, type=float)
+    sensor = request.args.get('sensor')
+    # On the anchored clock of the samples, a system clock adjustment does not shift the window
+    start = epoch_us() - int(seconds * 1_000_000)
+
+    sensor_ids = [sensor] if sensor else recent.sensor_ids()
+    result = {}
+    for sensor_id in sensor_ids:
+        try:
+            timestamps, temperatures = recent.window(sensor_id, start)
+        except KeyError as e:
+            return jsonify({"error": str(e)}), 404
+        result[sensor_id] = {"epochUs": timestamps, "temperatures": temperatures}
+    return jsonify(result)
 
 
 @sensor_bp.route('/start_cycle', methods=['POST'])
@@ -20,27 +59,55 @@ def start_sensors(logging=True):
     - Set the start timestamp.
     - Start the controlling cycle.
     - Accept optional custom cycle name.
+
+    This drives the default chamber, /chambers/<id>/start_cycle any other.
     """
     # Get data from request
     data = request.get_json(silent=True) or {}
-    custom_name = data.get('cycleName')
-
-    app_state.start_time = datetime.now()
-    if logging:
-        if custom_name:
-            cycle_name = custom_name
-        else:
-            cycle_name = "Temperature cycle " + app_state.start_time.strftime("%d%m%Y-%H:%M:%S")
-        print(cycle_name)
-        app_state.database.start_logging_cycle(cycle_name)
-    app_state.controller.set_desired_graph(app_state.desired_flow_graph)
-
-    return jsonify({"status": "success", "cycleName": cycle_name})
+    chamber = app_state.chambers.default
+    if chamber.desired_flow_graph is not None:
+        is_valid, message = chamber.desired_flow_graph.valid_dataset
+        if not is_valid:
+            # An invalid draft left by /edit-graph-data is kept for editing, not for control
+            return jsonify({"error": f"Invalid dataset: {message}"}), 400
+    cycle_name = chamber.start_cycle(data.get('cycleName'), logging)
+    print(cycle_name)
+    # Epoch milliseconds, clients place their chart's time axis (and backfill) on it
+    return jsonify({"status": "success", "cycleName": cycle_name,
+                    "startTimeMs": int(chamber.start_time.timestamp() * 1000)})
 
 @sensor_bp.route('/stop_cycle', methods=['POST'])
 def stop_sensors():
     """Stop the sensor reading process."""
-    app_state.controller.stop_sensor_stream()  # Stop the stream
-    app_state.start_time = None
-    app_state.database.stop_logging_cycle()
-    return jsonify({'status': 'sensors stopped'})
\ No newline at end of file
+    app_state.chambers.default.stop_cycle()  # Also ends the streams
+    return jsonify({'status': 'sensors stopped'})
+
+
+@sensor_bp.route('/autotune', methods=['POST'])
+def autotune():
+    """Start ranking PID gains on a chamber model fitted to a logged cycle.
+
+    Body: cycleId, optional chamberId (default the default chamber), profileName
+    (default the chamber's desired graph) and apply to write the best gains to the
+    chamber's control config. Tuning runs in the background, the response holds the
+    jobId to poll at /autotune/<jobId>.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('cycleId') is None:
+        return jsonify({"error": "cycleId is required"}), 400
+    try:
+        cycle_id = int(data['cycleId'])
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid cycleId '{data['cycleId']}'"}), 400
+    job = autotune_jobs.submit(cycle_id, data.get('profileName'), bool(data.get('apply')),
+                               chamber_id=data.get('chamberId'))
+    return jsonify(job), 202
+
+
+@sensor_bp.route('/autotune/<int:job_id>')
+def autotune_status(job_id):
+    """Status of an autotune job, with the ranked gains once it is done."""
+    job = autotune_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown autotune job {job_id}"}), 404
+    return jsonify(job)
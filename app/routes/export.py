@@ -0,0 +1,91 @@
+import re
+
+from flask import Blueprint, jsonify, Response, request
+from app import app_state
+from database.CycleExporter import CycleExporter
+
+export_bp = Blueprint('export', __name__)
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def safe_filename(name):
+    """Turn a cycle name into something usable as a file name."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'cycle'
+
+
+@export_bp.route('/cycles', methods=['GET'])
+def list_cycles():
+    """List all logged cycles."""
+    cycles = [
+        {"cycleId": cycle_id, "name": name, "startTime": start_time, "endTime": end_time}
+        for cycle_id, name, start_time, end_time in app_state.database.list_cycles()
+    ]
+    return jsonify(cycles)
+
+
+@export_bp.route('/export', methods=['GET'])
+def export_cycles():
+    """Stream one or more cycles as CSV or NDJSON.
+
+    Query parameters:
+    - cycles: comma separated cycle ids, more than one returns a zip archive
+    - format: csv (default) or ndjson
+    - layout: long (default, one row per reading) or wide (one column per sensor)
+    - gzip: 1 to gzip a single cycle export
+    """
+    try:
+        cycle_ids = [int(cycle_id) for cycle_id in request.args.get('cycles', '').split(',') if cycle_id.strip()]
+    except ValueError:
+        return jsonify({"error": "Cycle ids must be integers"}), 400
+    return stream_export(cycle_ids)
+
+
+@export_bp.route('/export/<int:cycle_id>', methods=['GET'])
+def export_cycle(cycle_id):
+    """Stream a single cycle, accepts the same query parameters as /export."""
+    return stream_export([cycle_id])
+
+
+def stream_export(cycle_ids):
+    """Build the streamed export response for the requested cycles."""
+    fmt = request.args.get('format', 'csv').lower()
+    layout = request.args.get('layout', 'long').lower()
+    use_gzip = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+
+    if fmt not in CycleExporter.FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'"}), 400
+    if layout not in CycleExporter.LAYOUTS:
+        return jsonify({"error": f"Unsupported layout '{layout}'"}), 400
+    if not cycle_ids:
+        return jsonify({"error": "No cycles selected"}), 400
+
+    names = {cycle[0]: cycle[1] for cycle in app_state.database.list_cycles()}
+    missing = [cycle_id for cycle_id in cycle_ids if cycle_id not in names]
+    if missing:
+        return jsonify({"error": f"Unknown cycles: {missing}"}), 404
+
+    exporter = CycleExporter(app_state.database)
+
+    if len(cycle_ids) > 1:
+        entries = [(f"{cycle_id}_{safe_filename(names[cycle_id])}.{fmt}", cycle_id) for cycle_id in cycle_ids]
+        return Response(
+            exporter.zip_stream(entries, fmt, layout),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename="cycles.zip"'}
+        )
+
+    cycle_id = cycle_ids[0]
+    filename = f"{cycle_id}_{safe_filename(names[cycle_id])}.{fmt}"
+    body = exporter.iter_encoded(cycle_id, fmt, layout)
+    mimetype = MIMETYPES[fmt]
+    if use_gzip:
+        body = exporter.gzip_stream(body)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
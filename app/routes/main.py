@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, Response, jsonify, render_template, redirect, url_for, request, flash
+from database.Metrics import metrics
 from app import app_state
-from app.backend.services.config import load_config, save_config
+from app.backend.services.config import save_config
+from app.backend.services.config_store import config_store
 from app.backend.services.temperature import temperature_service
 
 main_bp = Blueprint('main', __name__)
@@ -15,6 +17,18 @@ def status():
     return 'Server is up and running', 200
 
 
+@main_bp.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms, counters and queue depths in the Prometheus text format."""
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@main_bp.route('/metrics.json')
+def metrics_snapshot():
+    """The same metrics as a JSON snapshot, durations in seconds."""
+    return jsonify(metrics.snapshot())
+
+
 @main_bp.route('/edit-config', methods=['GET', 'POST'])
 def edit_config():
     if request.method == 'POST':
@@ -35,7 +49,7 @@ def edit_config():
             
         return redirect(url_for('main.edit_config'))
 
-    config_data = load_config(app_state.graph_config_path)
+    config_data = config_store.get(app_state.graph_config_path)
     return render_template('configEditor.html', config=config_data)
 
 
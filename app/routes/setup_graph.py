@@ -1,11 +1,14 @@
 from flask import Blueprint, render_template, jsonify, redirect, url_for, request
 
-from app.backend.services.config import load_config
+from app.backend.services.config_store import config_store
+from app.backend.services.profile_library import profile_library
 from app import app_state
 from app.backend.services.temperature import temperature_service
 
 graph_bp = Blueprint('graph', __name__)
 
+DISPLAY_POINTS = 2000  # Default point budget of /get-stored-graph-data
+
 @graph_bp.route('/setup-graph')
 def setup_graph():
     """Display the graph setup page"""
@@ -19,18 +22,86 @@ def store_graph_data():
         if not graph_data:
             return jsonify({"error": "No data received"}), 400
 
-        # Process the temperature profile
-        success, message, graph = temperature_service.set_temperature_profile(graph_data[0]['data'])
+        # Process the temperature profile, a named profile is also kept in the profile library
+        name = graph_data[0].get('name')
+        if name:
+            success, message, graph = temperature_service.store_profile(name, graph_data[0]['data'])
+        else:
+            success, message, graph = temperature_service.set_temperature_profile(graph_data[0]['data'])
         
         if success:
             app_state.desired_flow_graph = graph
             return redirect(url_for('graph.display_graph'))
         else:
-            return jsonify({"error": message}), 400
+            violations = [violation.to_dict() for violation in graph.violations] if graph else []
+            return jsonify({"error": message, "violations": violations}), 400
 
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+@graph_bp.route('/edit-graph-data', methods=['POST'])
+def edit_graph_data():
+    """Apply a batch of edits to the current temperature profile.
+
+    The batch is applied as a whole: if an edit fails the profile is left unchanged and a
+    400 is returned. An invalid result is kept as a draft that cannot be started (also a
+    400), so it can be fixed by further edits. The response reports the edited indices,
+    whether the profile is valid and the violations around the edited setpoints.
+    """
+    edits = request.get_json(silent=True)
+    if isinstance(edits, dict):
+        edits = [edits]
+    if not edits:
+        return jsonify({"error": "No edits received"}), 400
+
+    success, message, graph, indices = temperature_service.edit_profile(edits)
+    if graph is None:
+        return jsonify({"error": message}), 404
+    nearby = {j for i in indices for j in (i - 1, i, i + 1)}
+    response = {
+        "valid": success,
+        "message": message,
+        "indices": indices,
+        "points": len(graph.setpoints),
+        "violations": [violation.to_dict() for violation in graph.violations_at(nearby)]
+    }
+    if not success:
+        return jsonify({"error": message, **response}), 400
+    return jsonify(response)
+
+@graph_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """List the profiles stored in the profile library"""
+    return jsonify(profile_library.list_profiles())
+
+@graph_bp.route('/profiles', methods=['POST'])
+def store_profile():
+    """Store a named profile in the library without applying it"""
+    data = request.get_json(silent=True) or {}
+    success, message, graph = temperature_service.store_profile(data.get('name'), data.get('data') or [])
+    if not success:
+        violations = [violation.to_dict() for violation in graph.violations] if graph else []
+        return jsonify({"error": message, "violations": violations}), 400
+    return jsonify({"message": message, "points": len(graph.setpoints)})
+
+@graph_bp.route('/profiles/<name>/load', methods=['POST'])
+def load_profile(name):
+    """Apply a stored profile as the desired temperature graph"""
+    success, message, graph = temperature_service.load_profile(name)
+    if graph is None:
+        return jsonify({"error": message}), 404
+    if not success:
+        violations = [violation.to_dict() for violation in graph.violations]
+        return jsonify({"error": message, "violations": violations}), 400
+    return jsonify({"message": message, "points": len(graph.setpoints)})
+
+@graph_bp.route('/profiles/<name>', methods=['DELETE'])
+def delete_profile(name):
+    """Remove a profile from the library"""
+    if not profile_library.delete(name):
+        return jsonify({"error": f"Unknown profile '{name}'"}), 404
+    return jsonify({"message": f"Profile '{name}' deleted"})
+
 @graph_bp.route('/display-graph')
 def display_graph():
     """Display the graph visualization page"""
@@ -38,20 +109,36 @@ def display_graph():
 
 @graph_bp.route('/get-stored-graph-data', methods=['GET'])
 def get_stored_graph_data():
-    """Get the current graph data for display"""
-    config = load_config(app_state.graph_config_path)
-    
+    """Get the current graph data for display.
+
+    The profile is simplified to at most ?points= points (default DISPLAY_POINTS), ?full=1
+    returns every setpoint.
+    """
+    config = config_store.get(app_state.graph_config_path)
+
     # Convert Graph object's setpoints to the format expected by frontend
     desired_path = None
-    if app_state.desired_flow_graph:
+    total_points = 0
+    graph = app_state.desired_flow_graph
+    if graph:
+        total_points = len(graph.setpoints)
+        if request.args.get('full') in ('1', 'true'):
+            setpoints = graph.setpoints
+        else:
+            try:
+                budget = max(int(request.args.get('points', DISPLAY_POINTS)), 2)
+            except ValueError:
+                return jsonify({"error": "Invalid points parameter"}), 400
+            setpoints = graph.simplified(budget)
         desired_path = [
             {"x": x, "y": y} 
-            for x, y in app_state.desired_flow_graph.setpoints
+            for x, y in setpoints
         ]
         
     return jsonify({
         'desired_path': desired_path,
+        'total_points': total_points,
         'config': {
             'max_rico': config.get('max_rico', {}).get('value')
         }
-    })
\ No newline at end of file
+    })
@@ -215,8 +215,9 @@ export default class ChartManager {
    * @param {Object} data - Sensor data
    * @param {number} elapsedSeconds - Elapsed time in seconds
    * @param {Set} selectedSensors - Currently selected sensors
+   * @param {boolean} redraw - Redraw the chart, pass false when adding many points at once
    */
-  updateChartData(data, elapsedSeconds, selectedSensors) {
+  updateChartData(data, elapsedSeconds, selectedSensors, redraw = true) {
     // Process data for all available sensors
     Object.entries(data).forEach(([sensorName, value]) => {
       if (typeof value === 'number') {
@@ -242,6 +243,10 @@ export default class ChartManager {
       }
     });
 
+    if (!redraw) {
+      return;
+    }
+
     // Update start time line with current elapsed time
     this.updateStartTimeLine(elapsedSeconds);
 
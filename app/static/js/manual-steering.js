@@ -26,7 +26,9 @@ class SensorGraph {
    */
   async initialize() {
     try {
-      const response = await fetch('/get-stored-graph-data');
+      // About two points per horizontal pixel, the server simplifies larger profiles
+      const budget = Math.round(2 * window.innerWidth * (window.devicePixelRatio || 1));
+      const response = await fetch(`/get-stored-graph-data?points=${budget}`);
       const data = await response.json();
 
       this.startTime = Date.now();
@@ -95,11 +97,12 @@ class SensorGraph {
 
   /**
    * Initializes the sensor data stream
+   * @param {number} [startTime] - Server start time of the cycle (epoch ms), now when omitted
    */
-  initializeStream() {
+  initializeStream(startTime) {
     this.sensorManager.closeEventSource();
 
-    this.startTime = Date.now();
+    this.startTime = startTime ?? Date.now();
     this.chartManager.resetMaxElapsedTime();
     this.chartManager.updateChartTimeAxis(this.startTime);
 
@@ -124,7 +127,7 @@ class SensorGraph {
         this.chartManager.clearChartData();
         this.isCycleRunning = true;
         cycleButton.textContent = 'Stop Cycle';
-        this.initializeStream();
+        this.initializeStream(result.startTimeMs);
         this.eventManager.addNavigationEventListeners();
       } catch (error) {
         console.error("Error starting cycle stream:", error);
@@ -14,6 +14,7 @@ export default class SensorManager {
    * @param {number} startTime - The start time timestamp
    */
   createEventSource(startTime) {
+    this.loadRecentReadings(startTime);
     this.eventSource = new EventSource('/stream');
 
     this.eventSource.onmessage = (event) => {
@@ -28,6 +29,61 @@ export default class SensorManager {
     };
   }
 
+  /**
+   * Fetches the latest reading of every sensor from the server's in-memory buffer
+   * @returns {Promise<Object>} Sensor id mapped to {temperature, epochUs, missed}
+   */
+  async fetchLatest() {
+    const response = await fetch('/readings/latest');
+    return response.ok ? response.json() : {};
+  }
+
+  /**
+   * Fetches the recent readings of one or all sensors from the server's in-memory buffer
+   * @param {number} seconds - Length of the window in seconds
+   * @param {string} [sensor] - Sensor id, all sensors when omitted
+   * @returns {Promise<Object>} Sensor id mapped to {epochUs: [], temperatures: []}
+   */
+  async fetchWindow(seconds, sensor) {
+    const params = new URLSearchParams({ seconds });
+    if (sensor) {
+      params.set('sensor', sensor);
+    }
+    const response = await fetch(`/readings/window?${params}`);
+    return response.ok ? response.json() : {};
+  }
+
+  /**
+   * Fills the chart with the readings acquired since the cycle started on the server,
+   * e.g. those between the /start_cycle response and the stream connecting
+   * @param {number} startTime - Server start time of the cycle (epoch ms, from /start_cycle)
+   */
+  async loadRecentReadings(startTime) {
+    const seconds = (Date.now() - startTime) / 1000;
+    if (seconds <= 0 || !this.sensorGraph.chartManager.chartInstance) {
+      return;
+    }
+
+    try {
+      const history = await this.fetchWindow(seconds);
+      let lastElapsed = 0;
+      Object.entries(history).forEach(([sensorName, { epochUs, temperatures }]) => {
+        this.availableSensors.add(sensorName);
+        this.selectedSensors.add(sensorName);
+        epochUs.forEach((ts, i) => {
+          const elapsedSeconds = (ts / 1000 - startTime) / 1000;
+          lastElapsed = Math.max(lastElapsed, elapsedSeconds);
+          this.sensorGraph.chartManager.updateChartData(
+            { [sensorName]: temperatures[i] }, elapsedSeconds, this.selectedSensors, false);
+        });
+      });
+      this.renderSensorList();
+      this.sensorGraph.chartManager.updateChartXAxisRange(lastElapsed);
+    } catch (error) {
+      console.error('Failed to load recent readings:', error);
+    }
+  }
+
   /**
    * Closes the event source if it exists
    */
@@ -0,0 +1,282 @@
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNKED_AVAILABLE = np is not None
+
+# Each row holds one sensor's samples for one fixed-duration window. The header
+# columns let range queries skip chunks without decoding the blobs.
+SENSOR_CHUNKS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    cycle_id INTEGER NOT NULL,
+    sensor_key INTEGER NOT NULL,
+    chunk_start INTEGER NOT NULL,
+    t_min INTEGER NOT NULL,
+    t_max INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    v_min REAL,
+    v_max REAL,
+    ts_blob BLOB NOT NULL,
+    value_blob BLOB NOT NULL,
+    PRIMARY KEY (cycle_id, sensor_key, chunk_start)
+) WITHOUT ROWID
+'''
+
+UPSERT_CHUNK_SQL = '''
+INSERT OR REPLACE INTO {schema}.sensor_chunks
+    (cycle_id, sensor_key, chunk_start, t_min, t_max, n, v_min, v_max, ts_blob, value_blob)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _shuffle(words):
+    """Group the bytes of 64-bit words by significance so zlib sees long zero runs."""
+    return words.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(data, n):
+    return np.frombuffer(data, dtype=np.uint8).reshape(8, n).T.copy().view(np.uint64).ravel()
+
+
+def encode_timestamps(ts):
+    """Delta-of-delta encode int64 timestamps: [first, first delta, dod...] zigzagged, shuffled and deflated."""
+    ts = np.asarray(ts, dtype=np.int64)
+    dod = np.empty_like(ts)
+    dod[0] = ts[0]
+    if len(ts) > 1:
+        deltas = np.diff(ts)
+        dod[1] = deltas[0]
+        dod[2:] = np.diff(deltas)
+    zigzag = ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+    return zlib.compress(_shuffle(zigzag))
+
+
+def decode_timestamps(blob, n):
+    """Inverse of encode_timestamps, two cumulative sums."""
+    zigzag = _unshuffle(zlib.decompress(blob), n)
+    dod = ((zigzag >> np.uint64(1)).view(np.int64)) ^ -((zigzag & np.uint64(1)).view(np.int64))
+    deltas = np.cumsum(dod[1:])
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = dod[0]
+    ts[1:] = dod[0] + np.cumsum(deltas)
+    return ts
+
+
+def encode_values(values):
+    """XOR every float64 with its predecessor (Gorilla style), then shuffle and deflate.
+
+    Slowly changing readings share sign, exponent and leading mantissa bits, so the XOR
+    words are mostly zero bytes. Unlike Gorilla's bit packing this decodes with one
+    vectorized XOR scan.
+    """
+    bits = np.asarray(values, dtype=np.float64).view(np.uint64)
+    xored = bits.copy()
+    xored[1:] ^= bits[:-1]
+    return zlib.compress(_shuffle(xored))
+
+
+def decode_values(blob, n):
+    """Inverse of encode_values, a cumulative XOR."""
+    return np.bitwise_xor.accumulate(_unshuffle(zlib.decompress(blob), n)).view(np.float64)
+
+
+def encode_chunk(ts, values):
+    """Return the header and blobs of a chunk: (t_min, t_max, n, v_min, v_max, ts_blob, value_blob)."""
+    return (int(ts[0]), int(ts[-1]), len(ts), float(np.min(values)), float(np.max(values)),
+            encode_timestamps(ts), encode_values(values))
+
+
+def decode_chunk(ts_blob, value_blob, n):
+    """Return (timestamps, values) arrays of a chunk."""
+    return decode_timestamps(ts_blob, n), decode_values(value_blob, n)
+
+
+class _OpenChunk:
+    """Samples of one sensor's current window, and when they were last written."""
+    __slots__ = ('start', 'ts', 'values', 'known', 'dirty', 'persisted_at')
+
+    def __init__(self, start, ts=(), values=()):
+        self.start = start
+        self.ts = list(ts)
+        self.values = list(values)
+        self.known = set(self.ts)
+        self.dirty = False
+        self.persisted_at = None
+
+    def add(self, ts, value):
+        """Append a sample, returning False if the window already holds one at ts."""
+        if ts in self.known:
+            return False
+        self.known.add(ts)
+        self.ts.append(ts)
+        self.values.append(value)
+        return True
+
+
+class ChunkedSeriesWriter:
+    """Packs incoming readings into per-sensor chunks of chunk_duration seconds.
+
+    Used as the sample writer's flush hook. A chunk is encoded and upserted when it
+    closes (a sample of a later window arrives), when it is first created, and otherwise
+    at most every persist_interval seconds, so a window costs a bounded number of
+    encodes; readings of the open window that arrived since are only in memory until
+    then. flush() writes every open chunk now, close_cycle() also drops the cycle's
+    chunks from memory when it ends.
+
+    A window that already has a stored chunk (after a restart, with a new writer or for
+    a late sample) is loaded and merged, so a stored chunk is never overwritten by a
+    partial one. A sample whose timestamp the window already holds is skipped; calling
+    the writer returns the rows it accepted, so rollups only fold those.
+
+    Chunks are written inside the caller's transaction, so the writer cannot tell if they
+    were committed. rollback() must be called when that transaction failed: the chunks of
+    the failed write are marked unwritten again, and closed or late ones, which are no
+    longer open, are kept to be written with the next call.
+    """
+
+    def __init__(self, schema='main', chunk_duration=600, persist_interval=60.0, clock=time.monotonic):
+        if not CHUNKED_AVAILABLE:
+            raise RuntimeError("numpy is required for the chunked storage engine")
+        self.schema = schema
+        self.upsert_sql = UPSERT_CHUNK_SQL.format(schema=schema)
+        self.width = int(chunk_duration * 1_000_000)
+        self.persist_interval = persist_interval
+        self.clock = clock
+        self._open = {}  # (cycle_id, sensor_key) -> _OpenChunk
+        self._written = {}  # (cycle_id, sensor_key, chunk_start) -> chunk of the last, uncommitted write
+        self._retry = {}  # Closed or late chunks of a rolled back write
+
+    def _load(self, conn, cycle_id, sensor_key, chunk_start):
+        """The stored chunk of a window as an _OpenChunk, empty if there is none."""
+        row = conn.execute(f"""
+            SELECT n, ts_blob, value_blob FROM {self.schema}.sensor_chunks
+            WHERE cycle_id = ? AND sensor_key = ? AND chunk_start = ?
+        """, (cycle_id, sensor_key, chunk_start)).fetchone()
+        if row is None:
+            return _OpenChunk(chunk_start)
+        ts, values = decode_chunk(row[1], row[2], row[0])
+        chunk = _OpenChunk(chunk_start, ts.tolist(), values.tolist())
+        chunk.persisted_at = self.clock()
+        return chunk
+
+    def __call__(self, conn, rows):
+        accepted = []
+        # (cycle_id, sensor_key, chunk_start) -> chunk to write in this flush, tracked from
+        # the start so a failure halfway still lets rollback() find the closed chunks
+        due = self._begin(self._retry)
+        self._retry = {}
+        for row in rows:
+            cycle_id, sensor_key, ts, temperature = row
+            if temperature is None:
+                continue
+            key = (cycle_id, sensor_key)
+            chunk_start = ts - ts % self.width
+            chunk = self._open.get(key)
+            if chunk is not None and chunk.start > chunk_start:
+                # Late sample for an already closed window, merged into its stored chunk
+                # (or into the unwritten one kept for a retry, which is already in due)
+                late = due.get(key + (chunk_start,))
+                if late is None:
+                    late = due[key + (chunk_start,)] = self._load(conn, cycle_id, sensor_key, chunk_start)
+                if late.add(ts, temperature):
+                    accepted.append(row)
+                continue
+            if chunk is None or chunk.start != chunk_start:
+                if chunk is not None:
+                    due[key + (chunk.start,)] = chunk  # The window closed
+                chunk = self._open[key] = self._load(conn, cycle_id, sensor_key, chunk_start)
+            if chunk.add(ts, temperature):
+                chunk.dirty = True
+                accepted.append(row)
+
+        now = self.clock()
+        for key, chunk in self._open.items():
+            if chunk.dirty and (chunk.persisted_at is None or now - chunk.persisted_at >= self.persist_interval):
+                due[key + (chunk.start,)] = chunk
+        self._write(conn, due)
+        return accepted
+
+    def _begin(self, chunks):
+        """Start tracking the chunks of a write, the previous write was committed if no rollback() came."""
+        self._written = dict(chunks)
+        return self._written
+
+    def rollback(self):
+        """Mark the chunks of the last write unwritten again, after its transaction failed."""
+        for key, chunk in self._written.items():
+            chunk.dirty = True
+            chunk.persisted_at = None
+            if self._open.get(key[:2]) is not chunk:
+                self._retry[key] = chunk
+        self._written = {}
+
+    def _write(self, conn, chunks):
+        chunk_rows = []
+        now = self.clock()
+        for (cycle_id, sensor_key, chunk_start), chunk in chunks.items():
+            if not chunk.ts:
+                continue
+            order = np.argsort(chunk.ts, kind='stable')
+            ts_array = np.asarray(chunk.ts, dtype=np.int64)[order]
+            value_array = np.asarray(chunk.values, dtype=np.float64)[order]
+            chunk_rows.append((cycle_id, sensor_key, chunk_start) + encode_chunk(ts_array, value_array))
+            chunk.dirty = False
+            chunk.persisted_at = now
+        conn.executemany(self.upsert_sql, chunk_rows)
+
+    def flush(self, conn, cycle_id=None):
+        """Write the open chunks with unwritten samples (of one cycle, or all) now."""
+        due = self._begin(self._retry)
+        self._retry = {}
+        due.update({key + (chunk.start,): chunk for key, chunk in self._open.items()
+                    if chunk.dirty and (cycle_id is None or key[0] == cycle_id)})
+        self._write(conn, due)
+
+    def close_cycle(self, conn, cycle_id=None):
+        """Write the open chunks of a finished cycle (None for all) and forget them."""
+        self.flush(conn, cycle_id)
+        self._open = {key: chunk for key, chunk in self._open.items()
+                      if cycle_id is not None and key[0] != cycle_id}
+
+
+def cycle_chunk_sensors(conn, cycle_id, schema='main'):
+    """Return the sensor keys that have chunks in a cycle."""
+    cursor = conn.execute(f"SELECT DISTINCT sensor_key FROM {schema}.sensor_chunks WHERE cycle_id = ?", (cycle_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def iter_chunk_readings(conn, cycle_id, sensor_key, start=None, end=None, schema='main'):
+    """Yield (ts, temperature) of one sensor in time order, skipping chunks outside [start, end]."""
+    for ts, values in iter_chunk_arrays(conn, cycle_id, sensor_key, start, end, schema):
+        yield from zip(ts.tolist(), values.tolist())
+
+
+def iter_chunk_arrays(conn, cycle_id, sensor_key, start=None, end=None, schema='main'):
+    """Yield the (timestamps, values) arrays of one sensor chunk by chunk, cut to [start, end]."""
+    sql = f'''
+        SELECT n, ts_blob, value_blob FROM {schema}.sensor_chunks
+        WHERE cycle_id = ? AND sensor_key = ?
+    '''
+    args = [cycle_id, sensor_key]
+    if start is not None:
+        sql += " AND t_max >= ?"
+        args.append(start)
+    if end is not None:
+        sql += " AND t_min <= ?"
+        args.append(end)
+    cursor = conn.execute(sql + " ORDER BY chunk_start", args)
+
+    while True:
+        row = cursor.fetchone()
+        if row is None:
+            break
+        ts, values = decode_chunk(row[1], row[2], row[0])
+        if start is not None or end is not None:
+            lo = 0 if start is None else np.searchsorted(ts, start, side='left')
+            hi = len(ts) if end is None else np.searchsorted(ts, end, side='right')
+            ts, values = ts[lo:hi], values[lo:hi]
+        yield ts, values
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from database.ChunkedStorage import iter_chunk_arrays
+from database.CycleExporter import CycleExporter
+
+COLUMNAR_AVAILABLE = np is not None
+META_FILE = 'meta.json'
+TIMESTAMP_SUFFIX = 'ts.i8'
+
+
+def _iter_sensor_arrays(conn, cycle_id, sensor_key, schema, engine, batch_rows):
+    """Yield (timestamps, values) arrays of one sensor in time order, per decoded chunk or fetchmany batch."""
+    if engine == 'chunked':
+        yield from iter_chunk_arrays(conn, cycle_id, sensor_key, schema=schema)
+        return
+
+    cursor = conn.execute(f'''
+        SELECT ts, temperature FROM {schema}.sensor_readings
+        WHERE cycle_id = ? AND sensor_key = ?
+        ORDER BY ts
+    ''', (cycle_id, sensor_key))
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        ts, values = zip(*rows)
+        # Converted column by column in C, a missing value (None) becomes NaN
+        yield np.array(ts, dtype=np.int64), np.array(values, dtype=np.float64)
+
+
+def write_columnar_cycle(database, cycle_id, directory, dtype='float64', chunk_rows=65536):
+    """Write a finished cycle as one timestamp vector and one value array per sensor.
+
+    Format: meta.json lists every sensor with its value file ``<i>.<dtype>``, its
+    timestamp file ``<i>.ts.i8`` (epoch microseconds) and its length. Every sensor keeps
+    only its own readings, so sensors sampled at different periods or times take no
+    padding; a reading logged without a value is NaN. Sensors are streamed from the
+    database one after the other and appended a whole array at a time (a fetchmany
+    batch of chunk_rows readings, or a decoded chunk), so memory stays bounded.
+    Returns the total number of readings.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for the columnar archive")
+
+    dtype = np.dtype(dtype)
+    tmp_directory = f"{directory}.tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    exporter = CycleExporter(database)
+    entries = []
+    engine = database.get_storage_engine(cycle_id)
+    with database.open_cycle(cycle_id) as (conn, schema):
+        sensors = exporter.cycle_sensors(conn, cycle_id, schema, engine)
+        for i, (name, key) in enumerate(sensors):
+            entry = {'name': name, 'file': f"{i}.{dtype.str[1:]}", 'ts_file': f"{i}.{TIMESTAMP_SUFFIX}", 'length': 0}
+            with open(os.path.join(tmp_directory, entry['ts_file']), 'wb') as ts_file, \
+                    open(os.path.join(tmp_directory, entry['file']), 'wb') as value_file:
+                for ts, values in _iter_sensor_arrays(conn, cycle_id, key, schema, engine, chunk_rows):
+                    ts.tofile(ts_file)
+                    values.astype(dtype, copy=False).tofile(value_file)
+                    entry['length'] += len(ts)
+            entries.append(entry)
+
+    length = sum(entry['length'] for entry in entries)
+    meta = {
+        'cycle_id': cycle_id,
+        'format': 2,
+        'length': length,
+        'dtype': dtype.str,
+        'sensors': entries,
+    }
+    with open(os.path.join(tmp_directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+    return length
+
+
+class ColumnarCycle:
+    """Read-only view on a columnar cycle archive backed by numpy.memmap.
+
+    Opening only reads meta.json; arrays are mapped lazily and every slice is a
+    zero-copy view into the page cache.
+    """
+
+    def __init__(self, directory):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar archive")
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.length = self.meta['length']
+        self.dtype = np.dtype(self.meta['dtype'])
+        self.sensors = {sensor['name']: sensor for sensor in self.meta['sensors']}
+        self._arrays = {}
+
+    @property
+    def sensor_names(self):
+        return list(self.sensors)
+
+    def _entry(self, name):
+        entry = self.sensors.get(name)
+        if entry is None:
+            raise KeyError(f"Sensor '{name}' not in cycle {self.meta['cycle_id']}")
+        return entry
+
+    def _map(self, filename, dtype, length):
+        array = self._arrays.get(filename)
+        if array is None:
+            if length == 0:
+                array = np.empty(0, dtype=dtype)
+            else:
+                array = np.memmap(os.path.join(self.directory, filename), dtype=dtype, mode='r', shape=(length,))
+            self._arrays[filename] = array
+        return array
+
+    def timestamps(self, name):
+        """Epoch microsecond timestamps of one sensor's readings."""
+        entry = self._entry(name)
+        return self._map(entry['ts_file'], np.int64, entry['length'])
+
+    def sensor(self, name):
+        """Full value array of one sensor, NaN for readings without a value."""
+        entry = self._entry(name)
+        return self._map(entry['file'], self.dtype, entry['length'])
+
+    def window(self, name, start=None, end=None):
+        """Return (timestamps, values) views of one sensor between start and end (epoch microseconds)."""
+        timestamps = self.timestamps(name)
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return timestamps[lo:hi], self.sensor(name)[lo:hi]
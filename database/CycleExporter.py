@@ -0,0 +1,158 @@
+import csv
+import heapq
+import io
+import json
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+
+from database.ChunkedStorage import iter_chunk_readings
+
+
+def epoch_us_to_iso(ts):
+    """Convert epoch microseconds to a local ISO-8601 timestamp without float rounding."""
+    return (datetime.fromtimestamp(ts // 1_000_000) + timedelta(microseconds=ts % 1_000_000)).isoformat()
+
+
+class _StreamBuffer:
+    """Write-only file object collecting the bytes zipfile produces so they can be yielded."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class CycleExporter:
+    """Streams the readings of logged cycles as CSV or NDJSON with flat memory use.
+
+    Every sensor of a cycle is read with its own cursor in ``fetchmany`` chunks along the
+    (cycle_id, sensor_key, ts) primary key, and the per-sensor streams are merged on ts.
+    Nothing is ever held in memory beyond one chunk per sensor.
+    """
+
+    FORMATS = ('csv', 'ndjson')
+    LAYOUTS = ('long', 'wide')
+
+    def __init__(self, database, chunk_size=1000):
+        self.database = database
+        self.chunk_size = chunk_size
+
+    def cycle_sensors(self, conn, cycle_id, schema='main', engine='rows'):
+        """Return (name, sensor_key) pairs of the sensors that logged during a cycle."""
+        table = 'sensor_chunks' if engine == 'chunked' else 'sensor_readings'
+        cursor = conn.execute(f'''
+            SELECT s.name, s.sensor_key FROM main.sensors s
+            WHERE EXISTS (SELECT 1 FROM {schema}.{table} r WHERE r.cycle_id = ? AND r.sensor_key = s.sensor_key)
+            ORDER BY s.name
+        ''', (cycle_id,))
+        return cursor.fetchall()
+
+    def _iter_sensor(self, conn, cycle_id, name, sensor_key, schema='main', engine='rows'):
+        """Yield (ts, name, temperature) of one sensor in time order, chunk by chunk."""
+        if engine == 'chunked':
+            for ts, temperature in iter_chunk_readings(conn, cycle_id, sensor_key, schema=schema):
+                yield ts, name, temperature
+            return
+
+        cursor = conn.execute(f'''
+            SELECT ts, temperature FROM {schema}.sensor_readings
+            WHERE cycle_id = ? AND sensor_key = ?
+            ORDER BY ts
+        ''', (cycle_id, sensor_key))
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            for ts, temperature in rows:
+                yield ts, name, temperature
+
+    def iter_readings(self, conn, cycle_id, sensors, schema='main', engine='rows'):
+        """Merge the per-sensor streams into one stream ordered by ts, then sensor name."""
+        return heapq.merge(*(self._iter_sensor(conn, cycle_id, name, key, schema, engine) for name, key in sensors))
+
+    def iter_rows(self, cycle_id, layout='long'):
+        """Yield the header followed by the rows of a cycle in the requested layout."""
+        engine = self.database.get_storage_engine(cycle_id)
+        with self.database.open_cycle(cycle_id) as (conn, schema):
+            sensors = self.cycle_sensors(conn, cycle_id, schema, engine)
+            readings = self.iter_readings(conn, cycle_id, sensors, schema, engine)
+
+            if layout == 'long':
+                yield ['timestamp', 'sensor', 'temperature']
+                for ts, name, temperature in readings:
+                    yield [epoch_us_to_iso(ts), name, temperature]
+            else:
+                names = [name for name, _ in sensors]
+                yield ['timestamp'] + names
+                column = {name: i + 1 for i, name in enumerate(names)}
+                current_ts, row = None, None
+                for ts, name, temperature in readings:
+                    if ts != current_ts:
+                        if row is not None:
+                            yield row
+                        current_ts = ts
+                        row = [epoch_us_to_iso(ts)] + [None] * len(names)
+                    row[column[name]] = temperature
+                if row is not None:
+                    yield row
+
+    def iter_encoded(self, cycle_id, fmt='csv', layout='long'):
+        """Yield the cycle encoded as CSV or NDJSON, in byte chunks of roughly chunk_size rows."""
+        rows = self.iter_rows(cycle_id, layout)
+        header = next(rows)
+        buffer = io.StringIO()
+
+        if fmt == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(header)
+            encode = writer.writerow
+        else:
+            def encode(row):
+                buffer.write(json.dumps(dict(zip(header, row))))
+                buffer.write('\n')
+
+        pending = 0
+        for row in rows:
+            encode(row)
+            pending += 1
+            if pending >= self.chunk_size:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def gzip_stream(chunks):
+        """Compress a byte stream on the fly into the gzip format."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def zip_stream(self, entries, fmt='csv', layout='long'):
+        """Stream several cycles as one zip archive. entries is a list of (filename, cycle_id)."""
+        buffer = _StreamBuffer()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for filename, cycle_id in entries:
+                with archive.open(filename, 'w', force_zip64=True) as member:
+                    for chunk in self.iter_encoded(cycle_id, fmt, layout):
+                        member.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+        yield buffer.drain()
@@ -0,0 +1,201 @@
+import threading
+import time
+
+
+class LatencyHistogram:
+    """HDR-style histogram of durations in nanoseconds.
+
+    Values below 2 * 2**SUB_BITS ns are counted exactly; above that every power of two
+    is split into 2**SUB_BITS linear sub-buckets, so a recorded value is off by at most
+    1/2**SUB_BITS (about 6%) from its bucket bound while the counts fit in a few hundred
+    slots covering nanoseconds up to minutes. record() is a handful of integer operations.
+    """
+    SUB_BITS = 4
+    MAX_BITS = 42  # Longer durations (over an hour) are counted in the last bucket
+
+    def __init__(self):
+        sub = 1 << self.SUB_BITS
+        self._last = (self.MAX_BITS - self.SUB_BITS) * sub + 2 * sub - 1
+        self.counts = [0] * (self._last + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value):
+        shift = value.bit_length() - self.SUB_BITS - 1
+        if shift <= 0:
+            return value
+        return min((shift << self.SUB_BITS) + (value >> shift), self._last)
+
+    def _upper(self, index):
+        """Largest value counted in bucket index"""
+        sub = 1 << self.SUB_BITS
+        if index < 2 * sub:
+            return index
+        shift = (index >> self.SUB_BITS) - 1
+        return ((index - (shift << self.SUB_BITS) + 1) << shift) - 1
+
+    def record(self, value_ns):
+        value_ns = max(int(value_ns), 0)
+        index = self._index(value_ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value_ns
+            if value_ns > self.max:
+                self.max = value_ns
+
+    def quantile(self, q):
+        """Upper bound (ns) of the bucket holding the q-th quantile, 0 when empty."""
+        with self._lock:
+            if not self.count:
+                return 0
+            rank = max(1, int(q * self.count + 0.5))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(self._upper(index), self.max)
+        return self.max
+
+    def snapshot(self, quantiles=(0.5, 0.9, 0.99, 0.999)):
+        """Count, sum, max and quantiles, all durations in seconds."""
+        return {
+            'count': self.count,
+            'sum': self.total / 1e9,
+            'max': self.max / 1e9,
+            'quantiles': {q: self.quantile(q) / 1e9 for q in quantiles},
+        }
+
+
+class Timer:
+    """Context manager recording the duration of its block into a histogram."""
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.record(time.perf_counter_ns() - self.started)
+
+
+class MetricsRegistry:
+    """Process-wide registry of latency histograms, counters and gauges.
+
+    Histograms and counters are keyed by name and an optional label value (e.g. the
+    sensor id); hot paths look them up once and keep the object. Gauges are callbacks
+    evaluated when the metrics are read, returning a number or {label value: number},
+    so queue depths and similar values cost nothing between scrapes.
+    """
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, prefix='climate_chamber'):
+        self.prefix = prefix
+        self._histograms = {}  # name -> (help, label, {label value: LatencyHistogram})
+        self._counters = {}  # name -> (help, label, {label value: int})
+        self._gauges = {}  # name -> (help, label, callback)
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text='', label=None, label_value=None):
+        """Return the histogram of name (and label_value), created on first use."""
+        with self._lock:
+            _, _, series = self._histograms.setdefault(name, (help_text, label, {}))
+            histogram = series.get(label_value)
+            if histogram is None:
+                histogram = series[label_value] = LatencyHistogram()
+            return histogram
+
+    def timer(self, name, help_text='', label=None, label_value=None):
+        """Context manager timing a block into the histogram of name."""
+        return Timer(self.histogram(name, help_text, label, label_value))
+
+    def increment(self, name, amount=1, help_text='', label=None, label_value=None):
+        with self._lock:
+            _, _, series = self._counters.setdefault(name, (help_text, label, {}))
+            series[label_value] = series.get(label_value, 0) + amount
+
+    def gauge(self, name, callback, help_text='', label=None):
+        """Register (or replace) a gauge read from callback() at scrape time."""
+        with self._lock:
+            self._gauges[name] = (help_text, label, callback)
+
+    def _gauge_values(self):
+        values = {}
+        for name, (help_text, label, callback) in list(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Metrics: Gauge {name} failed: {str(e)}")
+                continue
+            if value is None:
+                continue
+            values[name] = (help_text, label, value if isinstance(value, dict) else {None: value})
+        return values
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict, durations in seconds."""
+        with self._lock:
+            histograms = {name: (label, dict(series)) for name, (_, label, series) in self._histograms.items()}
+            counters = {name: (label, dict(series)) for name, (_, label, series) in self._counters.items()}
+
+        def by_label(series, convert):
+            if list(series) == [None]:
+                return convert(series[None])
+            return {str(label_value): convert(value) for label_value, value in series.items()}
+
+        return {
+            'histograms': {name: by_label(series, lambda h: h.snapshot(self.QUANTILES))
+                           for name, (_, series) in histograms.items()},
+            'counters': {name: by_label(series, lambda v: v) for name, (_, series) in counters.items()},
+            'gauges': {name: by_label(series, lambda v: v) for name, (_, _, series) in self._gauge_values().items()},
+        }
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format, histograms as summaries."""
+        lines = []
+
+        def labels(label, label_value, extra=None):
+            pairs = []
+            if label and label_value is not None:
+                pairs.append(f'{label}="{_escape(label_value)}"')
+            if extra:
+                pairs.append(extra)
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        with self._lock:
+            histograms = sorted((name, help_text, label, dict(series))
+                                for name, (help_text, label, series) in self._histograms.items())
+            counters = sorted((name, help_text, label, dict(series))
+                              for name, (help_text, label, series) in self._counters.items())
+
+        for name, help_text, label, series in histograms:
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+            for label_value, histogram in series.items():
+                for q in self.QUANTILES:
+                    quantile = 'quantile="%s"' % q
+                    lines.append(f"{metric}{labels(label, label_value, quantile)} {histogram.quantile(q) / 1e9:.9f}")
+                lines.append(f"{metric}_sum{labels(label, label_value)} {histogram.total / 1e9:.9f}")
+                lines.append(f"{metric}_count{labels(label, label_value)} {histogram.count}")
+        for name, help_text, label, series in counters:
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{labels(label, label_value)} {value}" for label_value, value in series.items()]
+        for name, (help_text, label, series) in sorted(self._gauge_values().items()):
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f"{metric}{labels(label, label_value)} {value}" for label_value, value in series.items()]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Single registry for the application
+metrics = MetricsRegistry()
@@ -0,0 +1,229 @@
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TUNER_AVAILABLE = np is not None
+
+# Limit of the integral term, shared with the controller
+INTEGRAL_LIMIT = 100
+
+
+def pid_update(error, last_error, integral, dt, kp, ki, kd):
+    """One step of the chamber's PID law, returns (output, integral).
+
+    Positive output is heating power and negative output cooling power in percent.
+    ClimateChamberController.apply_control uses this function, so the tuner simulates
+    exactly the control law that runs on the chamber.
+    """
+    # Update integral term (with anti-windup)
+    integral = max(-INTEGRAL_LIMIT, min(INTEGRAL_LIMIT, integral + error * dt))
+    # Calculate derivative term
+    derivative = (error - last_error) / dt if dt > 0 else 0
+    return kp * error + ki * integral + kd * derivative, integral
+
+
+class FirstOrderPlant(namedtuple('FirstOrderPlant', ['tau', 'ambient', 'heat_rate', 'cool_rate', 'delay'])):
+    """Chamber model dT/dt = (ambient - T) / tau + heating% * heat_rate - cooling% * cool_rate.
+
+    tau is the time constant in seconds, heat_rate and cool_rate are degrees per second per
+    percent of duty cycle and delay is the measurement delay in seconds. It is the air node
+    of the mock ThermalSimulator reduced to one state.
+    """
+    __slots__ = ()
+
+
+TuningResult = namedtuple('TuningResult', ['kp', 'ki', 'kd', 'tracking_error', 'overshoot', 'settling_time', 'score'])
+
+
+def fit_plant(times, temperatures, outputs=None, output_times=None, delay=0.0, smoothing=5):
+    """Fit a FirstOrderPlant to a logged temperature series (times in seconds).
+
+    With the logged control output (outputs at output_times, positive heating and negative
+    cooling percent) the model is linear in its parameters, so a least-squares fit of
+    dT/dt = c0 + c1 * T + c2 * heating + c3 * cooling gives tau = -1/c1, ambient = c0 * tau
+    and the heating and cooling rates directly.
+
+    Without it the fit is coarse: the line dT/dt = c0 + c1 * T gives tau and ambient, and
+    the rates are taken from the fastest rises and falls that line does not explain (99th
+    and 1st percentile of the residual), where the actuators ran at or near full power.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required to fit a plant model")
+    times = np.asarray(times, dtype=np.float64)
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    if len(times) < 10:
+        raise ValueError("At least 10 readings are needed to fit a plant model")
+
+    # Resample on a uniform grid and smooth before differentiating
+    dt = float(np.median(np.diff(times)))
+    grid = np.arange(times[0], times[-1], dt)
+    columns = [np.interp(grid, times, temperatures)]
+    if outputs is not None:
+        # The output is held until the next control step
+        output_times = np.asarray(output_times, dtype=np.float64)
+        held = np.asarray(outputs, dtype=np.float64)[np.clip(np.searchsorted(output_times, grid, 'right') - 1, 0, None)]
+        columns += [np.clip(held, 0, 100), np.clip(-held, 0, 100)]
+    if smoothing > 1 and len(grid) > smoothing:
+        window = np.ones(smoothing) / smoothing
+        columns = [np.convolve(column, window, mode='valid') for column in columns]
+    series = columns[0]
+    slope = np.gradient(series, dt)
+
+    design = np.column_stack([np.ones_like(series), *columns])
+    coefficients, *_ = np.linalg.lstsq(design, slope, rcond=None)
+    c0, c1 = coefficients[:2]
+    tau = -1.0 / c1 if c1 < 0 else 1e6  # No measurable loss, treat the chamber as insulated
+    ambient = c0 * tau if c1 < 0 else float(np.mean(series))
+    if outputs is not None:
+        heat_rate, cool_rate = coefficients[2], -coefficients[3]
+    else:
+        residual = slope - design @ coefficients
+        heat_rate = np.percentile(residual, 99) / 100
+        cool_rate = -np.percentile(residual, 1) / 100
+    # Rates per percent of duty cycle
+    return FirstOrderPlant(float(tau), float(ambient), max(float(heat_rate), 1e-8), max(float(cool_rate), 1e-8),
+                           float(delay))
+
+
+def simulate(plant, targets, dt, kp, ki, kd, initial=None):
+    """Run the PID law against the plant for a target per control step, returns the temperatures."""
+    temperature = plant.ambient if initial is None else initial
+    decay = math.exp(-dt / plant.tau)
+    delay_steps = int(round(plant.delay / dt))
+    measured = deque([temperature] * (delay_steps + 1), maxlen=delay_steps + 1)
+    integral = 0.0
+    last_error = 0.0
+    step_dt = 1.0  # apply_control defaults to 1 second on its first run
+    temperatures = []
+    for target in targets:
+        error = target - measured[0]
+        output, integral = pid_update(error, last_error, integral, step_dt, kp, ki, kd)
+        last_error = error
+        step_dt = dt
+        # The chamber clamps the duty cycles to 0-100%
+        if output > 0:
+            rate = min(output, 100) * plant.heat_rate
+        else:
+            rate = -min(-output, 100) * plant.cool_rate
+        # Exact first-order step with the input held for dt
+        equilibrium = plant.ambient + plant.tau * rate
+        temperature = equilibrium + (temperature - equilibrium) * decay
+        measured.append(temperature)
+        temperatures.append(temperature)
+    return temperatures
+
+
+def score_response(targets, temperatures, dt, band=0.5, overshoot_weight=1.0, settling_weight=0.01):
+    """Tracking error (mean absolute error), overshoot and settling time of one simulated run.
+
+    Overshoot is the largest excursion past the target in the direction the target last
+    moved; settling time is the longest time a hold segment (constant target) needs before
+    the error stays within band. score weighs them as
+    tracking_error + overshoot_weight * overshoot + settling_weight * settling_time.
+    """
+    targets = np.asarray(targets, dtype=np.float64)
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    error = temperatures - targets
+    tracking_error = float(np.mean(np.abs(error)))
+
+    # Direction of the last target change, carried forward over hold segments (0 before the first change)
+    change = np.sign(np.diff(targets, prepend=targets[0]))
+    direction = change[np.maximum.accumulate(np.where(change != 0, np.arange(len(change)), 0))]
+    overshoot = max(0.0, float(np.max(direction * error)))
+
+    settling_time = 0.0
+    hold = np.diff(targets, prepend=np.nan) == 0
+    starts = np.flatnonzero(hold & ~np.roll(hold, 1))
+    for start in starts:
+        end = start
+        while end < len(hold) and hold[end]:
+            end += 1
+        outside = np.flatnonzero(np.abs(error[start:end]) > band)
+        settle = (outside[-1] + 1) * dt if len(outside) else 0.0
+        settling_time = max(settling_time, settle)
+
+    score = tracking_error + overshoot_weight * overshoot + settling_weight * settling_time
+    return tracking_error, overshoot, settling_time, score
+
+
+_worker = {}
+
+
+def _init_worker(plant, targets, dt, band, initial):
+    _worker.update(plant=plant, targets=targets, dt=dt, band=band, initial=initial)
+
+
+def _evaluate(gains):
+    kp, ki, kd = gains
+    temperatures = simulate(_worker['plant'], _worker['targets'], _worker['dt'], kp, ki, kd, _worker['initial'])
+    return TuningResult(kp, ki, kd, *score_response(_worker['targets'], temperatures, _worker['dt'], _worker['band']))
+
+
+DEFAULT_GRID = (
+    (0.5, 1.0, 2.0, 4.0, 8.0),  # kp
+    (0.0, 0.01, 0.05, 0.1, 0.5, 1.0),  # ki
+    (0.0, 1.0, 5.0),  # kd
+)
+
+
+def tune(plant, targets, dt=1.0, grid=DEFAULT_GRID, band=0.5, initial=None, max_workers=None):
+    """Simulate every (kp, ki, kd) of the grid against the plant in a process pool.
+
+    targets holds the target temperature of every control step (dt seconds apart).
+    Returns the TuningResults sorted from best to worst score.
+
+    The workers are spawned rather than forked: forking a server copies its running
+    threads' locks (and hardware handles) in whatever state they are in. Spawned workers
+    import the caller's main module though, so a server runs tune_in_subprocess instead.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for PID tuning")
+    gains = list(itertools.product(*grid))
+    targets = [float(target) for target in targets]
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(plant, targets, dt, band, initial)
+        results = [_evaluate(gain) for gain in gains]
+    else:
+        # The workers only need this module, the plant and the targets
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(plant, targets, dt, band, initial)) as pool:
+            results = list(pool.map(_evaluate, gains, chunksize=max(1, len(gains) // (4 * workers))))
+    return sorted(results, key=lambda result: result.score)
+
+
+def tune_in_subprocess(plant, targets, dt=1.0, grid=DEFAULT_GRID, band=0.5, initial=None, max_workers=None):
+    """Run tune() in a fresh interpreter running this module, and return its results.
+
+    The process pool is then started from that interpreter, so the workers only import
+    this module and never the server's main script with its app and hardware.
+    """
+    request = pickle.dumps((plant, [float(target) for target in targets], dt, grid, band, initial, max_workers))
+    completed = subprocess.run([sys.executable, '-m', 'database.PIDTuner'], input=request, capture_output=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode != 0:
+        raise RuntimeError(f"PID tuning failed: {completed.stderr.decode(errors='replace').strip()}")
+    return [TuningResult(*result) for result in pickle.loads(completed.stdout)]
+
+
+def _main():
+    """Entry point of tune_in_subprocess: pickled tune() arguments on stdin, result tuples on stdout."""
+    # Imported by name, so the spawned workers pickle database.PIDTuner functions, not __main__ ones
+    from database import PIDTuner
+    results = PIDTuner.tune(*pickle.load(sys.stdin.buffer))
+    pickle.dump([tuple(result) for result in results], sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    _main()
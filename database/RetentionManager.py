@@ -0,0 +1,324 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from database.ChunkedStorage import SENSOR_CHUNKS_TABLE_SQL
+from database.RollupStore import ROLLUP_RESOLUTIONS, has_rollups, rebuild_rollups
+from database.SchemaMigration import SENSOR_READINGS_TABLE_SQL
+
+ARCHIVE_SUFFIX = '.gz'
+
+
+def rehydrated_path(archive_path):
+    """Path of the decompressed working copy of an archived cycle."""
+    return archive_path[:-len(ARCHIVE_SUFFIX)] if archive_path.endswith(ARCHIVE_SUFFIX) else archive_path + '.db'
+
+
+def rehydrate_archive(archive_path):
+    """Decompress an archived cycle next to its archive, once, and return the SQLite file path."""
+    path = rehydrated_path(archive_path)
+    if not os.path.exists(path):
+        print(f"RetentionManager: Rehydrating archived cycle from {archive_path}")
+        tmp_path = path + '.tmp'
+        with gzip.open(archive_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, path)  # Concurrent readers never see a half-written file
+    os.utime(path)  # Mark as recently used for eviction
+    return path
+
+
+class RetentionManager:
+    """Background job moving old cycles from hot SQLite storage into compressed archive files.
+
+    A finished cycle is archived when it is older than max_age_days, or when the hot
+    readings exceed max_hot_bytes (oldest cycles first). Its readings are written to a
+    gzip-compressed per-cycle SQLite file; the cycle row and its rollups stay in the live
+    database. DatabaseManager.open_cycle rehydrates archived cycles on demand, and
+    rehydrated copies unused for rehydrate_ttl seconds are evicted again.
+
+    All work is done in small batches separated by throttle seconds, so the write lock
+    is never held long enough to stall the logging loop.
+    """
+
+    def __init__(self, database, archive_dir=None, max_age_days=None, max_hot_bytes=None,
+                 check_interval=3600, batch_size=5000, throttle=0.05, rehydrate_ttl=3600):
+        self.database = database
+        self.archive_dir = Path(archive_dir) if archive_dir else Path(database.db_path).with_name(
+            f"{Path(database.db_path).stem}_archive")
+        self.max_age_days = max_age_days
+        self.max_hot_bytes = max_hot_bytes
+        self.check_interval = check_interval
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.rehydrate_ttl = rehydrate_ttl
+
+        self._sizes = {}  # cycle_id -> estimated bytes of a finished cycle in the main database
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start the background retention job."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.__retention_loop, daemon=True)
+        self._thread.start()
+        print(f"RetentionManager: Started (max_age_days={self.max_age_days}, max_hot_bytes={self.max_hot_bytes})")
+
+    def stop(self):
+        """Stop the background retention job after the current batch."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __retention_loop(self):
+        """Background process applying the retention policy at a set interval."""
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except (sqlite3.Error, OSError) as e:
+                print(f"RetentionManager: Retention run failed: {str(e)}")
+            self._stop_event.wait(self.check_interval)
+
+    def _sleep(self):
+        """Yield to the logging loop between batches, returns False when stopping."""
+        return not self._stop_event.wait(self.throttle)
+
+    def run_once(self):
+        """Archive every cycle selected by the policy and evict stale rehydrated copies."""
+        archived = []
+        for cycle_id in self.select_cycles():
+            if self._stop_event.is_set():
+                break
+            if self.archive_cycle(cycle_id):
+                archived.append(cycle_id)
+        self.evict_rehydrated()
+        return archived
+
+    def hot_cycles(self):
+        """Return (cycle_id, end_time, estimated bytes) of finished cycles still in hot storage, oldest first.
+
+        Partitions are sized by their files. Readings in the main database are estimated
+        from the sample counts of the coarsest rollups, which are small to scan, times the
+        average row size of the file; only a cycle without rollups is counted row by row.
+        Finished cycles no longer change, so their estimates are kept between passes.
+        """
+        conn = sqlite3.connect(self.database.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT cycle_id, end_time, storage_path FROM cycles
+            WHERE end_time IS NOT NULL AND archive_path IS NULL
+            ORDER BY end_time
+        ''')
+        cycles = cursor.fetchall()
+
+        uncached = [cycle_id for cycle_id, _, storage_path in cycles
+                    if not storage_path and cycle_id not in self._sizes]
+        if uncached:
+            # Rows in the main database are sized by the average row size of the file
+            counts = dict(cursor.execute(
+                "SELECT cycle_id, SUM(count) FROM sensor_rollups WHERE resolution = ? GROUP BY cycle_id",
+                (ROLLUP_RESOLUTIONS[-1],)).fetchall())
+            # Chunked cycles have no rows, they are sized by their chunks
+            chunk_bytes = dict(cursor.execute(
+                "SELECT cycle_id, SUM(LENGTH(ts_blob) + LENGTH(value_blob)) FROM sensor_chunks GROUP BY cycle_id"
+            ).fetchall())
+            page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+            total_rows = sum(count for cycle_id, count in counts.items() if cycle_id not in chunk_bytes)
+            row_bytes = page_count * page_size / total_rows if total_rows else 0
+
+            for cycle_id in uncached:
+                if cycle_id in chunk_bytes:
+                    self._sizes[cycle_id] = chunk_bytes[cycle_id]
+                    continue
+                rows = counts.get(cycle_id)
+                if rows is None:
+                    cursor.execute("SELECT COUNT(*) FROM sensor_readings WHERE cycle_id = ?", (cycle_id,))
+                    rows = cursor.fetchone()[0]
+                self._sizes[cycle_id] = rows * row_bytes
+        conn.close()
+
+        result = []
+        for cycle_id, end_time, storage_path in cycles:
+            if storage_path:
+                size = sum(os.path.getsize(storage_path + suffix) for suffix in ('', '-wal')
+                           if os.path.exists(storage_path + suffix))
+            else:
+                size = self._sizes[cycle_id]
+            result.append((cycle_id, end_time, size))
+        return result
+
+    def select_cycles(self):
+        """Pick the cycles to archive according to the age and size budget."""
+        cycles = self.hot_cycles()
+        selected = []
+
+        if self.max_age_days is not None:
+            cutoff = datetime.now() - timedelta(days=self.max_age_days)
+            selected = [cycle_id for cycle_id, end_time, _ in cycles if datetime.fromisoformat(end_time) < cutoff]
+
+        if self.max_hot_bytes is not None:
+            hot_bytes = sum(size for cycle_id, _, size in cycles if cycle_id not in selected)
+            for cycle_id, _, size in cycles:
+                if hot_bytes <= self.max_hot_bytes:
+                    break
+                if cycle_id not in selected:
+                    selected.append(cycle_id)
+                    hot_bytes -= size
+        return selected
+
+    def archive_cycle(self, cycle_id):
+        """Move the readings of one finished cycle into a compressed archive file."""
+        storage_path = self.database.get_storage_path(cycle_id)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        archive_path = str(self.archive_dir / f"cycle_{cycle_id}.db{ARCHIVE_SUFFIX}")
+
+        # Rollups are what stays queryable without rehydrating, make sure they exist
+        engine = self.database.get_storage_engine(cycle_id)
+        with self.database.open_cycle(cycle_id) as (conn, schema):
+            if not has_rollups(conn, cycle_id):
+                with conn:
+                    rebuild_rollups(conn, cycle_id, schema, engine)
+
+        source_path = storage_path
+        if not storage_path:
+            source_path = str(self.archive_dir / f"cycle_{cycle_id}.copy.tmp")
+            if not self._copy_readings(cycle_id, source_path):
+                os.remove(source_path)
+                return False
+        elif not self._checkpoint(storage_path):
+            return False
+
+        if not self._compress(source_path, archive_path):
+            return False
+
+        conn = sqlite3.connect(self.database.db_path)
+        conn.execute("UPDATE cycles SET archive_path = ?, storage_path = NULL WHERE cycle_id = ?",
+                     (archive_path, cycle_id))
+        conn.commit()
+        conn.close()
+
+        # From here on readers use the archive, the hot copy can go
+        self._sizes.pop(cycle_id, None)
+        if storage_path:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(storage_path + suffix):
+                    os.remove(storage_path + suffix)
+        else:
+            os.remove(source_path)
+            self._delete_readings(cycle_id)
+
+        print(f"RetentionManager: Archived cycle {cycle_id} to {archive_path}")
+        return True
+
+    def _checkpoint(self, storage_path):
+        """Move a partition's WAL into its main file, so the file alone holds every committed reading."""
+        conn = sqlite3.connect(storage_path)
+        try:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            conn.close()
+        if busy:
+            print(f"RetentionManager: Partition {storage_path} is busy, archiving it on a later pass")
+            return False
+        return True
+
+    def _copy_readings(self, cycle_id, target_path):
+        """Copy a cycle's readings from the main database into a standalone file, batch by batch."""
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        target = sqlite3.connect(target_path)
+        target.execute(SENSOR_READINGS_TABLE_SQL.format(table='sensor_readings'))
+        target.execute(SENSOR_CHUNKS_TABLE_SQL.format(table='sensor_chunks'))
+
+        source = sqlite3.connect(self.database.db_path)
+        completed = True
+        for table, columns, key in (('sensor_readings', 4, 'sensor_key, ts'),
+                                    ('sensor_chunks', 10, 'sensor_key, chunk_start')):
+            # Paged by key with a fresh, fully read statement per batch, so no read
+            # transaction stays open across the sleeps and pins the WAL
+            sql = f"SELECT * FROM {table} WHERE cycle_id = ?{{}} ORDER BY {key} LIMIT ?"
+            rows = source.execute(sql.format(''), (cycle_id, self.batch_size)).fetchall()
+            while completed and rows:
+                with target:
+                    target.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * columns)})", rows)
+                completed = self._sleep()
+                if len(rows) < self.batch_size:
+                    break
+                last = rows[-1][1:3]  # (sensor_key, ts or chunk_start) of the last copied row
+                rows = source.execute(sql.format(f" AND ({key}) > (?, ?)"),
+                                      (cycle_id, *last, self.batch_size)).fetchall()
+        source.close()
+        target.close()
+        return completed
+
+    def _compress(self, source_path, archive_path):
+        """gzip a file in chunks, yielding between chunks."""
+        tmp_path = archive_path + '.tmp'
+        completed = True
+        with open(source_path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                if not self._sleep():
+                    completed = False
+                    break
+        if not completed:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, archive_path)
+        return True
+
+    def _delete_readings(self, cycle_id):
+        """Delete archived readings from the main database in short transactions, then reclaim their pages."""
+        conn = sqlite3.connect(self.database.db_path)
+        while True:
+            with conn:
+                cursor = conn.execute('''
+                    DELETE FROM sensor_readings WHERE (cycle_id, sensor_key, ts) IN (
+                        SELECT cycle_id, sensor_key, ts FROM sensor_readings WHERE cycle_id = ? LIMIT ?
+                    )
+                ''', (cycle_id, self.batch_size))
+            if cursor.rowcount < self.batch_size:
+                break
+            time.sleep(self.throttle)
+        with conn:
+            conn.execute("DELETE FROM sensor_chunks WHERE cycle_id = ?", (cycle_id,))
+        self._reclaim(conn)
+        conn.close()
+
+    def _reclaim(self, conn):
+        """Give the pages freed by deleted readings back to the file system, batch by batch.
+
+        Only a database in auto_vacuum=INCREMENTAL mode (new databases are created in it)
+        can shrink while in use. In an older file the free pages are reused by new
+        readings, and only an offline VACUUM (python -m database.SchemaMigration) shrinks it.
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            # Run as a script, a plain execute only steps the pragma once and frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({self.batch_size})")
+            if not self._sleep():
+                break
+
+    def evict_rehydrated(self):
+        """Remove rehydrated copies of archived cycles that were not used recently."""
+        if not self.archive_dir.exists():
+            return
+        cutoff = time.time() - self.rehydrate_ttl
+        for path in self.archive_dir.glob('cycle_*.db'):
+            if os.path.getmtime(path) < cutoff:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"RetentionManager: Could not evict {path}: {str(e)}")
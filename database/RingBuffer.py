@@ -0,0 +1,90 @@
+import math
+import threading
+from array import array
+from bisect import bisect_left
+
+
+class SensorRingBuffer:
+    """Fixed-capacity buffer of the last samples of one sensor, backed by two flat arrays.
+
+    Appends overwrite the oldest sample in O(1). Timestamps (epoch microseconds) are
+    appended in order, so a time window is located with a binary search.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0
+        self.head = 0  # Index the next sample is written to
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        """Timestamp of the i-th oldest sample, lets bisect search the ring in logical order."""
+        return self.timestamps[(self.head - self.count + i) % self.capacity]
+
+    def append(self, ts, value):
+        self.timestamps[self.head] = ts
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self):
+        """Return (ts, value) of the newest sample, or None when empty."""
+        if not self.count:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.timestamps[i], self.values[i]
+
+    def window(self, start=None):
+        """Return (timestamps, values) lists of the samples at or after start, oldest first."""
+        first = 0 if start is None else bisect_left(self, start)
+        begin = (self.head - self.count + first) % self.capacity
+        length = self.count - first
+        end = begin + length
+        if end <= self.capacity:
+            return self.timestamps[begin:end].tolist(), self.values[begin:end].tolist()
+        end -= self.capacity
+        return (self.timestamps[begin:].tolist() + self.timestamps[:end].tolist(),
+                self.values[begin:].tolist() + self.values[:end].tolist())
+
+
+class RecentReadings:
+    """Ring buffers of recent readings for every sensor plus the latest acquired frame.
+
+    Missed samples are not buffered, the latest frame still reports them. Sensors are read
+    at different rates, so the latest frame merges the newest sample of every sensor.
+    """
+
+    def __init__(self, capacity=3600):
+        self.capacity = capacity
+        self.latest_frame = None
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def add(self, samples):
+        """Store the {sensor_id: Sample} result of one acquisition."""
+        with self._lock:
+            for sensor_id, sample in samples.items():
+                if sample.missed or math.isnan(sample.temperature):
+                    continue
+                buffer = self._buffers.get(sensor_id)
+                if buffer is None:
+                    buffer = self._buffers[sensor_id] = SensorRingBuffer(self.capacity)
+                buffer.append(sample.epoch_us, sample.temperature)
+            # Replaced, never mutated, so readers can use it without the lock
+            self.latest_frame = {**(self.latest_frame or {}), **samples}
+
+    def sensor_ids(self):
+        return list(self._buffers)
+
+    def window(self, sensor_id, start=None):
+        """Return (timestamps, values) of one sensor since start (epoch microseconds)."""
+        with self._lock:
+            buffer = self._buffers.get(sensor_id)
+            if buffer is None:
+                raise KeyError(f"No recent readings for sensor '{sensor_id}'")
+            return buffer.window(start)
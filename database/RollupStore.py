@@ -0,0 +1,173 @@
+from collections import defaultdict
+
+from database.ChunkedStorage import cycle_chunk_sensors, iter_chunk_readings
+
+# Bucket widths in seconds, finest first
+ROLLUP_RESOLUTIONS = (10, 60, 600)
+
+SENSOR_ROLLUPS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS sensor_rollups (
+    cycle_id INTEGER NOT NULL,
+    sensor_key INTEGER NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    min REAL,
+    max REAL,
+    sum REAL,
+    count INTEGER,
+    PRIMARY KEY (cycle_id, sensor_key, resolution, bucket)
+) WITHOUT ROWID
+'''
+
+# Merging into an existing bucket keeps the rollups correct no matter how the
+# samples of one bucket are split over several flushes.
+UPSERT_ROLLUP_SQL = '''
+INSERT INTO sensor_rollups (cycle_id, sensor_key, resolution, bucket, min, max, sum, count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (cycle_id, sensor_key, resolution, bucket) DO UPDATE SET
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    sum = sum + excluded.sum,
+    count = count + excluded.count
+'''
+
+
+def aggregate_rows(rows, resolutions=ROLLUP_RESOLUTIONS):
+    """Aggregate (cycle_id, sensor_key, ts, temperature) rows into rollup rows for every resolution."""
+    buckets = defaultdict(lambda: [float('inf'), float('-inf'), 0.0, 0])
+    for cycle_id, sensor_key, ts, temperature in rows:
+        if temperature is None:
+            continue
+        for resolution in resolutions:
+            width = resolution * 1_000_000
+            bucket = buckets[(cycle_id, sensor_key, resolution, ts - ts % width)]
+            if temperature < bucket[0]:
+                bucket[0] = temperature
+            if temperature > bucket[1]:
+                bucket[1] = temperature
+            bucket[2] += temperature
+            bucket[3] += 1
+    return [key + tuple(values) for key, values in buckets.items()]
+
+
+def insert_new_readings(conn, insert_sql, rows):
+    """Insert readings with an INSERT OR IGNORE statement and return the rows that were new.
+
+    Rollups are folded from the returned rows only, so a reading written twice is counted
+    once. The batch is inserted at once; only if some rows were ignored it is rolled back
+    and inserted row by row to tell them apart.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN")  # Releasing the savepoint must not commit the caller's transaction
+    before = conn.total_changes
+    conn.execute("SAVEPOINT insert_readings")
+    conn.executemany(insert_sql, rows)
+    if conn.total_changes - before == len(rows):
+        conn.execute("RELEASE insert_readings")
+        return rows
+    conn.execute("ROLLBACK TO insert_readings")
+    inserted = [row for row in rows if conn.execute(insert_sql, row).rowcount]
+    conn.execute("RELEASE insert_readings")
+    return inserted
+
+
+def upsert_rollups(conn, rows):
+    """Fold a batch of freshly written readings into the rollup tables."""
+    conn.executemany(UPSERT_ROLLUP_SQL, aggregate_rows(rows))
+
+
+def rebuild_rollups(conn, cycle_id, schema='main', engine='rows', batch_size=10000):
+    """Recompute all rollups of a cycle from its raw readings in the given schema."""
+    conn.execute("DELETE FROM sensor_rollups WHERE cycle_id = ?", (cycle_id,))
+    if engine == 'chunked':
+        for sensor_key in cycle_chunk_sensors(conn, cycle_id, schema):
+            rows = []
+            for ts, temperature in iter_chunk_readings(conn, cycle_id, sensor_key, schema=schema):
+                rows.append((cycle_id, sensor_key, ts, temperature))
+                if len(rows) >= batch_size:
+                    upsert_rollups(conn, rows)
+                    rows = []
+            upsert_rollups(conn, rows)
+        return
+    for resolution in ROLLUP_RESOLUTIONS:
+        width = resolution * 1_000_000
+        conn.execute(f'''
+            INSERT INTO sensor_rollups (cycle_id, sensor_key, resolution, bucket, min, max, sum, count)
+            SELECT cycle_id, sensor_key, ?, (ts / ?) * ?, MIN(temperature), MAX(temperature),
+                   SUM(temperature), COUNT(temperature)
+            FROM {schema}.sensor_readings
+            WHERE cycle_id = ? AND temperature IS NOT NULL
+            GROUP BY sensor_key, ts / ?
+        ''', (resolution, width, width, cycle_id, width))
+
+
+def has_rollups(conn, cycle_id):
+    """Check whether rollups exist for a cycle."""
+    return conn.execute("SELECT 1 FROM sensor_rollups WHERE cycle_id = ? LIMIT 1", (cycle_id,)).fetchone() is not None
+
+
+def choose_resolution(conn, cycle_id, sensor_keys, max_points, start=None, end=None):
+    """Pick the finest resolution (0 = raw) whose largest series still fits in max_points.
+
+    Point counts come from the rollup tables, so the choice itself never touches the raw readings.
+    """
+    key_sql = ','.join('?' * len(sensor_keys))
+
+    def largest_series(resolution, column):
+        range_sql, range_args = _range_clause('bucket', start, end, resolution * 1_000_000)
+        row = conn.execute(f'''
+            SELECT MAX(points) FROM (
+                SELECT {column} AS points FROM sensor_rollups
+                WHERE cycle_id = ? AND resolution = ? AND sensor_key IN ({key_sql}){range_sql}
+                GROUP BY sensor_key
+            )
+        ''', (cycle_id, resolution, *sensor_keys, *range_args)).fetchone()
+        return row[0] or 0
+
+    if largest_series(ROLLUP_RESOLUTIONS[0], 'SUM(count)') <= max_points:
+        return 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        if largest_series(resolution, 'COUNT(*)') <= max_points:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def query_series(conn, cycle_id, sensor_key, resolution, start=None, end=None, schema='main', engine='rows'):
+    """Return (ts, min, max, mean, count) tuples of one sensor at the given resolution.
+
+    Raw readings are read from the given schema, rollups always live in the main database.
+    """
+    if resolution == 0 and engine == 'chunked':
+        return [(ts, temperature, temperature, temperature, 1)
+                for ts, temperature in iter_chunk_readings(conn, cycle_id, sensor_key, start, end, schema)]
+    if resolution == 0:
+        range_sql, range_args = _range_clause('ts', start, end)
+        cursor = conn.execute(f'''
+            SELECT ts, temperature, temperature, temperature, 1 FROM {schema}.sensor_readings
+            WHERE cycle_id = ? AND sensor_key = ? AND temperature IS NOT NULL{range_sql}
+            ORDER BY ts
+        ''', (cycle_id, sensor_key, *range_args))
+    else:
+        range_sql, range_args = _range_clause('bucket', start, end, resolution * 1_000_000)
+        cursor = conn.execute(f'''
+            SELECT bucket, min, max, sum / count, count FROM sensor_rollups
+            WHERE cycle_id = ? AND sensor_key = ? AND resolution = ?{range_sql}
+            ORDER BY bucket
+        ''', (cycle_id, sensor_key, resolution, *range_args))
+    return cursor.fetchall()
+
+
+def _range_clause(column, start, end, width=1):
+    """Build an optional time range filter.
+
+    Buckets are keyed by their start, so for bucket columns start is aligned down to the
+    bucket width to keep the bucket that contains it.
+    """
+    sql, args = '', []
+    if start is not None:
+        sql += f" AND {column} >= ?"
+        args.append(start - start % width)
+    if end is not None:
+        sql += f" AND {column} <= ?"
+        args.append(end)
+    return sql, args
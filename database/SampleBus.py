@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from database.SampleScheduler import SampleScheduler
+from database.SensorAcquisition import epoch_us
+
+
+class SampleFrame(namedtuple('SampleFrame', ['seq', 'monotonic_ns', 'epoch_us', 'samples'])):
+    """Immutable result of one acquisition tick, samples is a tuple of Sample in config order."""
+    __slots__ = ()
+
+    @classmethod
+    def from_samples(cls, seq, samples):
+        """Build a frame from the {sensor_id: Sample} dict returned by the acquisition engine.
+
+        The frame time is the tick time the samples share, so frames line up with the logged
+        readings; a frame without samples takes the same anchored clock.
+        """
+        samples = tuple(samples.values())
+        monotonic_ns = time.monotonic_ns()
+        return cls(seq, monotonic_ns, samples[0].epoch_us if samples else epoch_us(monotonic_ns), samples)
+
+    def temperatures(self):
+        """Return {sensor_id: temperature}, None for missed sensors."""
+        return {sample.sensor_id: sample.temperature for sample in self.samples}
+
+
+class Subscription:
+    """Bounded queue of frames for one consumer, the oldest frames are dropped when it falls behind."""
+
+    def __init__(self, bus, maxlen):
+        self.bus = bus
+        self.frames = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def _push(self, frame):
+        with self._condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Return the next frame, or None when the timeout passed or the subscription was closed."""
+        with self._condition:
+            if not self.frames and not self.closed:
+                self._condition.wait(timeout)
+            return self.frames.popleft() if self.frames else None
+
+    def close(self):
+        self.bus.unsubscribe(self._push)
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class SampleBus:
+    """Publish/subscribe bus distributing sample frames to any number of consumers.
+
+    Callbacks run on the publishing thread and must return quickly; consumers that
+    block (e.g. SSE streams) use open_subscription() and read frames from a queue.
+    """
+
+    def __init__(self):
+        self.latest = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(frame) for every published frame."""
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber != callback]
+
+    def open_subscription(self, maxlen=10):
+        """Return a Subscription queueing every published frame, close it when done."""
+        subscription = Subscription(self, maxlen)
+        self.subscribe(subscription._push)
+        return subscription
+
+    def publish(self, frame):
+        self.latest = frame
+        for callback in self._subscribers:  # Copy-on-write list, safe to iterate without the lock
+            try:
+                callback(frame)
+            except Exception as e:
+                print(f"SampleBus: Subscriber {callback} failed: {str(e)}")
+
+
+class AcquisitionLoop:
+    """The only reader of the sensors: publishes a frame every time a group of sensors is read.
+
+    Reads are driven by a SampleScheduler, so every sensor is sampled at its own configured
+    period (``interval`` for sensors without one). A frame only holds the sensors that were due.
+    """
+
+    def __init__(self, reader, bus, interval=1.0):
+        self.reader = reader
+        self.bus = bus
+        self.interval = interval
+        self.seq = 0
+        self.scheduler = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start the acquisition thread, does nothing if it is already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.__acquisition_loop, daemon=True)
+        self._thread.start()
+        print(f"AcquisitionLoop: Started (interval={self.interval}s)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def acquire_once(self, sensors=None):
+        """Read the given sensors (default all) once and publish the frame."""
+        self.seq += 1
+        frame = SampleFrame.from_samples(self.seq, self.reader.acquire_samples(sensors))
+        self.bus.publish(frame)
+        return frame
+
+    def __acquisition_loop(self):
+        """Background process acquiring frames whenever sensors are due."""
+        self.scheduler = SampleScheduler(self.reader.sensors, default_period=self.interval)
+        # Sensors added to or removed from the config are picked up on the fly
+        self.scheduler.run(self.acquire_once, self._stop_event, source=lambda: self.reader.sensors)
+        print(f"AcquisitionLoop: Stopped, schedule report: {self.scheduler.report()}")
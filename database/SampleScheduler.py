@@ -0,0 +1,101 @@
+import heapq
+import math
+import time
+
+
+class SampleScheduler:
+    """Earliest-deadline scheduler driving per-sensor sample periods.
+
+    Sensors are SensorDriver objects with a period (seconds between reads, default
+    ``default_period``) and a priority (higher is read first). Sensors are kept in a
+    heap ordered by next deadline; all sensors due within ``coalesce`` seconds of each
+    other are read together as one group.
+
+    Skew is how late a read started compared to its deadline. A read that finishes after
+    the sensor's next deadline is an overrun: the missed deadlines are skipped instead of
+    being read back to back.
+    """
+
+    def __init__(self, sensors, default_period=1.0, coalesce=0.005, clock=time.monotonic):
+        self.default_period = default_period
+        self.coalesce = coalesce
+        self.clock = clock
+        self.stats = {}
+        self._heap = []
+        self.sensors = ()
+        self.update(sensors)
+
+    def update(self, sensors):
+        """Switch to a new set of sensors: known sensors keep their deadline, new ones are due now."""
+        deadlines = {entry[3].id: entry[0] for entry in self._heap}
+        now = self.clock()
+        # (deadline, -priority, config order, sensor) keeps ties ordered by priority
+        self._heap = [(deadlines.get(sensor.id, now), -sensor.priority, i, sensor) for i, sensor in enumerate(sensors)]
+        heapq.heapify(self._heap)
+        for sensor in sensors:
+            self.stats.setdefault(sensor.id, {'reads': 0, 'overruns': 0, 'max_skew': 0.0, 'total_skew': 0.0})
+        self.sensors = sensors
+
+    def period(self, sensor):
+        return sensor.period or self.default_period
+
+    def next_deadline(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the (deadline, entry) pairs due by now, coalescing close deadlines."""
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.coalesce:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    def complete(self, due, started, finished):
+        """Record skew and overruns of a finished group and schedule its next reads."""
+        for deadline, neg_priority, i, sensor in due:
+            period = self.period(sensor)
+            stats = self.stats[sensor.id]
+            skew = max(started - deadline, 0.0)
+            stats['reads'] += 1
+            stats['total_skew'] += skew
+            stats['max_skew'] = max(stats['max_skew'], skew)
+
+            next_deadline = deadline + period
+            if finished > next_deadline:
+                missed = math.ceil((finished - next_deadline) / period)
+                stats['overruns'] += 1
+                next_deadline += missed * period
+            heapq.heappush(self._heap, (next_deadline, neg_priority, i, sensor))
+
+    def run(self, read_group, stop_event, source=None):
+        """Call read_group(sensors) whenever sensors are due, until stop_event is set.
+
+        source() is polled for the current sensors, a new object is picked up with update().
+        """
+        while not stop_event.is_set():
+            if source is not None:
+                sensors = source()
+                if sensors is not self.sensors:
+                    self.update(sensors)
+            if not self._heap:
+                if stop_event.wait(self.default_period):
+                    break
+                continue
+            delay = self.next_deadline() - self.clock()
+            if delay > 0 and stop_event.wait(delay):
+                break
+            started = self.clock()
+            due = self.pop_due(started)
+            read_group([entry[3] for entry in sorted(due, key=lambda entry: entry[1])])
+            self.complete(due, started, self.clock())
+
+    def report(self):
+        """Per-sensor reads, overruns and skew statistics (seconds)."""
+        return {
+            sensor_id: {
+                'reads': stats['reads'],
+                'overruns': stats['overruns'],
+                'max_skew': stats['max_skew'],
+                'mean_skew': stats['total_skew'] / stats['reads'] if stats['reads'] else 0.0,
+            }
+            for sensor_id, stats in self.stats.items()
+        }
@@ -0,0 +1,198 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from database.Metrics import metrics
+
+
+class SampleWriter:
+    """Write-behind writer that batches sensor samples into SQLite on a background thread.
+
+    The acquisition side only appends rows to a bounded in-memory queue. A flusher thread
+    owns one long-lived WAL-mode connection and writes the queue with ``executemany``
+    whenever ``batch_size`` rows are waiting or ``flush_interval`` seconds have passed.
+    An optional ``on_flush(conn, rows)`` callback runs inside the same transaction, so derived
+    tables such as rollups are committed together with the raw rows. ``attach`` maps schema
+    names to extra database files that are ATTACHed to the connection, e.g. a cycle partition.
+    With ``insert_sql`` set to None rows are only handed to ``on_flush``. An optional
+    ``on_close_cycle(conn, cycle_id)`` callback runs in its own transaction when a cycle
+    ends (``close_cycle``) and with None on ``stop``, for writers that hold state per cycle.
+    Such writers also pass ``on_rollback()``, called after one of these transactions failed.
+    """
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, db_path, insert_sql, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 overflow_policy='drop_oldest', on_flush=None, attach=None, on_close_cycle=None,
+                 on_rollback=None):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', "
+                             f"expected one of {', '.join(self.OVERFLOW_POLICIES)}")
+
+        self.db_path = db_path
+        self.insert_sql = insert_sql
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.on_flush = on_flush
+        self.on_close_cycle = on_close_cycle
+        self.on_rollback = on_rollback
+        self.attach = attach or {}
+
+        # Counters
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        self._commit_histogram = metrics.histogram('db_commit_seconds', 'Duration of one sample writer transaction')
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Open the connection and start the flusher thread."""
+        if self._running:
+            return
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for schema, path in self.attach.items():
+            self._conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+        for schema in ['main', *self.attach]:
+            self._conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+            self._conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+
+        self._running = True
+        self._thread = threading.Thread(target=self.__flush_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread, write whatever is still queued and close the connection."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+        self.close_cycle(None)
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def close_cycle(self, cycle_id):
+        """Write everything queued and let on_close_cycle finish a cycle (None for all of them)."""
+        self.flush()
+        if self.on_close_cycle is None:
+            return
+        with self._flush_lock:
+            if self._conn is None:
+                return
+            try:
+                with self._conn:
+                    self.on_close_cycle(self._conn, cycle_id)
+            except Exception as e:
+                print(f"SampleWriter: Failed to close cycle {cycle_id}: {type(e).__name__}: {str(e)}")
+                if self.on_rollback:
+                    self.on_rollback()
+
+    def pending(self):
+        """Number of rows waiting to be written."""
+        return len(self._queue)
+
+    def submit(self, row):
+        """Queue a single row. Returns False if the row was dropped."""
+        return self.submit_many((row,)) == 1
+
+    def submit_many(self, rows):
+        """Queue several rows at once, applying the overflow policy. Returns the number of rows accepted."""
+        accepted = 0
+        with self._cond:
+            for row in rows:
+                if len(self._queue) >= self.max_queue:
+                    if self.overflow_policy == 'drop_newest':
+                        self.dropped += 1
+                        continue
+                    elif self.overflow_policy == 'drop_oldest':
+                        self._queue.popleft()
+                        self.dropped += 1
+                    else:
+                        # Block the producer until the flusher made room
+                        while len(self._queue) >= self.max_queue and self._running:
+                            self._cond.notify_all()
+                            self._cond.wait(self.flush_interval)
+                        if len(self._queue) >= self.max_queue:
+                            self.dropped += 1
+                            continue
+
+                self._queue.append(row)
+                self.queued += 1
+                accepted += 1
+
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return accepted
+
+    def flush(self):
+        """Write all queued rows to the database now. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._cond:
+                batch = list(self._queue)
+                self._queue.clear()
+                self._cond.notify_all()
+
+            if not batch:
+                return 0
+            if self._conn is None:
+                with self._cond:
+                    self.dropped += len(batch)
+                print(f"SampleWriter: No open connection, dropped {len(batch)} samples")
+                return 0
+
+            started = time.perf_counter_ns()
+            try:
+                with self._conn:
+                    if self.insert_sql:
+                        for i in range(0, len(batch), self.batch_size):
+                            self._conn.executemany(self.insert_sql, batch[i:i + self.batch_size])
+                    if self.on_flush:
+                        self.on_flush(self._conn, batch)
+            except Exception as e:
+                # Also errors of on_flush, which must not end the flusher thread
+                with self._cond:
+                    self.dropped += len(batch)
+                print(f"SampleWriter: Failed to write {len(batch)} samples: {type(e).__name__}: {str(e)}")
+                if self.on_rollback:
+                    self.on_rollback()
+                return 0
+
+            self._commit_histogram.record(time.perf_counter_ns() - started)
+            with self._cond:
+                self.flushed += len(batch)
+            return len(batch)
+
+    def __flush_loop(self):
+        """Background process that flushes on the size or time trigger."""
+        while self._running:
+            deadline = time.monotonic() + self.flush_interval
+            with self._cond:
+                while self._running and len(self._queue) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def stats(self):
+        """Return the writer counters."""
+        with self._cond:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'queue_depth': len(self._queue),
+            }
@@ -0,0 +1,122 @@
+import sqlite3
+import sys
+from datetime import datetime
+
+SCHEMA_VERSION = 2
+
+SENSORS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS sensors (
+    sensor_key INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+)
+'''
+
+# Readings are clustered on (cycle_id, sensor_key, ts) so per-cycle and per-sensor
+# queries are range scans instead of full table scans. ts is epoch microseconds.
+SENSOR_READINGS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    cycle_id INTEGER NOT NULL,
+    sensor_key INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    temperature REAL,
+    PRIMARY KEY (cycle_id, sensor_key, ts)
+) WITHOUT ROWID
+'''
+
+
+def iso_to_epoch_us(timestamp):
+    """Convert a v1 ISO-8601 timestamp to integer epoch microseconds."""
+    if timestamp is None:
+        return None
+    return round(datetime.fromisoformat(timestamp).timestamp() * 1_000_000)
+
+
+def get_schema_version(conn):
+    """Return the schema version of an open database, detecting unversioned v1 files."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version:
+        return version
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(sensor_readings)")]
+    if not columns:
+        return 0  # Empty database
+    return 1 if 'sensor_id' in columns else SCHEMA_VERSION
+
+
+def migrate_to_v2(db_path, vacuum=True):
+    """Migrate a v1 database in place to the compact v2 schema.
+
+    Runs in a single transaction, so an interrupted migration leaves the v1 tables untouched.
+    v1 rows without a cycle, sensor or timestamp cannot be keyed and are dropped, rows sharing
+    (cycle, sensor, timestamp) are merged into the last one; both are counted and logged.
+    VACUUM rewrites the whole file and needs about twice its size in free disk, so startup
+    migrates with vacuum=False and the space is reclaimed by running this module offline.
+    Returns the number of migrated readings.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.isolation_level = None  # Manage the transaction manually, DDL included
+    conn.create_function("iso_to_epoch_us", 1, iso_to_epoch_us, deterministic=True)
+
+    try:
+        if get_schema_version(conn) != 1:
+            print(f"SchemaMigration: '{db_path}' is not a v1 database, nothing to migrate.")
+            return 0
+
+        print(f"SchemaMigration: Migrating '{db_path}' to schema v{SCHEMA_VERSION}...")
+        conn.execute("BEGIN IMMEDIATE")
+        source, unkeyed = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(cycle_id IS NULL OR sensor_id IS NULL OR timestamp IS NULL), 0)
+            FROM sensor_readings
+        ''').fetchone()
+        conn.execute(SENSORS_TABLE_SQL)
+        conn.execute('''
+            INSERT OR IGNORE INTO sensors (name)
+            SELECT DISTINCT sensor_id FROM sensor_readings WHERE sensor_id IS NOT NULL
+        ''')
+        conn.execute(SENSOR_READINGS_TABLE_SQL.format(table='sensor_readings_v2'))
+        conn.execute('''
+            INSERT OR REPLACE INTO sensor_readings_v2 (cycle_id, sensor_key, ts, temperature)
+            SELECT r.cycle_id, s.sensor_key, iso_to_epoch_us(r.timestamp), r.temperature
+            FROM sensor_readings r
+            JOIN sensors s ON s.name = r.sensor_id
+            WHERE r.cycle_id IS NOT NULL AND r.timestamp IS NOT NULL
+        ''')
+        # rowcount also counts the rows that replaced a duplicate, so count what is left
+        migrated = conn.execute("SELECT COUNT(*) FROM sensor_readings_v2").fetchone()[0]
+        conn.execute("DROP TABLE sensor_readings")
+        conn.execute("ALTER TABLE sensor_readings_v2 RENAME TO sensor_readings")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except (sqlite3.Error, ValueError):
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.close()
+        raise
+
+    if vacuum:
+        # Give the space of the old table back to the file system, and let the retention
+        # job reclaim the space of archived cycles from now on
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    conn.close()
+
+    print(f"SchemaMigration: Migrated {migrated} of {source} readings, dropped {unkeyed} without cycle, "
+          f"sensor or timestamp, merged {source - unkeyed - migrated} duplicates.")
+    return migrated
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python -m database.SchemaMigration <path/to/ClimateChamber_data.db>")
+        sys.exit(1)
+    db_path = sys.argv[1]
+    conn = sqlite3.connect(db_path)
+    if get_schema_version(conn) == SCHEMA_VERSION:
+        # Already migrated on startup, which skips the VACUUM
+        print(f"SchemaMigration: '{db_path}' is already at schema v{SCHEMA_VERSION}, reclaiming free space...")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+    else:
+        conn.close()
+        migrate_to_v2(db_path)
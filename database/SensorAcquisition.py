@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from database.Metrics import metrics
+
+# One acquired value. monotonic_ns is taken when the read returned (or when the deadline
+# passed for a missed read), so it keeps the per-sensor timing. epoch_us is the wall clock
+# time of the tick, shared by every sample of the tick so the readings of one tick line up.
+Sample = namedtuple('Sample', ['sensor_id', 'temperature', 'monotonic_ns', 'epoch_us', 'missed'])
+
+# Wall clock anchor, so sample timestamps stay ordered when the system clock is adjusted
+_EPOCH_OFFSET_US = time.time_ns() // 1000 - time.monotonic_ns() // 1000
+
+
+def epoch_us(monotonic_ns=None):
+    """Epoch microseconds of a time.monotonic_ns() value (default now) on the clock of the samples."""
+    if monotonic_ns is None:
+        monotonic_ns = time.monotonic_ns()
+    return _EPOCH_OFFSET_US + monotonic_ns // 1000
+
+
+class AcquisitionEngine:
+    """Reads all sensors of a tick concurrently on a bounded thread pool.
+
+    Sensors are SensorDriver objects, each with its own deadline (its timeout, or
+    ``deadline`` seconds). A read that does not finish in time is reported as missed and
+    left running in the background; the sensor is skipped (and reported missed) until that
+    read returns, so a hanging sensor occupies at most one worker.
+    """
+
+    def __init__(self, max_workers=4, deadline=2.0):
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sensor-read')
+        self._pending = {}  # sensor_id -> read still running from an earlier tick
+        self._lock = threading.Lock()
+        self.missed = {}
+        self._read_histograms = {}
+        self._tick_histogram = metrics.histogram('acquisition_tick_seconds', 'Duration of one acquisition tick')
+
+    def _read(self, sensor):
+        histogram = self._read_histograms.get(sensor.id)
+        if histogram is None:
+            histogram = self._read_histograms[sensor.id] = metrics.histogram(
+                'sensor_read_seconds', 'Duration of a single sensor read', 'sensor', sensor.id)
+        started = time.monotonic_ns()
+        reading = sensor.read()
+        finished = time.monotonic_ns()
+        histogram.record(finished - started)
+        temperature = reading.get('temperature') if reading else None
+        return temperature, finished
+
+    def _sample(self, sensor_id, temperature, monotonic_ns, epoch_us):
+        missed = temperature is None
+        if missed:
+            self.missed[sensor_id] = self.missed.get(sensor_id, 0) + 1
+            metrics.increment('sensor_reads_missed_total', 1, 'Sensor reads without a value', 'sensor', sensor_id)
+        return Sample(sensor_id, temperature, monotonic_ns, epoch_us, missed)
+
+    def acquire(self, sensors):
+        """Read all sensors of one tick and return {sensor_id: Sample}, in config order."""
+        with self._lock:
+            tick_ns = time.monotonic_ns()
+            tick = tick_ns / 1e9
+            tick_epoch_us = epoch_us(tick_ns)
+            futures = {}
+            samples = {}
+
+            for sensor in sensors:
+                sensor_id = sensor.id
+                pending = self._pending.get(sensor_id)
+                if pending is not None:
+                    if not pending.done():
+                        samples[sensor_id] = None
+                        continue
+                    del self._pending[sensor_id]
+                samples[sensor_id] = None
+                futures[sensor_id] = (sensor, self._executor.submit(self._read, sensor))
+
+            for sensor_id, (sensor, future) in futures.items():
+                remaining = tick + (sensor.timeout or self.deadline) - time.monotonic()
+                try:
+                    temperature, monotonic_ns = future.result(timeout=max(remaining, 0))
+                except FutureTimeoutError:
+                    self._pending[sensor_id] = future
+                    print(f"Warning: Sensor {sensor_id} missed its read deadline")
+                    temperature, monotonic_ns = None, time.monotonic_ns()
+                except Exception as e:
+                    print(f"Warning: Failed to read sensor {sensor_id}: {str(e)}")
+                    temperature, monotonic_ns = None, time.monotonic_ns()
+                samples[sensor_id] = self._sample(sensor_id, temperature, monotonic_ns, tick_epoch_us)
+
+            # Sensors still busy with an earlier read
+            for sensor_id, sample in samples.items():
+                if sample is None:
+                    samples[sensor_id] = self._sample(sensor_id, None, time.monotonic_ns(), tick_epoch_us)
+            self._tick_histogram.record(int((time.monotonic() - tick) * 1e9))
+            return samples
+
+    def close(self):
+        """Stop accepting reads, reads that are still hanging are abandoned."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
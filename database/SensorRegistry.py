@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+
+
+class SensorDriver:
+    """Compiled sensor config entry; read() is bound once so a tick does no config lookups."""
+    __slots__ = ('id', 'type', 'pin', 'period', 'priority', 'timeout', 'read')
+
+    def __init__(self, sensor_id, read, sensor_type='', pin=None, period=None, priority=0, timeout=None):
+        self.id = sensor_id
+        self.read = read
+        self.type = sensor_type
+        self.pin = pin
+        self.period = period
+        self.priority = priority
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"SensorDriver({self.id!r}, type={self.type!r}, pin={self.pin!r})"
+
+
+class SensorRegistry:
+    """Sensor config compiled into SensorDriver objects, reloaded when the file changes.
+
+    ``bind(config)`` returns the read function of one config entry, or None when the
+    sensor cannot be read. Invalid entries are reported once when the config is compiled.
+    The drivers tuple is replaced as a whole on reload, so a reader always sees either
+    the old or the new config. The file's mtime is checked at most every ``check_interval``
+    seconds; a config that fails to parse keeps the previous drivers.
+    """
+
+    def __init__(self, path, bind, check_interval=1.0):
+        self.path = path
+        self.bind = bind
+        self.check_interval = check_interval
+        self.drivers = ()
+        self.mtime = None
+        self.version = 0
+        self._checked = False  # The file was tried once at its current mtime (None while it is missing)
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def compile(self, config):
+        """Replace the drivers with the compiled config list."""
+        drivers = []
+        seen = set()
+        for entry in config:
+            sensor_id = entry.get('id')
+            if not sensor_id:
+                print(f"Warning: Sensor missing ID, skipping: {entry}")
+                continue
+            if sensor_id in seen:
+                print(f"Warning: Duplicate sensor ID '{sensor_id}', skipping")
+                continue
+            read = self.bind(entry)
+            if read is None:
+                print(f"Warning: Unsupported sensor type '{entry.get('type')}' for sensor {sensor_id}, skipping")
+                continue
+            seen.add(sensor_id)
+            drivers.append(SensorDriver(sensor_id, read, entry.get('type', '').lower(), entry.get('pin'),
+                                        entry.get('period'), entry.get('priority', 0), entry.get('timeout')))
+        self.drivers = tuple(drivers)
+        self.version += 1
+        return self.drivers
+
+    def reload(self):
+        """Compile the config file if its mtime changed, returns True when the drivers were replaced."""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self.mtime and self._checked:
+                return False
+            self._checked = True
+            try:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                # Reported once, a missing or broken file is retried when it appears or changes
+                print(f"Warning: Could not load sensor config {self.path}, keeping previous sensors: {str(e)}")
+                self.mtime = mtime
+                return False
+            self.mtime = mtime
+            self.compile(config)
+            if self.version > 1:
+                print(f"Reloaded sensor config: {len(self.drivers)} sensors")
+            return True
+
+    def get(self):
+        """Return the current drivers, reloading the config first if it changed."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self.drivers
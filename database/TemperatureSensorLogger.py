@@ -1,9 +1,29 @@
 import sqlite3
 import json
+import os
 import time
 import threading
 import random
+import shutil
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
+from pathlib import Path
+
+from database.RollupStore import (SENSOR_ROLLUPS_TABLE_SQL, choose_resolution, has_rollups, insert_new_readings,
+                                  query_series, rebuild_rollups, upsert_rollups)
+from database.ChunkedStorage import CHUNKED_AVAILABLE, SENSOR_CHUNKS_TABLE_SQL, ChunkedSeriesWriter
+from database.ColumnarArchive import COLUMNAR_AVAILABLE, ColumnarCycle, write_columnar_cycle
+from database.RetentionManager import rehydrate_archive, rehydrated_path
+from database.RingBuffer import RecentReadings
+from database.SampleBus import SampleFrame
+from database.SampleScheduler import SampleScheduler
+from database.SampleWriter import SampleWriter
+from database.SensorAcquisition import AcquisitionEngine
+from database.SensorRegistry import SensorRegistry
+from database.SchemaMigration import (SCHEMA_VERSION, SENSORS_TABLE_SQL, SENSOR_READINGS_TABLE_SQL,
+                                      get_schema_version, migrate_to_v2)
 
 # Mock imports for testing
 class MockGPIO:
@@ -46,48 +66,221 @@ except ImportError:
     MOCK_MODE = True
     print("Running in mock mode (no GPIO libraries found)")
 
+# Applied controller output of every control step, kept out of the sensor readings so
+# exports, rollups, archives and sensor lists only see real sensors
+CONTROL_OUTPUTS_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS control_outputs (
+    cycle_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    output REAL,
+    PRIMARY KEY (cycle_id, ts)
+) WITHOUT ROWID
+'''
+INSERT_CONTROL_OUTPUT_SQL = "INSERT OR REPLACE INTO control_outputs (cycle_id, ts, output) VALUES (?, ?, ?)"
+
 
 class DatabaseManager:
-    def __init__(self, db_path='ClimateChamber_data.db'):
+    """Stores cycles and their readings.
+
+    In 'single' storage mode all readings live in the sensor_readings table of db_path.
+    In 'partitioned' mode db_path is a catalog (cycles, sensors, rollups) and the readings
+    of every new cycle get their own SQLite file in partition_dir, which is ATTACHed on
+    demand. Deleting a partitioned cycle only unlinks its file.
+
+    The 'rows' storage engine stores one sensor_readings row per sample, the 'chunked'
+    engine packs each sensor's samples into compressed sensor_chunks (requires numpy).
+    The engine is recorded per cycle, so both kinds of cycles can be read side by side.
+    """
+    STORAGE_MODES = ('single', 'partitioned')
+    STORAGE_ENGINES = ('rows', 'chunked')
+    PARTITION_SCHEMA = 'cycle_data'
+
+    def __init__(self, db_path='ClimateChamber_data.db', storage_mode='single', partition_dir=None,
+                 storage_engine='rows'):
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode '{storage_mode}', expected one of {', '.join(self.STORAGE_MODES)}")
+        if storage_engine not in self.STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine '{storage_engine}', "
+                             f"expected one of {', '.join(self.STORAGE_ENGINES)}")
+        if storage_engine == 'chunked' and not CHUNKED_AVAILABLE:
+            raise RuntimeError("numpy is required for the chunked storage engine")
         self.db_path = db_path
+        self.storage_mode = storage_mode
+        self.storage_engine = storage_engine
+        self.partition_dir = partition_dir
         self.setup_database()
 
     def setup_database(self):
-        """Ensure the database and required tables exist."""
+        """Ensure the database and required tables exist, migrating v1 files to the current schema."""
+        self._sensor_keys = {}
+
+        conn = sqlite3.connect(self.db_path)
+        version = get_schema_version(conn)
+        conn.close()
+        if version == 1:
+            # Skip the VACUUM on startup, it would block for minutes on a large file
+            migrate_to_v2(self.db_path, vacuum=False)
+            print(f"DatabaseManager: Run 'python -m database.SchemaMigration {self.db_path}' offline "
+                  f"to reclaim the space of the v1 readings.")
+
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        # Only takes effect in a new file, it lets the retention job shrink the file after archiving
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS cycles (
             cycle_id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT UNIQUE,
             start_time TEXT,
-            end_time TEXT
-        )
-        ''')
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sensor_readings (
-            reading_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cycle_id INTEGER,
-            sensor_id TEXT,
-            timestamp TEXT,
-            temperature REAL,
-            FOREIGN KEY (cycle_id) REFERENCES cycles (cycle_id)
+            end_time TEXT,
+            storage_path TEXT,
+            archive_path TEXT,
+            storage_engine TEXT
         )
         ''')
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(cycles)")]
+        for column in ('storage_path', 'archive_path', 'storage_engine'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE cycles ADD COLUMN {column} TEXT")
+        cursor.execute(SENSORS_TABLE_SQL)
+        cursor.execute(SENSOR_READINGS_TABLE_SQL.format(table='sensor_readings'))
+        cursor.execute(SENSOR_CHUNKS_TABLE_SQL.format(table='sensor_chunks'))
+        cursor.execute(SENSOR_ROLLUPS_TABLE_SQL)
+        cursor.execute(CONTROL_OUTPUTS_TABLE_SQL)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+        conn.close()
+
+    def get_sensor_key(self, sensor_name):
+        """Return the integer key of a sensor, registering it in the sensors table if needed."""
+        key = self._sensor_keys.get(sensor_name)
+        if key is None:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO sensors (name) VALUES (?)", (sensor_name,))
+            cursor.execute("SELECT sensor_key FROM sensors WHERE name = ?", (sensor_name,))
+            key = cursor.fetchone()[0]
+            conn.commit()
+            conn.close()
+            self._sensor_keys[sensor_name] = key
+        return key
+
+    def get_partition_dir(self):
+        """Directory holding the per-cycle files, next to the catalog by default."""
+        if self.partition_dir:
+            return Path(self.partition_dir)
+        db_path = Path(self.db_path)
+        return db_path.with_name(f"{db_path.stem}_cycles")
+
+    def create_cycle_storage(self, cycle_id):
+        """Prepare the readings storage of a new cycle and return the partition path, if any."""
+        if self.storage_mode != 'partitioned':
+            return None
+
+        partition_dir = self.get_partition_dir()
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        storage_path = str(partition_dir / f"cycle_{cycle_id}.db")
+
+        conn = sqlite3.connect(storage_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SENSOR_READINGS_TABLE_SQL.format(table='sensor_readings'))
+        conn.execute(SENSOR_CHUNKS_TABLE_SQL.format(table='sensor_chunks'))
         conn.commit()
         conn.close()
 
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE cycles SET storage_path = ? WHERE cycle_id = ?", (storage_path, cycle_id))
+        conn.commit()
+        conn.close()
+        return storage_path
+
+    def get_columnar_path(self, cycle_id):
+        """Directory of the columnar archive of a cycle."""
+        db_path = Path(self.db_path)
+        return db_path.with_name(f"{db_path.stem}_columnar") / f"cycle_{cycle_id}"
+
+    def write_columnar(self, cycle_id, dtype='float64'):
+        """Write the columnar archive of a finished cycle, returns the number of rows."""
+        return write_columnar_cycle(self, cycle_id, str(self.get_columnar_path(cycle_id)), dtype)
+
+    def open_columnar(self, cycle_id):
+        """Open the memory-mapped columnar archive of a cycle, None if it was not written."""
+        path = self.get_columnar_path(cycle_id)
+        if not COLUMNAR_AVAILABLE or not path.exists():
+            return None
+        return ColumnarCycle(str(path))
+
+    def get_storage_engine(self, cycle_id):
+        """Return the storage engine a cycle was logged with."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT storage_engine FROM cycles WHERE cycle_id = ?", (cycle_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row and row[0] else 'rows'
+
+    def get_storage_path(self, cycle_id):
+        """Return the partition file of a cycle, or None if its readings are in the main database."""
+        return self.get_cycle_storage(cycle_id)[0]
+
+    def get_cycle_storage(self, cycle_id):
+        """Return (storage_path, archive_path) of a cycle."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT storage_path, archive_path FROM cycles WHERE cycle_id = ?", (cycle_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row if row else (None, None)
+
+    @contextmanager
+    def open_cycle(self, cycle_id):
+        """Open a connection on which the readings of a cycle can be queried.
+
+        Yields (conn, schema) where schema is the database holding the cycle's
+        sensor_readings: 'main', or the ATTACHed partition of the cycle. Archived
+        cycles are rehydrated from their compressed archive first.
+        """
+        storage_path, archive_path = self.get_cycle_storage(cycle_id)
+        if archive_path:
+            storage_path = rehydrate_archive(archive_path)
+        if storage_path and not os.path.exists(storage_path):
+            raise FileNotFoundError(f"Storage of cycle {cycle_id} not found: {storage_path}")
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            schema = 'main'
+            if storage_path:
+                conn.execute(f"ATTACH DATABASE ? AS {self.PARTITION_SCHEMA}", (storage_path,))
+                schema = self.PARTITION_SCHEMA
+            yield conn, schema
+        finally:
+            conn.close()
+
     def delete_cycle(self, cycle_name):
         """Delete a cycle and its associated sensor data from the database."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute("SELECT cycle_id FROM cycles WHERE name = ?", (cycle_name,))
+        cursor.execute("SELECT cycle_id, storage_path, archive_path FROM cycles WHERE name = ?", (cycle_name,))
         cycle = cursor.fetchone()
         if cycle:
-            cycle_id = cycle[0]
-            cursor.execute("DELETE FROM sensor_readings WHERE cycle_id = ?", (cycle_id,))
+            cycle_id, storage_path, archive_path = cycle
+            if not storage_path:
+                cursor.execute("DELETE FROM sensor_readings WHERE cycle_id = ?", (cycle_id,))
+                cursor.execute("DELETE FROM sensor_chunks WHERE cycle_id = ?", (cycle_id,))
+            cursor.execute("DELETE FROM sensor_rollups WHERE cycle_id = ?", (cycle_id,))
+            cursor.execute("DELETE FROM control_outputs WHERE cycle_id = ?", (cycle_id,))
             cursor.execute("DELETE FROM cycles WHERE cycle_id = ?", (cycle_id,))
             conn.commit()
+
+            files = []
+            if storage_path:
+                files += [storage_path + suffix for suffix in ('', '-wal', '-shm')]
+            if archive_path:
+                files += [archive_path, rehydrated_path(archive_path)]
+            for path in files:
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(self.get_columnar_path(cycle_id), ignore_errors=True)
             print(f"Deleted cycle '{cycle_name}' and associated sensor readings.")
         else:
             print(f"Cycle '{cycle_name}' not found.")
@@ -97,20 +290,113 @@ class DatabaseManager:
         """Retrieve a list of all logging cycles."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM cycles")
+        cursor.execute("SELECT cycle_id, name, start_time, end_time FROM cycles")
         cycles = cursor.fetchall()
         conn.close()
         return cycles
 
+    def get_cycle_id(self, cycle_name):
+        """Look up the id of a cycle by name, returns None if it does not exist."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT cycle_id FROM cycles WHERE name = ?", (cycle_name,))
+        cycle = cursor.fetchone()
+        conn.close()
+        return cycle[0] if cycle else None
+
+    def rebuild_rollups(self, cycle_id):
+        """Recompute the rollups of a cycle, e.g. for cycles logged before rollups existed."""
+        engine = self.get_storage_engine(cycle_id)
+        with self.open_cycle(cycle_id) as (conn, schema):
+            with conn:
+                rebuild_rollups(conn, cycle_id, schema, engine)
+
+    def query_cycle(self, cycle_id, max_points=1000, sensor_names=None, start=None, end=None):
+        """Return the readings of a cycle at the finest resolution that fits in max_points per sensor.
+
+        start and end are optional epoch microsecond bounds. The result holds the chosen
+        resolution in seconds (0 for raw readings) and per sensor a list of
+        (ts, min, max, mean, count) tuples. Rollups live in the main database, so only
+        raw queries need the cycle's partition or archive.
+        """
+        conn = sqlite3.connect(self.db_path)
+        rolled_up = has_rollups(conn, cycle_id)
+        conn.close()
+        if not rolled_up:
+            self.rebuild_rollups(cycle_id)
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT s.name, s.sensor_key FROM sensors s
+            WHERE s.sensor_key IN (SELECT DISTINCT sensor_key FROM sensor_rollups WHERE cycle_id = ?)
+        ''', (cycle_id,))
+        sensors = dict(cursor.fetchall())
+        if sensor_names is not None:
+            sensors = {name: key for name, key in sensors.items() if name in sensor_names}
+
+        resolution = 0
+        series = {}
+        if sensors:
+            resolution = choose_resolution(conn, cycle_id, list(sensors.values()), max_points, start, end)
+            if resolution:
+                for name, key in sensors.items():
+                    series[name] = query_series(conn, cycle_id, key, resolution, start, end)
+        conn.close()
+
+        if sensors and not resolution:
+            engine = self.get_storage_engine(cycle_id)
+            with self.open_cycle(cycle_id) as (conn, schema):
+                for name, key in sensors.items():
+                    series[name] = query_series(conn, cycle_id, key, resolution, start, end, schema, engine)
+        return {'resolution': resolution, 'series': series}
+
+    def query_control_output(self, cycle_id):
+        """Return the (epoch us, output) of every control step logged with a cycle, oldest first."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT ts, output FROM control_outputs WHERE cycle_id = ? ORDER BY ts", (cycle_id,))
+        outputs = cursor.fetchall()
+        conn.close()
+        return outputs
+
 
 class SensorReader:
+    """Reads the sensors listed in the sensor config.
+
+    The config is compiled into a SensorRegistry of drivers with pre-bound read functions
+    and is reloaded when the file changes, so sensors can be added while the app runs.
+    """
+    # Sensors are read concurrently, a read taking longer than the deadline (seconds) is
+    # reported as missed. A sensor's "timeout" config key overrides the deadline.
+    READ_WORKERS = 4
+    READ_DEADLINE = 2.0
+    # Number of recent samples per sensor kept in memory for live queries
+    RECENT_CAPACITY = 3600
+
     def __init__(self, config_path='database/sensorConfig.json', mock_data_path='database/mockSensorData.json'):
         self.config_path = config_path
         self.mock_data_path = mock_data_path
-        self.sensors = self.load_sensor_config()
         self.mock_data = {}
         if MOCK_MODE:
             self.load_mock_data()
+        self.registry = SensorRegistry(config_path, self.bind_read)
+        self.registry.reload()
+        self.acquisition = AcquisitionEngine(self.READ_WORKERS, self.READ_DEADLINE)
+        self.recent = RecentReadings(self.RECENT_CAPACITY)
+        # Thermal model of a mock climate chamber, mock readings come from it when set.
+        # With several mock chambers, simulators maps each chamber's sensors to its own model.
+        self.simulator = None
+        self.simulators = {}
+
+    @property
+    def sensors(self):
+        """Compiled sensor drivers, reloaded when the config file changed."""
+        return self.registry.get()
+
+    @sensors.setter
+    def sensors(self, config):
+        self.registry.compile(config)
 
     def load_mock_data(self):
         try:
@@ -127,18 +413,25 @@ class SensorReader:
         except (FileNotFoundError, json.JSONDecodeError):
             return []
 
-    def read_sensors(self):
-        temperatures = {}
-
-        for sensor in self.sensors:
-            sensor_id = sensor.get("id")
-            if not sensor_id:
-                print(f"Warning: Sensor missing ID, skipping: {sensor}")
-                continue
+    def bind_read(self, sensor):
+        """Return the read function of one sensor config entry, None if it cannot be read."""
+        if MOCK_MODE:
+            return partial(self.read_mock_temperature, sensor)
+        sensor_type = sensor.get('type', '').lower()
+        if sensor_type in ['dht22', 'dht11']:
+            model = Adafruit_DHT.DHT22 if sensor_type == 'dht22' else Adafruit_DHT.DHT11
+            return partial(self.read_dht, model, sensor.get('pin'))
+        return None
 
-            temperatures[f"{sensor_id}"] = self.read_temperature(sensor)['temperature']
+    def acquire_samples(self, sensors=None):
+        """Read the given sensors (default all) concurrently, returns {sensor_id: Sample} with missed reads marked."""
+        samples = self.acquisition.acquire(self.sensors if sensors is None else sensors)
+        self.recent.add(samples)
+        return samples
 
-        return temperatures
+    def read_sensors(self):
+        """Return {sensor_id: temperature}, None for sensors that missed their deadline."""
+        return {sensor_id: sample.temperature for sensor_id, sample in self.acquire_samples().items()}
 
     def read_temperature(self, sensor):
         if MOCK_MODE:
@@ -148,99 +441,319 @@ class SensorReader:
 
     def read_mock_temperature(self, sensor):
         sensor_id = sensor.get('id')
+        simulator = self.simulators.get(sensor_id, self.simulator)
+        if simulator:
+            return {'temperature': round(simulator.read(sensor_id), 2)}
         base_temp = self.mock_data.get(sensor_id, {}).get('base_temperature', 22.0)
         variation = self.mock_data.get(sensor_id, {}).get('variation', 5.0)
         temperature = base_temp + (random.random() * 2 - 1) * variation
         return {'temperature': round(temperature, 2)}
 
     def read_real_temperature(self, sensor):
-        sensor_type = sensor.get('type', '').lower()
-        sensor_pin = sensor.get('pin')
-        if sensor_type in ['dht22', 'dht11']:
-            model = Adafruit_DHT.DHT22 if sensor_type == 'dht22' else Adafruit_DHT.DHT11
-            humidity, temperature = Adafruit_DHT.read_retry(model, sensor_pin)
-            return {'temperature': temperature, 'humidity': humidity if humidity is not None else 0}
-        return None
+        read = self.bind_read(sensor)
+        return read() if read else None
+
+    @staticmethod
+    def read_dht(model, pin):
+        humidity, temperature = Adafruit_DHT.read_retry(model, pin)
+        return {'temperature': temperature, 'humidity': humidity if humidity is not None else 0}
+
+
+ChamberCycle = namedtuple('ChamberCycle', ['cycle_id', 'name', 'sensors', 'writer'])
 
 
 class TemperatureSensorLogger(DatabaseManager, SensorReader):
-    def __init__(self, app_state):
+    # Write-behind settings for the sample writer
+    WRITER_MAX_QUEUE = 10000
+    WRITER_BATCH_SIZE = 500
+    WRITER_FLUSH_INTERVAL = 1.0
+    WRITER_OVERFLOW_POLICY = 'drop_oldest'
+    # Value type of the memory-mapped columnar archive of finished cycles (see columnar_archive)
+    COLUMNAR_DTYPE = 'float64'
+    # Window length of one compressed chunk with the chunked storage engine
+    CHUNK_DURATION = 600
+
+    def __init__(self, app_state=None, storage_mode='single', storage_engine='rows',
+                 db_path='ClimateChamber_data.db', columnar_archive=False):
         self.app_state = app_state
-        DatabaseManager.__init__(self)
+        DatabaseManager.__init__(self, db_path, storage_mode=storage_mode, storage_engine=storage_engine)
         SensorReader.__init__(self)
+        # Also write finished cycles as a memory-mapped columnar archive (requires numpy),
+        # which copies every reading once more when a cycle stops
+        self.columnar_archive = columnar_archive
         self.logging_active = False
         self.logging_thread = None
         self.current_cycle_id = None
+        self.writer = None
+        self.columnar_threads = {}  # cycle_id -> thread writing its columnar archive (copy-on-write)
+        self._stop_event = threading.Event()
+        # Cycles of the chambers of a ChamberManager, chamber id -> ChamberCycle (copy-on-write)
+        self.chamber_cycles = {}
+        self._shared_writer = None
+        self._output_writer = None  # Writes the control outputs of the chamber cycles
+        self._chamber_lock = threading.Lock()
+
+    def insert_cycle(self, cycle_name):
+        """Register a new cycle and return its id."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO cycles (name, start_time, storage_engine) VALUES (?, ?, ?)",
+                       (cycle_name, datetime.now().isoformat(), self.storage_engine))
+        cycle_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return cycle_id
+
+    def finish_cycle(self, cycle_id):
+        """Set the end time of a cycle whose readings are all written, and write its columnar archive if enabled."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE cycles SET end_time = ? WHERE cycle_id = ?", (datetime.now().isoformat(), cycle_id))
+        conn.commit()
+        conn.close()
+
+        if self.columnar_archive and COLUMNAR_AVAILABLE and cycle_id:
+            # Written in the background so stopping a long cycle returns immediately
+            thread = threading.Thread(target=self.__write_columnar, args=(cycle_id,), daemon=True)
+            with self._chamber_lock:
+                self.columnar_threads = {**{key: value for key, value in self.columnar_threads.items()
+                                            if value.is_alive()}, cycle_id: thread}
+            thread.start()
+
+    def join_columnar(self):
+        """Wait until the columnar archives of every finished cycle are written, e.g. on shutdown."""
+        for thread in list(self.columnar_threads.values()):
+            thread.join()
+
+    def create_writer(self, storage_path=None):
+        """Sample writer for the readings of the main database, or of the partition at storage_path.
+
+        Rows carry their cycle id, so one writer of the main database can serve several cycles.
+        """
+        schema = self.PARTITION_SCHEMA if storage_path else 'main'
+
+        on_close_cycle = on_rollback = None
+        if self.storage_engine == 'chunked':
+            # Readings only end up in compressed chunks, rollups are built from the samples
+            # the chunks accepted, so a reading written twice is counted once
+            chunk_writer = ChunkedSeriesWriter(schema, self.CHUNK_DURATION)
+
+            def on_flush(conn, rows):
+                upsert_rollups(conn, chunk_writer(conn, rows))
+
+            # Open chunks are written and dropped from memory once their cycle ends, and
+            # written again if their transaction was rolled back
+            on_close_cycle = chunk_writer.close_cycle
+            on_rollback = chunk_writer.rollback
+        else:
+            insert_sql = f"INSERT OR IGNORE INTO {schema}.sensor_readings (cycle_id, sensor_key, ts, temperature) VALUES (?, ?, ?, ?)"
+
+            def on_flush(conn, rows):
+                # A reading written before is ignored, and so left out of the rollups
+                upsert_rollups(conn, insert_new_readings(conn, insert_sql, rows))
+
+        return SampleWriter(
+            self.db_path,
+            None,
+            max_queue=self.WRITER_MAX_QUEUE,
+            batch_size=self.WRITER_BATCH_SIZE,
+            flush_interval=self.WRITER_FLUSH_INTERVAL,
+            overflow_policy=self.WRITER_OVERFLOW_POLICY,
+            on_flush=on_flush,
+            attach={schema: storage_path} if storage_path else None,
+            on_close_cycle=on_close_cycle,
+            on_rollback=on_rollback
+        )
 
     """ Periodically read connected sensor and write data to database. """
-    def start_logging_cycle(self, cycle_name):
+    def start_logging_cycle(self, cycle_name, interval=None):
         """Start an asynchronous logging cycle."""
         if self.logging_active:
             print("Logging cycle already in progress.")
             return
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO cycles (name, start_time) VALUES (?, ?)", (cycle_name, datetime.now().isoformat()))
-        self.current_cycle_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        if interval is None:
+            interval = self.app_state.provider_interval
+
+        self.current_cycle_id = self.insert_cycle(cycle_name)
+        # Partitioned cycles write their readings into their own file, rollups stay in the catalog
+        self.writer = self.create_writer(self.create_cycle_storage(self.current_cycle_id))
+        self.writer.start()
 
         self.logging_active = True
-        self.logging_thread = threading.Thread(target=self.__logging_loop, args=(self.app_state.provider_interval,), daemon=True)
-        self.logging_thread.start()
+        self._stop_event.clear()
+        sample_bus = getattr(self.app_state, 'sample_bus', None)
+        if sample_bus:
+            # Log the frames of the shared acquisition loop instead of reading the sensors again
+            sample_bus.subscribe(self.log_frame)
+        else:
+            self.logging_thread = threading.Thread(target=self.__logging_loop, args=(interval,), daemon=True)
+            self.logging_thread.start()
         print(f"Started logging cycle: {cycle_name}")
 
     def __logging_loop(self, interval):
-        """Background process for logging sensor data at a set interval."""
-        while self.logging_active:
-            self.__log_sensor_data()
-            time.sleep(interval)
-
-    def __log_sensor_data(self):
-        """Read temperature data from all configured sensors and log to the database."""
-        if not self.current_cycle_id:
+        """Background process logging every sensor at its own period (interval if it has none)."""
+        scheduler = SampleScheduler(self.sensors, default_period=interval)
+        scheduler.run(self.log_sensor_data, self._stop_event, source=lambda: self.sensors)
+        print(f"Logging schedule report: {scheduler.report()}")
+
+    def log_sensor_data(self, sensors=None):
+        """Read temperature data from the given sensors (default all) and queue it for the database."""
+        self.log_frame(SampleFrame.from_samples(0, self.acquire_samples(sensors)))
+
+    def log_frame(self, frame):
+        """Queue the samples of an acquired frame for the database."""
+        cycle_id, writer = self.current_cycle_id, self.writer
+        if not cycle_id or not writer:
             print("No active logging cycle.")
             return
 
-        timestamp = datetime.now().isoformat()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        for sensor in self.sensors:
-            sensor_id = sensor.get('id')
-            if not sensor_id:
-                print(f"Warning: Sensor missing ID, skipping: {sensor}")
+        rows = []
+        for sample in frame.samples:
+            if sample.missed:
+                print(f"Warning: No reading from sensor {sample.sensor_id}")
                 continue
+            # Every sample keeps its own acquisition time (epoch microseconds)
+            rows.append((cycle_id, self.get_sensor_key(sample.sensor_id), sample.epoch_us, sample.temperature))
 
-            reading = self.read_temperature(sensor)
-            if reading and 'temperature' in reading:
-                temperature = reading['temperature']
-                if temperature is not None:
-                    cursor.execute(
-                        "INSERT INTO sensor_readings (cycle_id, sensor_id, timestamp, temperature) VALUES (?, ?, ?, ?)",
-                        (self.current_cycle_id, sensor_id, timestamp, temperature)
-                    )
-                    print(f"Logged: Sensor {sensor_id}, Temperature: {temperature}°C, Time: {timestamp}")
-                else:
-                    print(f"Warning: Null temperature reading from sensor {sensor_id}")
-            else:
-                print(f"Warning: Failed to get reading from sensor {sensor_id}")
-
-        conn.commit()
-        conn.close()
+        writer.submit_many(rows)
 
     def stop_logging_cycle(self):
         """Stop the ongoing logging cycle."""
         self.logging_active = False
+        self._stop_event.set()
+        sample_bus = getattr(self.app_state, 'sample_bus', None)
+        if sample_bus:
+            sample_bus.unsubscribe(self.log_frame)
         if self.logging_thread:
             self.logging_thread.join()
+            self.logging_thread = None
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE cycles SET end_time = ? WHERE cycle_id = ?",
-                       (datetime.now().isoformat(), self.current_cycle_id))
-        conn.commit()
-        conn.close()
+        # Write out everything still queued before the cycle is closed. Rollups are
+        # merged in the same transaction, so the final flush also finalizes them.
+        if self.writer:
+            self.writer.stop()
+            print(f"Sample writer stats: {self.writer.stats()}")
+            self.writer = None
+
+        self.finish_cycle(self.current_cycle_id)
         print("Logging cycle stopped.")
         self.current_cycle_id = None
+
+    def start_chamber_cycle(self, chamber_id, cycle_name, sensors=None):
+        """Start the logging cycle of one chamber, logging only its sensors (None for all).
+
+        Chamber cycles run alongside each other. One subscription to the sample bus routes
+        every sample to the cycles of the chambers owning its sensor, and in the single
+        storage mode all of them share one sample writer. Returns the cycle id.
+        """
+        with self._chamber_lock:
+            if chamber_id in self.chamber_cycles:
+                print(f"Logging cycle of chamber {chamber_id} already in progress.")
+                return self.chamber_cycles[chamber_id].cycle_id
+
+            cycle_id = self.insert_cycle(cycle_name)
+            storage_path = self.create_cycle_storage(cycle_id)
+            if storage_path:
+                writer = self.create_writer(storage_path)
+                writer.start()
+            else:
+                if self._shared_writer is None:
+                    self._shared_writer = self.create_writer()
+                    self._shared_writer.start()
+                writer = self._shared_writer
+            if self._output_writer is None:
+                self._output_writer = SampleWriter(self.db_path, INSERT_CONTROL_OUTPUT_SQL,
+                                                   flush_interval=self.WRITER_FLUSH_INTERVAL)
+                self._output_writer.start()
+
+            first = not self.chamber_cycles
+            self.chamber_cycles = {**self.chamber_cycles, chamber_id: ChamberCycle(
+                cycle_id, cycle_name, None if sensors is None else frozenset(sensors), writer)}
+        sample_bus = getattr(self.app_state, 'sample_bus', None)
+        if first and sample_bus:
+            sample_bus.subscribe(self.log_chamber_frame)
+        print(f"Started logging cycle: {cycle_name} (chamber {chamber_id})")
+        return cycle_id
+
+    def active_cycle_id(self, chamber_id):
+        """Id of the running cycle of a chamber, None if it is not logging."""
+        cycle = self.chamber_cycles.get(chamber_id)
+        return cycle.cycle_id if cycle else None
+
+    def log_chamber_frame(self, frame):
+        """Queue the samples of an acquired frame for the cycles of the chambers owning the sensors.
+
+        The chamber lock is held until the rows are queued, so a stopping cycle either gets
+        them before its final flush or not at all.
+        """
+        with self._chamber_lock:
+            batches = {}
+            for sample in frame.samples:
+                if sample.missed:
+                    continue
+                sensor_key = None
+                for cycle in self.chamber_cycles.values():
+                    if cycle.sensors is None or sample.sensor_id in cycle.sensors:
+                        if sensor_key is None:
+                            sensor_key = self.get_sensor_key(sample.sensor_id)
+                        batches.setdefault(cycle.writer, []).append(
+                            (cycle.cycle_id, sensor_key, sample.epoch_us, sample.temperature))
+            # One queue operation per writer, however many chambers share it
+            for writer, rows in batches.items():
+                writer.submit_many(rows)
+
+    def log_control_output(self, chamber_id, epoch_us, output):
+        """Queue the control output applied at epoch_us for a chamber's cycle, if it is logging."""
+        with self._chamber_lock:
+            cycle = self.chamber_cycles.get(chamber_id)
+            if cycle is not None and self._output_writer is not None:
+                self._output_writer.submit((cycle.cycle_id, epoch_us, output))
+
+    def stop_chamber_cycle(self, chamber_id):
+        """Stop the logging cycle of a chamber, returns its cycle id (None if it was not logging)."""
+        with self._chamber_lock:
+            cycle = self.chamber_cycles.get(chamber_id)
+            if cycle is None:
+                return None
+            self.chamber_cycles = {key: value for key, value in self.chamber_cycles.items() if key != chamber_id}
+            last = not self.chamber_cycles
+            shared = cycle.writer is self._shared_writer
+            output_writer = self._output_writer
+            if last:
+                self._output_writer = None
+                if shared:
+                    self._shared_writer = None
+        sample_bus = getattr(self.app_state, 'sample_bus', None)
+        if last and sample_bus:
+            sample_bus.unsubscribe(self.log_chamber_frame)
+
+        # Everything queued for the cycle is written before it is closed
+        if last:
+            output_writer.stop()
+        else:
+            output_writer.flush()
+        if shared and not last:
+            cycle.writer.close_cycle(cycle.cycle_id)
+        else:
+            cycle.writer.stop()
+            print(f"Sample writer stats: {cycle.writer.stats()}")
+        self.finish_cycle(cycle.cycle_id)
+        print(f"Logging cycle stopped: {cycle.name} (chamber {chamber_id})")
+        return cycle.cycle_id
+
+    def writers(self):
+        """Every running sample writer, each listed once."""
+        writers = [self.writer] if self.writer else []
+        for cycle in self.chamber_cycles.values():
+            if cycle.writer not in writers:
+                writers.append(cycle.writer)
+        return writers
+
+    def __write_columnar(self, cycle_id):
+        """Background process writing the columnar archive of a finished cycle."""
+        try:
+            rows = self.write_columnar(cycle_id, self.COLUMNAR_DTYPE)
+            print(f"Columnar archive of cycle {cycle_id} written ({rows} rows).")
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Failed to write columnar archive of cycle {cycle_id}: {str(e)}")
@@ -1,7 +1,9 @@
-from app import create_app
+from app import create_app, app_state
 
 app = create_app()
 
 if __name__ == '__main__':
 
-    app.run(debug=False)
\ No newline at end of file
+    app.run(debug=False)
+    # Running cycles are closed and their archives written before exiting
+    app_state.stop()